@@ -7,4 +7,8 @@
     "Interval" : 10,
     "URLs" : [ "http://localhost:8800" ],
     "Symbol" : "SYM"
+
+    ## uncomment to write the latency of every kind of request, broken
+    ## down by phase, as json when the load generator stops
+    ## , "TimingsFile" : "{log_dir}/load-{host}-timings.js"
 }
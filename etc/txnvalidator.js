@@ -19,30 +19,126 @@
     "MinTransactionsPerBlock" : 1,
     "MaxTransactionsPerBlock" : 1000,
 
+    ## adjust the transactions per block to the pending backlog, the
+    ## block validation time and the propagation delay every
+    ## BlockSizeInterval seconds, within BlockSizeBounds
+    ## "AdaptiveBlockSize" : true,
+    ## "BlockSizeBounds" : [ 1, 5000 ],
+    ## "BlockSizeInterval" : 10.0,
+
+    ## track the block interval, fork rate and number of validators to
+    ## recommend a target wait time within WaitTimeBounds every
+    ## WaitTimeInterval seconds; the recommendation is reported in the
+    ## status and the log but never applied, all validators check wait
+    ## certificates against the same TargetWaitTime so a new value must
+    ## be set in every configuration and applied with txnadmin reload
+    ## "WaitTimeTuning" : "recommend",
+    ## "WaitTimeBounds" : [ 5.0, 120.0 ],
+    ## "WaitTimeInterval" : 300.0,
+    ## "ForkRateTarget" : 0.05,
+
     ## configuration of the topology
     ## "TopologyAlgorithm" : "BarabasiAlbert",
     ## "MaximumConnectivity" : 15,
     ## "MinimumConnectivity" : 1,
 
+    ## "TopologyAlgorithm" : "LatencyAware",
+    ## "LocalLinks" : 2,
+    ## "LongLinks" : 2,
+    ## "TopologyInterval" : 60.0,
+
     "TopologyAlgorithm" : "RandomWalk",
     "TargetConnectivity" : 3,
 
-    ## configuration of the network flow control
+    ## seconds to wait for the reply to a connect request and the
+    ## number of retries, with exponential backoff, for each peer
+    ## "ConnectTimeout" : 2.0,
+    ## "ConnectRetries" : 5,
+
+    ## mean seconds between checks that reconnect to known peers while
+    ## connectivity is below TargetConnectivity
+    ## "ReconnectInterval" : 10.0,
+
+    ## restart the journal transfer from another peer when no blocks or
+    ## transactions arrive for TransferStallTimeout seconds
+    ## "TransferStallTimeout" : 30.0,
+    ## "TransferRestarts" : 5,
+
+    ## export a snapshot of the global store to
+    ## {data_dir}/{node}-snapshots every SnapshotInterval seconds, the
+    ## snapshots are disabled by default; each snapshot reads every store
+    ## and a joining validator still replays the journal
+    ## "SnapshotInterval" : 3600,
+    ## "SnapshotsKept" : 2,
+
+    ## pick the initial peers by probing ProbeCount candidates and
+    ## keeping the ones with the lowest round trip time, a fraction of
+    ## the peers is still picked at random
+    ## "PeerSelection" : "latency",
+    ## "ProbeCount" : 8,
+    ## "ProbeWindow" : 2.0,
+    ## "RandomPeerFraction" : 0.25,
+
+    ## configuration of the network flow control, the flow rate, burst
+    ## rate, wait times and block sizes are applied again without a
+    ## restart on SIGHUP or a reload command from the administration node
     "NetworkFlowRate" : 96000,
     "NetworkBurstRate" : 128000,
     "NetworkDelayRange" : [ 0.00, 0.10 ],
     "UseFixedDelay" : true,
 
-    ## configuration of logging
+    ## configuration of logging, the levels can be changed while the
+    ## validator runs with the txnadmin loglevel command or by posting a
+    ## SetLogLevel message to /loglevel on the local web api
     "LogLevel" : "INFO",
     "LogFile"  : "{log_dir}/lottery-{node}.log",
 
+    ## log records are written by a background thread from a queue of
+    ## LogQueueSize records, 0 writes them directly; when the queue is
+    ## full records are dropped and counted, or with "block" logging
+    ## waits for room
+    ## "LogQueueSize" : 10000,
+    ## "LogOverflow" : "drop",
+
+    ## write the log file as one JSON object per line, start a new file
+    ## at LogMaxBytes bytes or every LogRotateInterval seconds, gzip the
+    ## rotated files and keep LogBackupCount of them
+    ## "LogFormat" : "json",
+    ## "LogMaxBytes" : 104857600,
+    ## "LogRotateInterval" : 86400,
+    ## "LogBackupCount" : 5,
+    ## "LogCompress" : true,
+
+    ## let through at most Rate records per second of each level up to
+    ## Level from a logger, '*' limits every record; the count of the
+    ## suppressed records is added to the next one that passes
+    ## "LogRateLimits" : {
+    ##     "txnserver.web_api" : {"Rate" : 10, "Burst" : 20, "Level" : "INFO"}
+    ## },
+
     ## configuration of the transaction families to include
     ## in the validator
     "TransactionFamilies" : [
         "ledger.transaction.integer_key"
     ],
 
+    ## the peers this validator was connected to are saved in
+    ## {data_dir}/{node}-peers.js every PeerCacheInterval seconds and
+    ## used to reconnect immediately on restart
+    ## "PeerCache" : true,
+    ## "PeerCacheInterval" : 300,
+
+    ## upper bound, in seconds, on the time shutdown waits for the
+    ## outbound message queues to drain
+    ## "ShutdownTimeout" : 10.0,
+
+    ## seconds between checks of the endpoint registry for voting
+    ## validators that joined or left the quorum
+    ## "QuorumUpdateInterval" : 1.0,
+
+    ## seconds a resolved host name of a peer or endpoint is kept
+    ## "ResolverTTL" : 300.0,
+
     ## do not restart 
     "Restore" : false,
 
@@ -0,0 +1,59 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.block_size_controller import BlockSizeController
+
+
+class TestBlockSizeController(unittest.TestCase):
+    def test_grow_under_backlog(self):
+        controller = BlockSizeController(minimum=10, maximum=100, lower=1,
+                                         upper=150)
+        self.assertEquals(controller.update(500, 0.0), (31, 125))
+        self.assertEquals(controller.update(500, 0.0), (37, 150))
+
+        # never past the upper bound
+        self.assertEquals(controller.update(500, 0.0), (37, 150))
+
+    def test_low_load(self):
+        controller = BlockSizeController(minimum=10, maximum=100)
+
+        # few pending transactions must not be held back by the minimum
+        self.assertEquals(controller.update(3, 0.0), (3, 100))
+        self.assertEquals(controller.update(0, 0.0), (1, 100))
+        self.assertEquals(controller.update(50, 0.0), (10, 100))
+
+    def test_validation_budget(self):
+        controller = BlockSizeController(minimum=1, maximum=1000,
+                                         blockinterval=30.0, budget=0.1)
+
+        # 10ms per transaction leaves room for 300 transactions in the 3
+        # second budget, less once the propagation delay is counted
+        controller.observe_block(100, 1.0)
+        self.assertEquals(controller.ceiling(0.0), 300)
+        self.assertEquals(controller.ceiling(1.0), 200)
+        self.assertEquals(controller.update(50, 1.0), (1, 200))
+
+        # empty blocks carry no information about the cost
+        controller.observe_block(0, 5.0)
+        self.assertAlmostEquals(controller.CostPerTransaction, 0.01)
+
+        controller.observe_block(100, 3.0)
+        self.assertAlmostEquals(controller.CostPerTransaction, 0.015)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import json
+import unittest
+
+from txnserver.client_metrics import CallTiming
+from txnserver.client_metrics import HistogramObserver
+from txnserver.client_metrics import LatencyHistogram
+
+
+class TestClientMetrics(unittest.TestCase):
+    def test_call_timing(self):
+        timing = CallTiming('GET', 'http://localhost:8800/store/abc/def')
+        timing.add_phase('connect', 0.01)
+        timing.add_phase('server', 0.02)
+        timing.add_phase('server', 0.03)
+
+        self.assertEquals(timing.Operation, 'GET /store')
+        self.assertAlmostEqual(timing.Phases['server'], 0.05)
+        self.assertAlmostEqual(timing.Total, 0.06)
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(0.5))
+
+        for _ in range(90):
+            histogram.add(0.004)
+        for _ in range(10):
+            histogram.add(0.8)
+
+        self.assertEquals(histogram.Count, 100)
+        self.assertEquals(histogram.percentile(0.5), 0.005)
+        self.assertEquals(histogram.percentile(0.99), 0.8)
+
+    def test_observer(self):
+        observer = HistogramObserver()
+
+        timing = CallTiming('POST', 'http://localhost:8800/transaction')
+        timing.add_phase('server', 0.1)
+        timing.Status = 200
+        timing.BytesSent = 10
+        observer.call_completed(timing)
+
+        timing = CallTiming('POST', 'http://localhost:8800/transaction')
+        timing.add_phase('failed', 0.2)
+        timing.Error = 'connection refused'
+        observer.call_completed(timing)
+
+        stats = json.loads(observer.dump_json())['POST /transaction']
+        self.assertEquals(stats['Total']['Count'], 2)
+        self.assertEquals(stats['Errors'], 1)
+        self.assertEquals(stats['Status'], {'200': 1, 'None': 1})
+        self.assertEquals(stats['BytesSent'], 10)
+        self.assertEquals(sorted(stats['Phases']), ['failed', 'server'])
+
+        observer.reset()
+        self.assertEquals(observer.dump(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
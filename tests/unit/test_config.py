@@ -0,0 +1,44 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.config import reloadable_changes
+
+
+class TestReloadableChanges(unittest.TestCase):
+    def test_changed_keys_only(self):
+        current = {'NetworkFlowRate': 96000, 'TargetWaitTime': 30.0,
+                   'Port': 8800}
+        updated = {'NetworkFlowRate': 128000, 'TargetWaitTime': 30.0,
+                   'Port': 8801}
+        keys = ['NetworkFlowRate', 'TargetWaitTime']
+
+        self.assertEquals(reloadable_changes(current, updated, keys),
+                          {'NetworkFlowRate': 128000})
+
+    def test_new_and_removed_keys(self):
+        current = {'NetworkFlowRate': 96000}
+        updated = {'NetworkBurstRate': 128000}
+        keys = ['NetworkFlowRate', 'NetworkBurstRate']
+
+        # a variable removed from the files keeps its running value
+        self.assertEquals(reloadable_changes(current, updated, keys),
+                          {'NetworkBurstRate': 128000})
+        self.assertEquals(reloadable_changes(current, current, keys), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import BaseHTTPServer
+import httplib
+import socket
+import threading
+import unittest
+
+from txnserver import connection_pool
+from txnserver.connection_pool import HTTPConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = self.path
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.getheader('Content-Length')))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class _StaleConnection(object):
+    def __init__(self, error, sendfails=False):
+        self.sock = None
+        self.Error = error
+        self.SendFails = sendfails
+        self.Requests = 0
+
+    def request(self, method, path, body, headers):
+        self.Requests += 1
+        if self.SendFails:
+            raise self.Error
+
+    def getresponse(self):
+        raise self.Error
+
+    def close(self):
+        pass
+
+
+class _RecordingSocket(object):
+    def __init__(self, family, socktype, proto):
+        self.Family = family
+        self.Address = None
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, address):
+        self.Address = address
+
+    def close(self):
+        pass
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _get(self, pool, path):
+        response = pool.request('GET', self.url + path)
+        content = response.read()
+        response.close()
+        return (response.getcode(), content)
+
+    def test_connection_reuse(self):
+        pool = HTTPConnectionPool()
+
+        self.assertEquals(self._get(pool, '/a'), (200, '/a'))
+        self.assertEquals(self._get(pool, '/b?c=1'), (200, '/b?c=1'))
+        self.assertEquals(pool.Created, 1)
+        self.assertEquals(pool.Reused, 1)
+
+        pool.close()
+
+    def test_idle_timeout(self):
+        pool = HTTPConnectionPool(idletimeout=0.0)
+
+        self._get(pool, '/a')
+        self._get(pool, '/a')
+        self.assertEquals(pool.Created, 2)
+        self.assertEquals(pool.Reused, 0)
+
+        pool.close()
+
+    def test_unread_response_is_not_reused(self):
+        pool = HTTPConnectionPool()
+
+        response = pool.request('GET', self.url + '/a')
+        response.close()
+        self._get(pool, '/a')
+        self.assertEquals(pool.Created, 2)
+
+        pool.close()
+
+    def _stale_pool(self, connection):
+        pool = HTTPConnectionPool()
+        pool._acquire = lambda key: connection
+        return pool
+
+    def test_stale_connection_retry(self):
+        # the response to an idempotent request failed, it is sent again
+        connection = _StaleConnection(httplib.BadStatusLine(''))
+        pool = self._stale_pool(connection)
+        self.assertEquals(self._get(pool, '/a'), (200, '/a'))
+        self.assertEquals(pool.Created, 1)
+        self.assertEquals(pool.Discarded, 1)
+        pool.close()
+
+        # a request that could not be sent is sent again whatever its method
+        connection = _StaleConnection(socket.error('broken pipe'),
+                                      sendfails=True)
+        pool = self._stale_pool(connection)
+        response = pool.request('POST', self.url + '/a', 'data')
+        self.assertEquals(response.read(), '/a')
+        response.close()
+        self.assertEquals(pool.Created, 1)
+        pool.close()
+
+    def test_no_retry_after_send(self):
+        connection = _StaleConnection(httplib.BadStatusLine(''))
+        pool = self._stale_pool(connection)
+        with self.assertRaises(httplib.BadStatusLine):
+            pool.request('POST', self.url + '/a', 'data')
+        self.assertEquals(pool.Created, 0)
+
+        connection = _StaleConnection(socket.timeout('timed out'))
+        pool = self._stale_pool(connection)
+        with self.assertRaises(socket.timeout):
+            pool.request('GET', self.url + '/a')
+        self.assertEquals(pool.Created, 0)
+
+    def test_link_local_address(self):
+        # the scope id of an IPv6 link-local address is kept
+        sockaddr = ('fe80::1', 8800, 0, 2)
+        addrinfo = [(socket.AF_INET6, socket.SOCK_STREAM, 6, '', sockaddr)]
+
+        (getaddrinfo, sockettype) = (socket.getaddrinfo, socket.socket)
+        socket.getaddrinfo = lambda *args: addrinfo
+        socket.socket = _RecordingSocket
+        try:
+            connection = httplib.HTTPConnection('fe80::1%eth0', 8800)
+            create = connection_pool._resolving_create_connection(connection)
+            sock = create(('fe80::1%eth0', 8800), 5.0)
+        finally:
+            (socket.getaddrinfo, socket.socket) = (getaddrinfo, sockettype)
+
+        self.assertEquals(sock.Family, socket.AF_INET6)
+        self.assertEquals(sock.Address, sockaddr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.endpoint_index import EndpointDomainIndex
+
+
+class _Store(dict):
+    def __init__(self, *args, **kwargs):
+        super(_Store, self).__init__(*args, **kwargs)
+        self.Reads = 0
+
+    def keys(self):
+        self.Reads += 1
+        return super(_Store, self).keys()
+
+
+class TestEndpointDomainIndex(unittest.TestCase):
+    def setUp(self):
+        self.Store = _Store({
+            'a': {'NodeIdentifier': 'a', 'Domain': '/LotteryValidator'},
+            'b': {'NodeIdentifier': 'b', 'Domain': '/VotingValidator'},
+            'c': {'NodeIdentifier': 'c', 'Domain': '/LotteryValidator/x'},
+            'd': {'NodeIdentifier': 'd'}
+        })
+
+    def test_lookup(self):
+        index = EndpointDomainIndex()
+
+        self.assertEquals(
+            sorted(index.lookup('b1', self.Store, '/LotteryValidator')),
+            ['a', 'c'])
+        self.assertEquals(
+            sorted(index.lookup('b1', self.Store, '/VotingValidator')), ['b'])
+        self.assertEquals(
+            sorted(index.lookup('b1', self.Store, '/')), ['a', 'b', 'c', 'd'])
+        self.assertEquals(index.lookup('b1', self.Store, '/None'), {})
+
+        # the index of a block is only built once
+        reads = self.Store.Reads
+        index.lookup('b1', self.Store, '/LotteryValidator')
+        self.assertEquals(self.Store.Reads, reads)
+
+    def test_eviction(self):
+        index = EndpointDomainIndex(maxblocks=2)
+        for blockid in ['b1', 'b2', 'b3']:
+            index.lookup(blockid, self.Store, '/')
+
+        reads = self.Store.Reads
+        index.lookup('b3', self.Store, '/')
+        self.assertEquals(self.Store.Reads, reads)
+        index.lookup('b1', self.Store, '/')
+        self.assertEquals(self.Store.Reads, reads + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from ledger.transaction import endpoint_registry
+from txnserver.endpoint_tracker import EndpointTracker, diff_endpoints
+
+
+def _endpoint(identifier, port=8800, domain='/VotingValidator'):
+    return {'NodeIdentifier': identifier, 'Name': identifier,
+            'Host': 'localhost', 'Port': port, 'Domain': domain}
+
+
+class _Store(dict):
+    def __init__(self, values, delta=None):
+        dict.__init__(self, values)
+        self.Delta = delta
+
+    def dump(self, delta=False):
+        assert delta
+        return self.Delta
+
+
+class _StoreMap(object):
+    def __init__(self, store):
+        txntype = endpoint_registry.EndpointRegistryTransaction
+        self.TransactionStores = {txntype.TransactionTypeName: store}
+
+    def get_transaction_store(self, name):
+        return self.TransactionStores[name]
+
+
+class _GlobalStoreMap(object):
+    def __init__(self):
+        self.Stores = {}
+
+    def get_block_store(self, blockid):
+        return self.Stores.get(blockid)
+
+
+class _Block(object):
+    def __init__(self, previousid):
+        self.PreviousBlockID = previousid
+
+
+class _Ledger(object):
+    def __init__(self):
+        self.MostRecentCommitedBlockID = None
+        self.GlobalStoreMap = _GlobalStoreMap()
+        self.BlockStore = {}
+
+    def commit(self, blockid, store):
+        self.GlobalStoreMap.Stores[blockid] = _StoreMap(store)
+        self.BlockStore[blockid] = _Block(self.MostRecentCommitedBlockID)
+        self.MostRecentCommitedBlockID = blockid
+
+
+class TestDiffEndpoints(unittest.TestCase):
+    def test_diff(self):
+        known = {'a': _endpoint('a'), 'b': _endpoint('b'), 'c': None}
+        current = {'a': _endpoint('a'), 'b': _endpoint('b', 8801),
+                   'c': _endpoint('c'), 'd': _endpoint('d'),
+                   'e': _endpoint('e', domain='/LotteryValidator')}
+
+        (added, removed) = diff_endpoints(known, current, '/VotingValidator')
+        self.assertEquals(sorted(added.keys()), ['b', 'd'])
+        self.assertEquals(removed, [])
+
+        (added, removed) = diff_endpoints(known, {}, '/VotingValidator')
+        self.assertEquals(added, {})
+        self.assertEquals(sorted(removed), ['a', 'b', 'c'])
+
+
+class TestEndpointTracker(unittest.TestCase):
+    def test_update(self):
+        ledger = _Ledger()
+        added = []
+        removed = []
+        tracker = EndpointTracker(ledger, '/VotingValidator',
+                                  lambda e: added.append(e['NodeIdentifier']),
+                                  removed.append)
+        tracker.seed(['a'])
+
+        # nothing committed yet
+        self.assertEquals(tracker.update(), ({}, []))
+
+        ledger.commit('block1',
+                      _Store({'a': _endpoint('a'), 'b': _endpoint('b')}))
+        tracker.update()
+        self.assertEquals(added, ['b'])
+
+        # the same head is not read again
+        del added[:]
+        self.assertEquals(tracker.update(), ({}, []))
+
+        ledger.commit('block2',
+                      _Store({'b': _endpoint('b'), 'c': _endpoint('c')}))
+        tracker.update()
+        self.assertEquals(added, ['c'])
+        self.assertEquals(removed, ['a'])
+        self.assertEquals(sorted(tracker.Known.keys()), ['b', 'c'])
+
+    def test_update_from_deltas(self):
+        ledger = _Ledger()
+        added = []
+        removed = []
+        tracker = EndpointTracker(ledger, '/VotingValidator',
+                                  lambda e: added.append(e['NodeIdentifier']),
+                                  removed.append)
+
+        ledger.commit('block1', _Store({'a': _endpoint('a')}))
+        tracker.update()
+        self.assertEquals(added, ['a'])
+
+        # only the keys in the store deltas are examined, the stores of
+        # these blocks are left empty to show that they are not read
+        ledger.commit('block2', _Store({}, {'Store': {'b': _endpoint('b')},
+                                            'DeletedKeys': []}))
+        ledger.commit('block3', _Store({}, {'Store': {'c': _endpoint('c')},
+                                            'DeletedKeys': ['a']}))
+        tracker.update()
+        self.assertEquals(sorted(added), ['a', 'b', 'c'])
+        self.assertEquals(removed, ['a'])
+        self.assertEquals(sorted(tracker.Known.keys()), ['b', 'c'])
+
+        # a store without a delta falls back to comparing the whole store
+        ledger.commit('block4', _Store({'c': _endpoint('c')}))
+        tracker.update()
+        self.assertEquals(removed, ['a', 'b'])
+
+    def test_rescan_interval(self):
+        ledger = _Ledger()
+        removed = []
+        tracker = EndpointTracker(ledger, '/VotingValidator',
+                                  lambda e: None, removed.append,
+                                  rescaninterval=0.0)
+
+        ledger.commit('block1', _Store({'a': _endpoint('a')}))
+        tracker.update()
+
+        # the delta misses the removal, the full comparison finds it
+        ledger.commit('block2', _Store({}, {'Store': {},
+                                            'DeletedKeys': []}))
+        tracker.update()
+        self.assertEquals(removed, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.failover import EndpointSelector, RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay_bounds(self):
+        policy = RetryPolicy(initialdelay=1.0, maximumdelay=4.0,
+                             multiplier=2.0, jitter=0.5)
+
+        for attempt, limit in [(0, 1.0), (1, 2.0), (2, 4.0), (5, 4.0)]:
+            delay = policy.delay(attempt)
+            self.assertLessEqual(delay, limit)
+            self.assertGreaterEqual(delay, limit * 0.5)
+
+    def test_no_jitter(self):
+        policy = RetryPolicy(initialdelay=0.5, jitter=0.0)
+        self.assertEquals(policy.delay(2), 2.0)
+
+
+class TestEndpointSelector(unittest.TestCase):
+    def test_prefers_lowest_latency(self):
+        selector = EndpointSelector(['http://a', 'http://b'])
+        (a, b) = selector.Endpoints
+        selector.record_success(a, 0.5)
+        selector.record_success(b, 0.1)
+
+        self.assertIs(selector.select(), b)
+        self.assertIs(selector.select(exclude={'http://b'}), a)
+
+    def test_circuit_breaker(self):
+        selector = EndpointSelector(['http://a', 'http://b'],
+                                    failurethreshold=2, resettime=60.0)
+        (a, b) = selector.Endpoints
+        selector.record_success(a, 0.1)
+        selector.record_success(b, 0.5)
+
+        selector.record_failure(a)
+        self.assertIs(selector.select(), a)
+
+        selector.record_failure(a)
+        self.assertIs(selector.select(), b)
+
+        # with every circuit open an endpoint is still returned
+        selector.record_failure(b)
+        selector.record_failure(b)
+        self.assertIn(selector.select(), [a, b])
+
+    def test_success_closes_circuit(self):
+        selector = EndpointSelector(['http://a'], failurethreshold=1)
+        (a, ) = selector.Endpoints
+
+        selector.record_failure(a)
+        self.assertGreater(a.OpenUntil, 0)
+
+        selector.record_success(a, 0.2)
+        self.assertEquals(a.Failures, 0)
+        self.assertEquals(a.OpenUntil, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.latency_topology import LatencyTopology
+
+
+class _Node(object):
+    def __init__(self, identifier):
+        self.Identifier = identifier
+
+
+class _Ledger(object):
+    def __init__(self):
+        self.Dropped = []
+
+    def drop_node(self, identifier):
+        self.Dropped.append(identifier)
+
+
+class _Connector(object):
+    def __init__(self, rtts):
+        self.RoundTripTimes = rtts
+
+
+class TestLatencyTopology(unittest.TestCase):
+    def _topology(self, rtts, released):
+        return LatencyTopology(_Ledger(), _Connector(rtts), lambda: [],
+                               released.append, locallinks=2, longlinks=1)
+
+    def test_initial_links(self):
+        released = []
+        topology = self._topology({}, released)
+        candidates = [_Node(n) for n in ['a', 'b', 'c', 'd', 'e']]
+        probed = {'a': 0.3, 'b': 0.01, 'c': 0.05, 'd': 0.2}
+
+        topology._select(probed, {}, candidates)
+
+        self.assertEquals(topology.Local, set(['b', 'c']))
+        self.assertEquals(len(topology.Long), 1)
+        self.assertTrue(topology.Long.issubset(set(['a', 'd'])))
+        self.assertEquals(len(released), 1)
+        self.assertEquals(topology.Ledger.Dropped, ['e'])
+
+    def test_replace_slowest_local_link(self):
+        released = []
+        connected = dict((n, _Node(n)) for n in ['a', 'b', 'c'])
+        topology = self._topology({'a': 0.1, 'b': 0.2, 'c': 0.5}, released)
+        topology.Local = set(['a', 'b'])
+        topology.Long = set(['c'])
+
+        # within the margin of the slowest link, no change
+        candidates = [_Node('d')]
+        topology._select({'d': 0.18}, connected, candidates)
+        self.assertEquals(topology.Local, set(['a', 'b']))
+        self.assertEquals([p.Identifier for p in released], ['d'])
+
+        # clearly faster, replaces the slowest local link
+        del released[:]
+        candidates = [_Node('e')]
+        topology._select({'e': 0.05}, connected, candidates)
+        self.assertEquals(topology.Local, set(['a', 'e']))
+        self.assertEquals(topology.Long, set(['c']))
+        self.assertEquals([p.Identifier for p in released], ['b'])
+
+    def test_lost_links(self):
+        released = []
+        connected = {'a': _Node('a')}
+        topology = self._topology({'a': 0.1}, released)
+        topology.Local = set(['a', 'b'])
+        topology.Long = set(['c'])
+
+        topology._select({}, connected, [])
+        self.assertEquals(topology.Local, set(['a']))
+        self.assertEquals(topology.Long, set())
+        self.assertEquals(released, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
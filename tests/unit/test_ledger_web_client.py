@@ -13,10 +13,15 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import socket
 import unittest
 
 from ledger.transaction import endpoint_registry
+from txnserver import async_ledger_web_client
+from txnserver import connection_pool
+from txnserver import failover
 from txnserver import ledger_web_client
+from txnserver import state_snapshot
 
 
 class TestLedgerWebCLient(unittest.TestCase):
@@ -43,6 +48,128 @@ class TestLedgerWebCLient(unittest.TestCase):
             "http://localhost:8800/store/EndpointRegistryTransaction/t1"
             "?blockid=b2")
 
+        self.assertEquals(
+            lwc.store_url(endpoint_registry.EndpointRegistryTransaction, '*',
+                          'b2', delta=True),
+            "http://localhost:8800/store/EndpointRegistryTransaction/*"
+            "?blockid=b2&delta=1")
+
+        self.assertEquals(
+            lwc.store_url(endpoint_registry.EndpointRegistryTransaction,
+                          domain='/LotteryValidator'),
+            "http://localhost:8800/store/EndpointRegistryTransaction"
+            "?domain=%2FLotteryValidator")
+
+    def test_multiple_urls(self):
+        lwc = ledger_web_client.LedgerWebClient(
+            ["http://localhost:8800", "http://localhost:8801"])
+
+        self.assertEquals(lwc.LedgerURL, "http://localhost:8800")
+        self.assertEquals(len(lwc.Endpoints), 2)
+
+        self.assertEquals(
+            lwc._rebase_url(lwc.block_url('b1'), "http://localhost:8801"),
+            "http://localhost:8801/block/b1")
+        self.assertEquals(
+            lwc._rebase_url(lwc.block_list_url(1), "http://localhost:8801"),
+            "http://localhost:8801/block?blockcount=1")
+
+    def test_url_path_prefix(self):
+        lwc = ledger_web_client.LedgerWebClient(
+            ["http://localhost:8800", "https://proxy/validator/"])
+
+        self.assertEquals(
+            lwc._rebase_url(lwc.block_url('b1'), "https://proxy/validator/"),
+            "https://proxy/validator/block/b1")
+
+        lwc = ledger_web_client.LedgerWebClient(
+            ["http://proxy/v1", "http://localhost:8801"])
+        self.assertEquals(
+            lwc._rebase_url(lwc.block_list_url(1), "http://localhost:8801"),
+            "http://localhost:8801/block?blockcount=1")
+        self.assertEquals(
+            lwc._rebase_url(lwc.block_url('b1'), "http://proxy/v1"),
+            "http://proxy/v1/block/b1")
+
+    def test_post_not_resent(self):
+        lwc = ledger_web_client.LedgerWebClient(
+            ["http://localhost:8800", "http://localhost:8801"],
+            retry=failover.RetryPolicy(retries=2, initialdelay=0.0))
+
+        requests = []
+
+        class _Pool(object):
+            def __init__(self, error):
+                self.Error = error
+
+            def request(self, method, url, *args, **kwargs):
+                requests.append(url)
+                raise self.Error
+
+        # the validator may have accepted a posted message before the
+        # response failed, it is not sent to the other validator
+        lwc.ConnectionPool = _Pool(socket.timeout('timed out'))
+        with self.assertRaises(ledger_web_client.MessageException) as cm:
+            lwc._request('POST', lwc.message_forward_url(), 'data')
+        self.assertNotIsInstance(cm.exception,
+                                 ledger_web_client.EndpointException)
+        self.assertEquals(len(requests), 1)
+
+        # a message that was never sent is retried
+        del requests[:]
+        lwc.ConnectionPool = _Pool(
+            connection_pool.ConnectionFailed('connection refused'))
+        with self.assertRaises(ledger_web_client.EndpointException):
+            lwc._request('POST', lwc.message_forward_url(), 'data')
+        self.assertEquals(len(requests), 3)
+
+    def test_no_url(self):
+        lwc = ledger_web_client.LedgerWebClient(None)
+
+        self.assertIsNone(lwc.LedgerURL)
+        self.assertEquals(len(lwc.Endpoints), 0)
+
+    def test_async_client(self):
+        lwc = async_ledger_web_client.AsyncLedgerWebClient(
+            "http://localhost:8800")
+
+        # the async client shares the urls but not the blocking only api
+        self.assertEquals(
+            lwc.store_url(endpoint_registry.EndpointRegistryTransaction,
+                          't1'),
+            "http://localhost:8800/store/EndpointRegistryTransaction/t1")
+        self.assertFalse(hasattr(lwc, 'iter_store'))
+        self.assertFalse(hasattr(lwc, 'get_snapshot'))
+
+    def test_snapshot_stream_closed(self):
+        lwc = ledger_web_client.LedgerWebClient("http://localhost:8800")
+
+        stores = {'/s': {'a': 1}}
+        snapshot = {'BlockID': 'b2', 'Created': 0,
+                    'Digest': state_snapshot.snapshot_digest(stores),
+                    'Stores': stores}
+        lwc._geturl = lambda url: snapshot
+
+        closed = []
+
+        def _blocks():
+            try:
+                for blockid in ['b3', 'b2', 'b1']:
+                    yield blockid
+            finally:
+                closed.append(True)
+
+        lwc.iter_block_list = _blocks
+        self.assertEquals(lwc.get_snapshot(), snapshot)
+        self.assertEquals(closed, [True])
+
+    def test_snapshot_url(self):
+        lwc = ledger_web_client.LedgerWebClient("http://localhost:8800/")
+
+        self.assertEquals(lwc.snapshot_url(), "http://localhost:8800/snapshot")
+        self.assertEquals(lwc.snapshot_url('b1'),
+                          "http://localhost:8800/snapshot/b1")
+
 
 if __name__ == '__main__':
     unittest.main()
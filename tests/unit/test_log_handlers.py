@@ -0,0 +1,222 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+from txnserver.log_handlers import CompressingRotatingFileHandler
+from txnserver.log_handlers import JsonFormatter, QueueHandler
+from txnserver.log_handlers import RateLimitFilter
+
+
+class _Target(logging.Handler):
+    def __init__(self, gate=None):
+        logging.Handler.__init__(self)
+        self.Gate = gate
+        self.Messages = []
+
+    def emit(self, record):
+        if self.Gate:
+            self.Gate.wait()
+        self.Messages.append(self.format(record))
+
+
+def _record(msg, *args):
+    return logging.LogRecord('test', logging.INFO, __file__, 0, msg, args,
+                             None)
+
+
+class TestQueueHandler(unittest.TestCase):
+    def test_write(self):
+        target = _Target()
+        handler = QueueHandler(target)
+
+        values = ['a']
+        handler.handle(_record('value %s', values))
+        values.append('b')
+        handler.flush()
+
+        # the message is formatted when it is logged
+        self.assertEquals(target.Messages, ["value ['a']"])
+        handler.close()
+
+    def test_drop(self):
+        gate = threading.Event()
+        target = _Target(gate)
+        handler = QueueHandler(target, maxsize=2, overflow='drop')
+
+        # the writer holds one record while waiting on the gate, the queue
+        # holds two more
+        for i in range(10):
+            handler.handle(_record('record %d', i))
+        self.assertTrue(handler.Dropped >= 7)
+        dropped = handler.Dropped
+
+        gate.set()
+        handler.flush()
+        handler.handle(_record('after'))
+        handler.flush()
+
+        # every dropped record is reported, possibly over several notices
+        notices = [m for m in target.Messages if m.startswith('log queue')]
+        self.assertEquals(sum(int(m.split()[4]) for m in notices), dropped)
+        self.assertEquals(len(target.Messages) - len(notices),
+                          10 - dropped + 1)
+        self.assertEquals(target.Messages[-1], 'after')
+        handler.close()
+
+    def test_block(self):
+        target = _Target()
+        handler = QueueHandler(target, maxsize=1, overflow='block')
+        for i in range(50):
+            handler.handle(_record('record %d', i))
+        handler.close()
+
+        self.assertEquals(handler.Dropped, 0)
+        self.assertEquals(len(target.Messages), 50)
+
+    def test_exception(self):
+        target = _Target()
+        handler = QueueHandler(target)
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            record = logging.LogRecord('test', logging.ERROR, __file__, 0,
+                                       'failed', None, sys.exc_info())
+        handler.handle(record)
+        handler.flush()
+
+        self.assertIn('ValueError: bad value', target.Messages[0])
+        handler.close()
+
+    def test_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            QueueHandler(_Target(), overflow='wait')
+
+
+class TestRateLimitFilter(unittest.TestCase):
+    def _passed(self, ratefilter, records):
+        return [r.getMessage() for r in records if ratefilter.filter(r)]
+
+    def test_limit(self):
+        ratefilter = RateLimitFilter(2, burst=3)
+        records = [_record('value %d', i) for i in range(10)]
+        for record in records:
+            record.created = 100.0
+
+        self.assertEquals(self._passed(ratefilter, records),
+                          ['value 0', 'value 1', 'value 2'])
+        self.assertEquals(ratefilter.Suppressed, 7)
+
+        # the count of suppressed records is added to the next one passed
+        record = _record('value %d', 10)
+        record.created = 100.5
+        self.assertEquals(self._passed(ratefilter, [record]),
+                          ['value 10 [7 similar records suppressed]'])
+
+    def test_levels(self):
+        ratefilter = RateLimitFilter(1, burst=1)
+        records = []
+        for level in [logging.DEBUG, logging.DEBUG, logging.INFO,
+                      logging.WARNING, logging.WARNING]:
+            record = logging.LogRecord('test', level, __file__, 0,
+                                       logging.getLevelName(level), None, None)
+            record.created = 100.0
+            records.append(record)
+
+        # each level has its own limit, warnings are not limited
+        self.assertEquals(self._passed(ratefilter, records),
+                          ['DEBUG', 'INFO', 'WARNING', 'WARNING'])
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_format(self):
+        record = _record('value %d', 3)
+        record.fields = {'BlockID': 'b1'}
+
+        entry = json.loads(JsonFormatter('base000').format(record))
+        self.assertEquals(entry['Message'], 'value 3')
+        self.assertEquals(entry['Level'], 'INFO')
+        self.assertEquals(entry['LevelNo'], logging.INFO)
+        self.assertEquals(entry['Module'], 'test_log_handlers')
+        self.assertEquals(entry['Node'], 'base000')
+        self.assertEquals(entry['Fields'], {'BlockID': 'b1'})
+        self.assertNotIn('Exception', entry)
+
+    def test_exception(self):
+        try:
+            raise ValueError('bad value')
+        except ValueError:
+            record = logging.LogRecord('test', logging.ERROR, __file__, 0,
+                                       'failed', None, sys.exc_info())
+
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertIn('ValueError: bad value', entry['Exception'])
+        self.assertNotIn('Node', entry)
+
+
+class TestCompressingRotatingFileHandler(unittest.TestCase):
+    def setUp(self):
+        self.Directory = tempfile.mkdtemp()
+        self.FileName = os.path.join(self.Directory, 'validator.log')
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def test_rotate_by_size(self):
+        handler = CompressingRotatingFileHandler(self.FileName, maxbytes=100,
+                                                 backupcount=2)
+        for i in range(30):
+            handler.handle(_record('record %02d with some padding', i))
+        handler.close()
+
+        rotated = handler.rotated_files()
+        self.assertEquals(len(rotated), 2)
+        for filename in rotated:
+            self.assertTrue(filename.endswith('.gz'))
+            with gzip.open(filename) as fp:
+                self.assertIn('record', fp.read())
+
+        with open(self.FileName) as fp:
+            self.assertIn('record 29', fp.read())
+
+    def test_rotate_by_time(self):
+        handler = CompressingRotatingFileHandler(self.FileName, interval=60,
+                                                 compress=False)
+        record = _record('first')
+        handler.handle(record)
+
+        record = _record('second')
+        record.created += 61
+        handler.handle(record)
+        handler.close()
+
+        rotated = handler.rotated_files()
+        self.assertEquals(len(rotated), 1)
+        with open(rotated[0]) as fp:
+            self.assertEquals(fp.read(), 'first\n')
+        with open(self.FileName) as fp:
+            self.assertEquals(fp.read(), 'second\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
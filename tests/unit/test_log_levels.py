@@ -0,0 +1,62 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import logging
+import unittest
+
+from txnserver.log_levels import LogLevelController
+
+
+class TestLogLevelController(unittest.TestCase):
+    def setUp(self):
+        self.Logger = logging.getLogger('test_log_levels.module')
+        self.Logger.setLevel(logging.WARNING)
+        self.Controller = LogLevelController()
+
+    def tearDown(self):
+        self.Controller.revert('test_log_levels.module')
+
+    def test_set_and_revert(self):
+        self.Controller.set_level('debug', 'test_log_levels.module')
+        self.assertEquals(self.Logger.level, logging.DEBUG)
+
+        # the original level is kept across several changes
+        self.Controller.set_level('INFO', 'test_log_levels.module')
+        self.assertEquals(self.Controller.dump()['Levels'],
+                          {'test_log_levels.module': 'INFO'})
+
+        self.Controller.revert('test_log_levels.module')
+        self.assertEquals(self.Logger.level, logging.WARNING)
+        self.assertEquals(self.Controller.dump()['Levels'], {})
+
+    def test_duration(self):
+        self.Controller.set_level('DEBUG', 'test_log_levels.module',
+                                  duration=60)
+        reverts = self.Controller.dump()['Reverts']
+        self.assertTrue(0 < reverts['test_log_levels.module'] <= 60)
+
+        # a change without a duration cancels the pending revert
+        self.Controller.set_level('DEBUG', 'test_log_levels.module')
+        self.assertEquals(self.Controller.dump()['Reverts'], {})
+        self.assertEquals(self.Logger.level, logging.DEBUG)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            self.Controller.set_level('VERBOSE', 'test_log_levels.module')
+        self.assertEquals(self.Logger.level, logging.WARNING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from txnserver.peer_cache import PeerCache
+
+
+class TestPeerCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'base000-peers.js')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _peer(self, name, rtt):
+        return {'Identifier': name + 'id', 'Name': name,
+                'Host': '127.0.0.1', 'Port': 8801, 'RTT': rtt}
+
+    def test_missing_file(self):
+        self.assertEquals(PeerCache(self.filename).load(), [])
+
+    def test_save_and_load(self):
+        cache = PeerCache(self.filename)
+        cache.save([self._peer('slow', 0.5), self._peer('unknown', None),
+                    self._peer('fast', 0.01)])
+
+        names = [p['Name'] for p in cache.load()]
+        self.assertEquals(names, ['fast', 'slow', 'unknown'])
+        self.assertFalse(os.path.exists(self.filename + '.tmp'))
+
+    def test_empty_save_keeps_previous(self):
+        cache = PeerCache(self.filename)
+        cache.save([self._peer('fast', 0.01)])
+        cache.save([])
+        self.assertEquals(len(cache.load()), 1)
+
+    def test_maximum_peers(self):
+        cache = PeerCache(self.filename, maxpeers=2)
+        cache.save([self._peer('p{0}'.format(i), i) for i in range(5)])
+        self.assertEquals([p['Name'] for p in cache.load()], ['p0', 'p1'])
+
+    def test_stale_and_corrupt(self):
+        with open(self.filename, 'w') as fp:
+            json.dump({'Saved': time.time() - 3600,
+                       'Peers': [self._peer('old', 0.1)]}, fp)
+        self.assertEquals(PeerCache(self.filename, maxage=60).load(), [])
+
+        with open(self.filename, 'w') as fp:
+            fp.write('{"Peers": [')
+        self.assertEquals(PeerCache(self.filename).load(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from twisted.internet import task
+
+from gossip.messages import connect_message
+from txnserver import peer_connector, startup_timer
+from txnserver import validator
+from txnserver.failover import RetryPolicy
+from txnserver.peer_connector import PeerConnectionFailed, PeerConnector
+
+
+class _Node(object):
+    def __init__(self, identifier):
+        self.Identifier = identifier
+
+    def __str__(self):
+        return self.Identifier
+
+
+class _Message(object):
+    def __init__(self, originator):
+        self.OriginatorID = originator
+
+
+class _Ledger(object):
+    def __init__(self):
+        self.Known = []
+        self.Connected = []
+        self.Replies = []
+
+        msgtype = connect_message.ConnectReplyMessage.MessageType
+        self.MessageHandlerMap = {
+            msgtype: (connect_message.ConnectReplyMessage, self._handler)
+        }
+
+    def peer_list(self, allflag=False):
+        return self.Known if allflag else self.Connected
+
+    def register_message_handler(self, msgclass, handler):
+        self.MessageHandlerMap[msgclass.MessageType] = (msgclass, handler)
+
+    def reply(self, peer, accept=True):
+        msgtype = connect_message.ConnectReplyMessage.MessageType
+        (_, handler) = self.MessageHandlerMap[msgtype]
+        if accept:
+            self.Connected.append(peer)
+        handler(_Message(peer.Identifier), self)
+
+    def _handler(self, msg, ledger):
+        self.Replies.append(msg.OriginatorID)
+
+
+class _ConnectorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.Clock = task.Clock()
+        self.Sent = []
+
+        self._reactor = peer_connector.reactor
+        self._send = connect_message.send_connection_request
+        peer_connector.reactor = self.Clock
+        connect_message.send_connection_request = \
+            lambda ledger, peer: self.Sent.append(
+                (self.Clock.seconds(), peer.Identifier))
+
+        self.Ledger = _Ledger()
+        self.Connector = PeerConnector(
+            self.Ledger, timeout=2.0,
+            retry=RetryPolicy(retries=2, initialdelay=1.0, jitter=0.0))
+
+    def tearDown(self):
+        peer_connector.reactor = self._reactor
+        connect_message.send_connection_request = self._send
+
+    def _result(self, d):
+        results = []
+        d.addBoth(results.append)
+        return results
+
+
+class TestPeerConnector(_ConnectorTestCase):
+    def test_reply_confirms_connection(self):
+        peers = [_Node('a'), _Node('b')]
+        results = self._result(self.Connector.connect(peers))
+        self.assertEquals(self.Sent, [(0, 'a'), (0, 'b')])
+
+        # the ledger's own handler still sees the reply
+        self.Ledger.reply(peers[1])
+        self.assertEquals(self.Ledger.Replies, ['b'])
+        self.assertEquals(results, [peers[1]])
+        self.assertIn('b', self.Connector.RoundTripTimes)
+
+        # a connected peer is reported without sending a request
+        results = self._result(self.Connector.connect([peers[1]]))
+        self.assertEquals(results, [peers[1]])
+        self.assertEquals(len(self.Sent), 2)
+
+        self.Connector.cancel()
+
+    def test_retry_backoff(self):
+        peer = _Node('a')
+        results = self._result(self.Connector.connect([peer]))
+
+        # each attempt times out after 2s, the retries follow after 1s
+        # and 2s
+        self.Clock.advance(2.0)
+        self.Clock.advance(1.0)
+        self.assertEquals(self.Sent, [(0, 'a'), (3.0, 'a')])
+        self.Clock.advance(2.0)
+        self.Clock.advance(2.0)
+        self.assertEquals(self.Sent, [(0, 'a'), (3.0, 'a'), (7.0, 'a')])
+        self.assertEquals(results, [])
+
+        # the reply to a resent request does not measure the round trip
+        self.Ledger.reply(peer)
+        self.assertEquals(results, [peer])
+        self.assertNotIn('a', self.Connector.RoundTripTimes)
+
+    def test_attempts_exhausted(self):
+        results = self._result(self.Connector.connect([_Node('a')]))
+
+        self.Clock.pump([2.0, 1.0, 2.0, 2.0, 2.0])
+        self.assertEquals(len(self.Sent), 3)
+        self.assertEquals(len(results), 1)
+        self.assertTrue(results[0].check(PeerConnectionFailed))
+        self.assertEquals(self.Clock.getDelayedCalls(), [])
+
+    def test_rejected_reply(self):
+        peer = _Node('a')
+        results = self._result(self.Connector.connect([peer]))
+
+        self.Ledger.reply(peer, accept=False)
+        self.assertTrue(results[0].check(PeerConnectionFailed))
+        self.assertEquals(self.Clock.getDelayedCalls(), [])
+
+    def test_no_peers(self):
+        results = self._result(self.Connector.connect([]))
+        self.assertTrue(results[0].check(PeerConnectionFailed))
+
+
+class TestWaitForConnection(_ConnectorTestCase):
+    def _validator(self):
+        # only the attributes used by wait_for_connection are set up
+        val = validator.Validator.__new__(validator.Validator)
+        val.Ledger = self.Ledger
+        val.PeerConnector = self.Connector
+        val.StartupTimer = startup_timer.StartupTimer()
+        val.StartupTimer.start('connect')
+        val._connectionattempts = 1
+        val.Topology = []
+        val.Shutdown = []
+        val.initialize_ledger_topology = val.Topology.append
+        val.shutdown = lambda: val.Shutdown.append(True)
+        return val
+
+    def test_connected(self):
+        peer = _Node('a')
+        self.Ledger.Known.append(peer)
+        val = self._validator()
+
+        callback = object()
+        val.wait_for_connection(callback)
+        self.Ledger.reply(peer)
+
+        self.assertEquals(val.Topology, [callback])
+        self.assertEquals(val.Shutdown, [])
+
+    def test_failed(self):
+        self.Ledger.Known.append(_Node('a'))
+        val = self._validator()
+
+        val.wait_for_connection(None)
+        self.Clock.pump([2.0, 1.0, 2.0, 2.0, 2.0])
+
+        self.assertEquals(val.Topology, [])
+        self.assertEquals(val.Shutdown, [True])
+        self.assertEquals(val._connectionattempts, 0)
+
+
+class _ReconnectManager(object):
+    def __init__(self):
+        self.Disconnected = []
+
+    def peer_disconnected(self, peerid):
+        self.Disconnected.append(peerid)
+
+
+class TestReleasePeer(unittest.TestCase):
+    def test_release(self):
+        val = validator.Validator.__new__(validator.Validator)
+        val._releasedpeers = set()
+        val.ReconnectManager = _ReconnectManager()
+
+        class _DropLedger(object):
+            def send_message(self, msg, peerid):
+                pass
+
+            def drop_node(self, peerid):
+                val.handle_node_disconnect_event(peerid)
+
+        val.Ledger = _DropLedger()
+
+        # the disconnect caused by the release is ignored, a later one is
+        # not, whether or not the release fired an event
+        val.release_peer(_Node('a'))
+        self.assertEquals(val.ReconnectManager.Disconnected, [])
+        val.handle_node_disconnect_event('a')
+        self.assertEquals(val.ReconnectManager.Disconnected, ['a'])
+
+        val.Ledger.drop_node = lambda peerid: None
+        val.release_peer(_Node('b'))
+        val.handle_node_disconnect_event('b')
+        self.assertEquals(val.ReconnectManager.Disconnected, ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
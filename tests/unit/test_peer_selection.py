@@ -0,0 +1,60 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.peer_selection import measured_rtt, select_by_latency
+
+
+class _Peer(object):
+    def __init__(self, identifier):
+        self.Identifier = identifier
+
+
+class _Connector(object):
+    def __init__(self, rtts):
+        self.RoundTripTimes = rtts
+
+
+class TestPeerSelection(unittest.TestCase):
+    def test_fastest_only(self):
+        rtts = {'a': 0.3, 'b': 0.01, 'c': None, 'd': 0.05}
+        self.assertEquals(select_by_latency(rtts, 2, 0.0), ['b', 'd'])
+
+    def test_random_fraction(self):
+        rtts = dict(('p{0}'.format(i), i * 0.01) for i in range(10))
+        for _ in range(20):
+            selected = select_by_latency(rtts, 4, 0.25)
+            self.assertEquals(len(selected), 4)
+            self.assertEquals(len(set(selected)), 4)
+            self.assertEquals(selected[:3], ['p0', 'p1', 'p2'])
+            self.assertNotIn(selected[3], selected[:3])
+
+    def test_fewer_candidates(self):
+        rtts = {'a': 0.2, 'b': 0.1}
+        self.assertEquals(sorted(select_by_latency(rtts, 3, 0.25)),
+                          ['a', 'b'])
+        self.assertEquals(select_by_latency({}, 3), [])
+
+    def test_measured_rtt(self):
+        connector = _Connector({'a': 0.2})
+
+        self.assertEquals(measured_rtt(_Peer('a'), connector), 0.2)
+        self.assertIsNone(measured_rtt(_Peer('b'), connector))
+        self.assertIsNone(measured_rtt(_Peer('a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import time
+import unittest
+
+from twisted.internet import defer, task
+
+from txnserver import reconnect_manager
+from txnserver.reconnect_manager import ReconnectManager
+
+
+class _Node(object):
+    def __init__(self, name):
+        self.Name = name
+        self.Identifier = name + 'id'
+
+    def __str__(self):
+        return self.Name
+
+
+class _Ledger(object):
+    def __init__(self, peers):
+        self.LocalNode = _Node('local')
+        self.Peers = peers
+        self.NodeMap = dict((p.Identifier, p) for p in peers)
+        self.Added = []
+
+    def peer_list(self):
+        return list(self.Peers)
+
+    def add_node(self, peer):
+        self.Added.append(peer.Name)
+
+
+class _Connector(object):
+    def connect(self, peers):
+        return defer.Deferred()
+
+
+class TestReconnectManager(unittest.TestCase):
+    def _manager(self, connected, known, target=3):
+        ledger = _Ledger(connected)
+        self.updates = []
+        manager = ReconnectManager(ledger, _Connector(),
+                                   lambda: self.updates.append(1),
+                                   target=target, minimum=1)
+        manager.add_peers(connected + known)
+        return (ledger, manager)
+
+    def test_topology_update_at_minimum(self):
+        (a, b) = [_Node(n) for n in 'ab']
+        (ledger, manager) = self._manager([a], [b])
+
+        # a node that simply has the minimum reconnects peer by peer
+        manager.check()
+        self.assertEquals(self.updates, [])
+        self.assertEquals(ledger.Added, ['b'])
+
+    def test_topology_update_after_drop(self):
+        (a, b, c) = [_Node(n) for n in 'abc']
+        (ledger, manager) = self._manager([a, b], [c])
+        manager.check()
+
+        ledger.Peers = [a]
+        manager.peer_disconnected(b.Identifier)
+        manager.check()
+        self.assertEquals(self.updates, [1])
+
+        # without another drop the update is not repeated
+        manager.check()
+        self.assertEquals(self.updates, [1])
+
+    def test_topology_update_backoff(self):
+        (ledger, manager) = self._manager([], [_Node('a')])
+
+        manager.check()
+        self.assertEquals(self.updates, [1])
+        self.assertTrue(manager.NextUpdate > time.time())
+
+        # below the minimum the update is retried only after the backoff
+        manager.check()
+        self.assertEquals(self.updates, [1])
+
+        manager.NextUpdate = 0.0
+        manager.check()
+        self.assertEquals(self.updates, [1, 1])
+        self.assertEquals(manager.TopologyUpdates, 2)
+
+        # recovery above the minimum resets the backoff
+        ledger.Peers = [_Node('b'), _Node('c')]
+        manager.check()
+        self.assertEquals(manager.TopologyUpdates, 0)
+
+    def test_prefer_healthy_peers(self):
+        (a, b, c, d, e) = [_Node(n) for n in 'abcde']
+        (ledger, manager) = self._manager([a, b], [c, d, e], target=4)
+
+        manager.History[c.Identifier].Failures = 3
+        manager.History[d.Identifier].LastConnected = time.time() - 60
+        manager.check()
+
+        self.assertEquals(self.updates, [])
+        self.assertEquals(ledger.Added, ['d', 'e'])
+
+        # peers with an attempt in progress are not retried
+        manager.check()
+        self.assertEquals(ledger.Added, ['d', 'e', 'c'])
+
+    def test_backoff_after_disconnect(self):
+        (a, b, c, d) = [_Node(n) for n in 'abcd']
+        (ledger, manager) = self._manager([a, b, c], [d], target=4)
+
+        ledger.Peers = [a, b]
+        manager.peer_disconnected(c.Identifier)
+
+        history = manager.History[c.Identifier]
+        self.assertEquals(history.Failures, 1)
+        self.assertTrue(history.NextAttempt > time.time())
+
+        manager.check()
+        self.assertEquals(ledger.Added, ['d'])
+
+    def test_late_candidates(self):
+        (a, b) = [_Node(n) for n in 'ab']
+        (ledger, manager) = self._manager([a], [])
+
+        clock = task.Clock()
+        (reactor, reconnect_manager.reactor) = \
+            (reconnect_manager.reactor, clock)
+        try:
+            manager.start()
+
+            # peers found after the start are tried before the next
+            # interval
+            manager.add_peers([b])
+            manager.check_soon()
+            clock.advance(3.0)
+            self.assertEquals(ledger.Added, ['b'])
+
+            manager.stop()
+        finally:
+            reconnect_manager.reactor = reactor
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import socket
+import time
+import unittest
+
+from twisted.internet import defer
+
+from txnserver import resolver
+
+
+class TestHostResolver(unittest.TestCase):
+    def setUp(self):
+        self._gethostbyname = socket.gethostbyname
+        self._resolve = resolver.reactor.resolve
+        self.Calls = []
+        self.Lookups = {}
+
+        def _gethostbyname(host):
+            self.Calls.append(host)
+            if host == 'bad':
+                raise socket.gaierror('unknown host')
+            return '10.0.0.{0}'.format(len(host))
+
+        def _resolve(host):
+            self.Calls.append(host)
+            self.Lookups[host] = defer.Deferred()
+            return self.Lookups[host]
+
+        socket.gethostbyname = _gethostbyname
+        resolver.reactor.resolve = _resolve
+
+    def tearDown(self):
+        socket.gethostbyname = self._gethostbyname
+        resolver.reactor.resolve = self._resolve
+
+    def test_blocking_cache(self):
+        hr = resolver.HostResolver(ttl=60.0)
+        self.assertEquals(hr.gethostbyname('a'), '10.0.0.1')
+        self.assertEquals(hr.gethostbyname('a'), '10.0.0.1')
+        self.assertEquals(self.Calls, ['a'])
+        self.assertEquals((hr.Hits, hr.Misses), (1, 1))
+
+        # expired entries are resolved again
+        hr._cache['a'] = ('10.0.0.1', time.time() - 1)
+        hr.gethostbyname('a')
+        self.assertEquals(self.Calls, ['a', 'a'])
+
+    def test_prefetch(self):
+        hr = resolver.HostResolver()
+        hr.prefetch(['a', 'bb', 'a', 'bad', 'bb'])
+        self.assertEquals(sorted(self.Calls), ['a', 'bad', 'bb'])
+        self.assertEquals(hr.lookup('bb'), '10.0.0.2')
+        self.assertEquals(hr.lookup('bad'), None)
+
+        del self.Calls[:]
+        hr.prefetch(['a', 'bb'])
+        self.assertEquals(self.Calls, [])
+
+    def test_resolve_shares_lookups(self):
+        hr = resolver.HostResolver()
+        results = []
+        hr.resolve('a').addCallback(results.append)
+        hr.resolve('a').addCallback(results.append)
+        self.assertEquals(self.Calls, ['a'])
+
+        self.Lookups['a'].callback('10.0.0.9')
+        self.assertEquals(results, ['10.0.0.9', '10.0.0.9'])
+
+        hr.resolve('a').addCallback(results.append)
+        self.assertEquals(self.Calls, ['a'])
+        self.assertEquals(len(results), 3)
+
+    def test_resolve_failure(self):
+        hr = resolver.HostResolver()
+        results = []
+        errors = []
+        for _ in range(2):
+            hr.resolve('bad').addCallbacks(results.append, errors.append)
+
+        self.Lookups['bad'].errback(socket.gaierror('unknown host'))
+        self.assertEquals(results, [])
+        self.assertEquals(len(errors), 2)
+        self.assertTrue(errors[0].check(socket.gaierror))
+        self.assertEquals(hr.lookup('bad'), None)
+
+    def test_resolve_all(self):
+        hr = resolver.HostResolver()
+        results = []
+        hr.resolve_all(['a', 'b', 'a']).addCallback(results.append)
+        self.assertEquals(sorted(self.Calls), ['a', 'b'])
+
+        self.Lookups['a'].callback('10.0.0.1')
+        self.Lookups['b'].errback(socket.gaierror('unknown host'))
+        self.assertEquals(results, [{'a': '10.0.0.1'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
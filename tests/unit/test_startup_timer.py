@@ -0,0 +1,55 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.startup_timer import StartupTimer
+
+
+class TestStartupTimer(unittest.TestCase):
+    def test_phases(self):
+        timer = StartupTimer()
+        timer.start('configuration')
+        timer.start('ledger')
+        timer.stop('configuration')
+
+        # a phase is only started once
+        timer.start('configuration')
+
+        summary = timer.dump()
+        self.assertFalse(summary['Complete'])
+        self.assertEquals([p['Name'] for p in summary['Phases']],
+                          ['configuration', 'ledger'])
+        self.assertEquals([p['Complete'] for p in summary['Phases']],
+                          [True, False])
+
+    def test_complete(self):
+        timer = StartupTimer()
+        timer.start('connect')
+        timer.complete()
+
+        # phases after startup are ignored
+        timer.start('connect2')
+        timer.stop('connect')
+
+        summary = timer.dump()
+        self.assertTrue(summary['Complete'])
+        self.assertEquals(len(summary['Phases']), 1)
+        self.assertTrue(summary['Phases'][0]['Complete'])
+        self.assertTrue(summary['Total'] >= summary['Phases'][0]['Duration'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from twisted.internet import defer
+
+from txnserver import state_snapshot
+from txnserver.state_snapshot import SnapshotManager
+from txnserver.state_snapshot import SnapshotVerifyError
+from txnserver.state_snapshot import snapshot_digest
+from txnserver.state_snapshot import verify_snapshot
+
+
+class _Store(object):
+    def __init__(self, values):
+        self.Values = values
+
+    def compose(self):
+        return dict(self.Values)
+
+
+class _StoreMap(object):
+    def __init__(self, stores):
+        self.TransactionStores = stores
+
+    def get_transaction_store(self, name):
+        return self.TransactionStores[name]
+
+
+class _GlobalStoreMap(object):
+    def __init__(self):
+        self.Blocks = {}
+
+    def get_block_store(self, blockid):
+        return self.Blocks.get(blockid)
+
+
+class _Ledger(object):
+    def __init__(self):
+        self.MostRecentCommitedBlockID = None
+        self.GlobalStoreMap = _GlobalStoreMap()
+
+    def commit(self, blockid, values):
+        self.MostRecentCommitedBlockID = blockid
+        self.GlobalStoreMap.Blocks[blockid] = _StoreMap(
+            {'/IntegerKeyTransaction': _Store(values)})
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+        # write the snapshots in the calling thread
+        self._defer_to_thread = state_snapshot.threads.deferToThread
+        state_snapshot.threads.deferToThread = defer.maybeDeferred
+
+    def tearDown(self):
+        state_snapshot.threads.deferToThread = self._defer_to_thread
+        shutil.rmtree(self.tempdir)
+
+    def _result(self, d):
+        results = []
+        d.addBoth(results.append)
+        return results[0]
+
+    def test_digest_is_canonical(self):
+        self.assertEquals(snapshot_digest({'/s': {'a': 1, 'b': 2}}),
+                          snapshot_digest({'/s': {'b': 2, 'a': 1}}))
+        self.assertNotEquals(snapshot_digest({'/s': {'a': 1}}),
+                             snapshot_digest({'/s': {'a': 2}}))
+
+    def test_verify(self):
+        stores = {'/s': {'a': 1}}
+        snapshot = {'BlockID': 'b1', 'Digest': snapshot_digest(stores),
+                    'Stores': stores}
+        verify_snapshot(snapshot, 'b1', snapshot['Digest'])
+
+        self.assertRaises(SnapshotVerifyError, verify_snapshot, snapshot,
+                          'b2')
+
+        snapshot['Stores'] = {'/s': {'a': 2}}
+        self.assertRaises(SnapshotVerifyError, verify_snapshot, snapshot)
+
+    def test_create_and_prune(self):
+        ledger = _Ledger()
+        manager = SnapshotManager(ledger, os.path.join(self.tempdir, 'snap'),
+                                  keep=2)
+        self.assertIsNone(self._result(manager.create()))
+
+        for (index, blockid) in enumerate(['b1', 'b2', 'b3']):
+            ledger.commit(blockid, {'a': index})
+            manifest = self._result(manager.create())
+            self.assertEquals(manifest['BlockID'], blockid)
+            os.utime(manager._filename(blockid), (index, index))
+
+        manager._prune()
+        self.assertIsNone(manager.load('b1'))
+
+        snapshot = manager.load('b3')
+        verify_snapshot(snapshot, 'b3', manager.Latest['Digest'])
+        self.assertEquals(snapshot['Stores'],
+                          {'/IntegerKeyTransaction': {'a': 2}})
+
+        # a new manager picks up the newest snapshot on disk
+        manager = SnapshotManager(ledger, manager.Directory)
+        self.assertEquals(manager.Latest['BlockID'], 'b3')
+
+    def test_failed_snapshot(self):
+        ledger = _Ledger()
+        manager = SnapshotManager(ledger, os.path.join(self.tempdir, 'snap'))
+
+        ledger.commit('b1', {'a': object()})
+        self.assertIsNone(self._result(manager._create()))
+        self.assertIsNone(manager.Latest)
+        self.assertEquals(os.listdir(manager.Directory), [])
+
+        # the next snapshot is still written
+        ledger.commit('b2', {'a': 1})
+        manifest = self._result(manager._create())
+        self.assertEquals(manifest['BlockID'], 'b2')
+        self.assertEquals(manager.Latest, manifest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.store_cache import StoreCache
+
+
+class TestStoreCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = StoreCache()
+        cache.set_block('b1')
+
+        self.assertEquals(cache.lookup('k1'), (False, None))
+        cache.insert('k1', {'v': 1})
+        self.assertEquals(cache.lookup('k1'), (True, {'v': 1}))
+
+        self.assertEquals(cache.Hits, 1)
+        self.assertEquals(cache.Misses, 1)
+
+    def test_invalidate_on_new_block(self):
+        cache = StoreCache()
+        cache.set_block('b1')
+        cache.insert('k1', 1)
+
+        cache.set_block('b1')
+        self.assertEquals(len(cache), 1)
+
+        cache.set_block('b2')
+        self.assertEquals(len(cache), 0)
+        self.assertEquals(cache.Invalidations, 1)
+        self.assertEquals(cache.BlockID, 'b2')
+
+    def test_lru_eviction(self):
+        cache = StoreCache(maxsize=2)
+        cache.set_block('b1')
+        cache.insert('k1', 1)
+        cache.insert('k2', 2)
+
+        # touch k1 so that k2 is the least recently used
+        cache.lookup('k1')
+        cache.insert('k3', 3)
+
+        self.assertEquals(cache.lookup('k2'), (False, None))
+        self.assertEquals(cache.lookup('k1'), (True, 1))
+        self.assertEquals(cache.lookup('k3'), (True, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
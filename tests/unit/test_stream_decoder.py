@@ -0,0 +1,96 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import json
+import unittest
+from StringIO import StringIO
+
+import cbor
+
+from txnserver.stream_decoder import iter_cbor, iter_json, StreamDecodeError
+
+
+class SlowReader(object):
+    """
+    File like object that returns at most a few bytes for every read.
+    """
+
+    def __init__(self, data, step=3):
+        self._fp = StringIO(data)
+        self._step = step
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._step
+        return self._fp.read(min(size, self._step))
+
+
+class TestIterCbor(unittest.TestCase):
+    def test_definite_array(self):
+        data = cbor.dumps(['b1', 'b2', {'k': [1, 2]}])
+        self.assertEquals(list(iter_cbor(SlowReader(data))),
+                          ['b1', 'b2', {'k': [1, 2]}])
+
+    def test_definite_map(self):
+        data = cbor.dumps({'k1': 1})
+        self.assertEquals(list(iter_cbor(StringIO(data))), [('k1', 1)])
+
+    def test_indefinite_array(self):
+        data = '\x9f' + cbor.dumps('a') + cbor.dumps(300) + '\xff'
+        self.assertEquals(list(iter_cbor(SlowReader(data))), ['a', 300])
+
+    def test_indefinite_map(self):
+        data = '\xbf' + cbor.dumps('k1') + cbor.dumps({'v': 1}) + \
+            cbor.dumps('k2') + cbor.dumps(2) + '\xff'
+        self.assertEquals(list(iter_cbor(SlowReader(data))),
+                          [('k1', {'v': 1}), ('k2', 2)])
+
+    def test_scalar(self):
+        self.assertEquals(list(iter_cbor(StringIO(cbor.dumps('x')))), ['x'])
+
+    def test_truncated(self):
+        data = '\x9f' + cbor.dumps('a')
+        with self.assertRaises(StreamDecodeError):
+            list(iter_cbor(StringIO(data)))
+
+
+class TestIterJson(unittest.TestCase):
+    def test_array(self):
+        value = ['b1', 12345, {'k': [1, 2]}, None]
+        self.assertEquals(list(iter_json(SlowReader(json.dumps(value)))),
+                          value)
+
+    def test_object(self):
+        value = {'k1': {'v': 10}, 'k2': 2048}
+        self.assertEquals(
+            dict(iter_json(SlowReader(json.dumps(value), step=2), 2)),
+            value)
+
+    def test_empty(self):
+        self.assertEquals(list(iter_json(StringIO(' [ ] '))), [])
+        self.assertEquals(list(iter_json(StringIO('{}'))), [])
+        self.assertEquals(list(iter_json(StringIO(''))), [])
+
+    def test_scalar(self):
+        self.assertEquals(list(iter_json(SlowReader('123456', 2), 2)),
+                          [123456])
+
+    def test_invalid(self):
+        with self.assertRaises(StreamDecodeError):
+            list(iter_json(StringIO('[1, 2')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+
+import unittest
+
+from txnserver.wait_time_tuner import WaitTimeTuner
+
+
+class TestWaitTimeTuner(unittest.TestCase):
+    def _observe(self, tuner, count, size, forks=0):
+        for i in range(count):
+            tuner.observe_block(30.0, size, i < forks)
+
+    def test_too_few_samples(self):
+        tuner = WaitTimeTuner(30.0)
+        self._observe(tuner, 4, 1000, forks=4)
+        self.assertEquals(tuner.recommend(16, 0.1, 1000), 30.0)
+
+    def test_forks_lengthen_wait_time(self):
+        tuner = WaitTimeTuner(30.0)
+        self._observe(tuner, 20, 10, forks=4)
+        self.assertAlmostEquals(tuner.fork_rate(), 0.2)
+
+        # the change is limited to a step of 25%
+        self.assertAlmostEquals(tuner.recommend(16, 0.1, 1000), 37.5)
+
+    def test_full_blocks_shorten_wait_time(self):
+        tuner = WaitTimeTuner(30.0, lower=5.0)
+        self._observe(tuner, 20, 1000)
+        self.assertAlmostEquals(tuner.recommend(16, 0.1, 1000), 22.5)
+
+        tuner = WaitTimeTuner(10.0, lower=5.0)
+        self._observe(tuner, 20, 1000)
+        recommended = tuner.recommend(16, 0.1, 1000)
+        self.assertTrue(7.5 < recommended < 8.0)
+
+        tuner = WaitTimeTuner(10.0, lower=9.0)
+        self._observe(tuner, 20, 1000)
+        self.assertAlmostEquals(tuner.recommend(16, 0.1, 1000), 9.0)
+
+    def test_partial_blocks_keep_wait_time(self):
+        tuner = WaitTimeTuner(30.0)
+        self._observe(tuner, 20, 100)
+        self.assertAlmostEquals(tuner.recommend(16, 0.1, 1000), 30.0)
+        self.assertEquals(tuner.dump()['Population'], 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,7 @@ import urllib2
 
 from gossip.common import json2dict, cbor2dict, dict2cbor
 from gossip.common import pretty_print_dict
+from txnserver import stream_decoder
 
 logger = logging.getLogger(__name__)
 
@@ -112,6 +113,43 @@ class IntegerKeyCommunication(object):
         else:
             return content
 
+    def itermsg(self, path):
+        """
+        Send an HTTP get request to the validator asking for a streamed
+        response, and generate the items of the returned list (or the
+        (key, value) tuples of the returned map) as they are decoded.
+        """
+
+        url = "{0}/{1}".format(self.BaseURL, path.strip('/'))
+        url += ('&' if '?' in url else '?') + 'stream=1'
+
+        logger.debug('stream content from url <%s>', url)
+
+        try:
+            request = urllib2.Request(url)
+            opener = urllib2.build_opener(self.ProxyHandler)
+            response = opener.open(request, timeout=10)
+
+        except urllib2.HTTPError as err:
+            logger.warn('operation failed with response: %s', err.code)
+            raise MessageException('operation failed with resonse: {0}'.format(
+                err.code))
+
+        except urllib2.URLError as err:
+            logger.warn('operation failed: %s', err.reason)
+            raise MessageException('operation failed: {0}'.format(err.reason))
+
+        except:
+            logger.warn('no response from server')
+            raise MessageException('no response from server')
+
+        try:
+            encoding = response.info().get('Content-Type')
+            for item in stream_decoder.iter_content(response, encoding):
+                yield item
+        finally:
+            response.close()
+
     def postmsg(self, msgtype, info):
         """
         Post a transaction message to the validator, parse the returning CBOR
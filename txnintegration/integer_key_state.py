@@ -38,4 +38,4 @@ class IntegerKeyState(IntegerKeyCommunication):
 
         logger.debug('fetch state from %s/%s/*', self.BaseURL, store)
 
-        self.State = self.getmsg("/store/{0}/*".format(store))
+        self.State = dict(self.itermsg("/store/{0}/*".format(store)))
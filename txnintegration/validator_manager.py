@@ -172,6 +172,15 @@ class ValidatorManager:
             reg = re.compile("^\[[\d:]*, ([\d]*), .*]")
             with open(self.logFile, 'r') as fin:
                 for line in fin:
+                    # json log lines carry the level number as a field
+                    if line.startswith('{'):
+                        try:
+                            if json.loads(line).get('LevelNo', 0) >= 50:
+                                return True
+                        except ValueError:
+                            pass
+                        continue
+
                     match = reg.search(line)
                     if match and int(match.group(1)) >= 50:
                         return True
@@ -40,8 +40,10 @@ from journal.messages import journal_debug
 from ledger.transaction import integer_key
 from ledger.transaction import endpoint_registry
 
-from txnserver import ledger_web_client, log_setup
+from txnserver import admin_messages, ledger_web_client, log_setup
+from txnserver.client_metrics import HistogramObserver
 from txnserver.config import get_validator_configuration
+from txnserver.store_cache import StoreCache
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +63,9 @@ class ClientController(cmd.Cmd):
         cmd.Cmd.__init__(self)
         self.prompt = 'client> '
         self.CurrentState = {}
-        self.LedgerWebClient = ledger_web_client.LedgerWebClient(baseurl)
+        self.Metrics = HistogramObserver()
+        self.LedgerWebClient = ledger_web_client.LedgerWebClient(
+            baseurl, cache=StoreCache(), observers=[self.Metrics])
 
         signingkey = generate_signing_key(
             wifstr=keystring) if keystring else generate_signing_key()
@@ -155,11 +159,12 @@ class ClientController(cmd.Cmd):
             state fetch --store <store>
             state keys
             state value --path <path>
+            state cache
         """
 
         pargs = args.split()
         if len(pargs) == 0:
-            print 'missing subcommand: fetch|keys|value'
+            print 'missing subcommand: fetch|keys|value|cache'
             return
 
         try:
@@ -191,6 +196,34 @@ class ClientController(cmd.Cmd):
 
                 print value
 
+            elif pargs[0] == 'cache':
+                print pretty_print_dict(
+                    self.LedgerWebClient.StoreCache.stats())
+
+        except Exception as e:
+            print 'an error occured processing {0}: {1}'.format(args, str(e))
+            return
+
+    def do_timings(self, args):
+        """
+        timings -- Show the latency of requests made to the validator
+            timings [--file <name>] [--reset]
+        """
+
+        try:
+            parser = argparse.ArgumentParser()
+            parser.add_argument('--file')
+            parser.add_argument('--reset', action='store_true')
+            options = parser.parse_args(args.split())
+
+            if options.file:
+                self.Metrics.write_json(options.file)
+            else:
+                print self.Metrics.dump_json()
+
+            if options.reset:
+                self.Metrics.reset()
+
         except Exception as e:
             print 'an error occured processing {0}: {1}'.format(args, str(e))
             return
@@ -363,6 +396,38 @@ class ClientController(cmd.Cmd):
         self.sign_and_post(shutdown_message.ShutdownMessage({}))
         return True
 
+    def do_reload(self, args):
+        """
+        reload -- Command to ask the validator pool to re-read the
+            configuration files and apply the flow control and consensus
+            parameters
+        """
+
+        self.sign_and_post(admin_messages.ReloadConfigurationMessage({}))
+
+    def do_loglevel(self, args):
+        """
+        loglevel -- Command to change the log level of the validator pool
+            loglevel <level> [--logger <module>] [--duration <seconds>]
+        """
+
+        pargs = args.split()
+        if len(pargs) == 0:
+            print 'missing log level'
+            return
+
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--logger', default='',
+                            help='Module logger, the root logger by default')
+        parser.add_argument('--duration', default=0, type=float,
+                            help='Seconds after which the level is reverted')
+        options = parser.parse_args(pargs[1:])
+
+        self.sign_and_post(admin_messages.SetLogLevelMessage(
+            {'Level': pargs[0].upper(),
+             'Logger': options.logger,
+             'Duration': options.duration}))
+
     def do_exit(self, args):
         """exit
         Shutdown the simulator and exit the command loop
@@ -26,31 +26,37 @@ from gossip.config import ConfigFileNotFound
 from gossip.config import InvalidSubstitutionKey
 from txnserver import log_setup, lottery_validator, voting_validator, web_api
 from txnserver.config import get_validator_configuration
+from txnserver.startup_timer import StartupTimer
 
 logger = logging.getLogger(__name__)
 
 CurrencyHost = os.environ.get("HOSTNAME", "localhost")
 
 
-def local_main(config, windows_service=False):
+def local_main(config, windows_service=False, timer=None, loader=None):
     """
     Implement the actual application logic for starting the
-    txnvalidator
+    txnvalidator; loader, if given, re-reads the configuration when the
+    validator is asked to reload it
     """
     ledgertype = config.get('LedgerType', 'lottery')
     if ledgertype == 'lottery':
         validator = lottery_validator.LotteryValidator(
             config,
-            windows_service=windows_service)
+            windows_service=windows_service,
+            timer=timer)
     elif ledgertype == 'voting':
         validator = voting_validator.VotingValidator(
             config,
-            windows_service=windows_service)
+            windows_service=windows_service,
+            timer=timer)
     else:
         warnings.warn('Unknown ledger type %s' % ledgertype)
         sys.exit(1)
 
-    web_api.initialize_web_server(config, validator.Ledger)
+    validator.ConfigurationLoader = loader
+
+    web_api.initialize_web_server(config, validator.Ledger, validator)
 
     # go through the list of transaction families that should be initialized in
     # this validator. the endpoint registry is always included
@@ -202,6 +208,9 @@ if os.name == "nt":
 
 
 def main(args, windows_service=False):
+    timer = StartupTimer()
+    timer.start('configuration')
+
     try:
         cfg = get_configuration(args)
     except ConfigFileNotFound, e:
@@ -235,7 +244,8 @@ def main(args, windows_service=False):
     else:
         logger.warn('no key file specified')
 
-    local_main(cfg, windows_service)
+    local_main(cfg, windows_service, timer,
+               loader=lambda: get_configuration(args))
 
 
 def main_wrapper():
@@ -13,5 +13,12 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
-__all__ = ['config', 'ledger_web_client', 'log_setup', 'lottery_validator',
-           'web_api', 'validator', 'voting_validator']
+__all__ = ['admin_messages', 'async_ledger_web_client',
+           'block_size_controller', 'client_metrics', 'config',
+           'connection_pool', 'endpoint_index', 'endpoint_tracker', 'failover',
+           'latency_topology', 'ledger_web_client', 'log_handlers',
+           'log_levels', 'log_setup', 'lottery_validator', 'peer_cache',
+           'peer_connector', 'peer_selection', 'reconnect_manager', 'resolver',
+           'startup_timer', 'state_snapshot', 'store_cache', 'stream_decoder',
+           'transfer_monitor', 'wait_time_tuner', 'web_api', 'validator',
+           'voting_validator']
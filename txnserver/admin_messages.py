@@ -0,0 +1,112 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module defines the administration messages handled by the validator,
+like the shutdown message they are only acted on when they originate from
+the administration node
+"""
+
+import logging
+
+from gossip import message
+
+logger = logging.getLogger(__name__)
+
+# the only node identifier from which administration messages are accepted
+AdministrationNode = None
+
+
+def register_message_handlers(journal, reload, setloglevel):
+    """
+    Register the administration message handlers.
+
+    Args:
+        journal (journal.Journal): the local ledger
+        reload (callable): re-reads the configuration and applies it
+        setloglevel (callable): called with the level, logger name and
+            duration of a log level change
+    """
+
+    def _reload_handler(msg, journal):
+        if not _from_administrator(msg):
+            return
+        reload()
+
+    def _log_level_handler(msg, journal):
+        if not _from_administrator(msg):
+            return
+        try:
+            setloglevel(msg.Level, msg.Logger, msg.Duration)
+        except ValueError as e:
+            logger.warn('unable to set log level; %s', str(e))
+
+    journal.register_message_handler(ReloadConfigurationMessage,
+                                     _reload_handler)
+    journal.register_message_handler(SetLogLevelMessage, _log_level_handler)
+
+
+def _from_administrator(msg):
+    if AdministrationNode is None or msg.OriginatorID != AdministrationNode:
+        logger.warn('%s received from non-administrator; %s',
+                    msg.MessageType, msg.OriginatorID[:8])
+        return False
+
+    return True
+
+
+class ReloadConfigurationMessage(message.Message):
+    """
+    Ask every validator to re-read its configuration files and apply the
+    parameters that can be changed while it is running.
+    """
+    MessageType = "/" + __name__ + "/ReloadConfiguration"
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(ReloadConfigurationMessage, self).__init__(minfo)
+
+        self.IsSystemMessage = False
+        self.IsForward = True
+        self.IsReliable = True
+
+
+class SetLogLevelMessage(message.Message):
+    """
+    Change the level of the root logger, or of the logger of one module, of
+    every validator; with a Duration the level is reverted after that many
+    seconds.
+    """
+    MessageType = "/" + __name__ + "/SetLogLevel"
+
+    def __init__(self, minfo=None):
+        if minfo is None:
+            minfo = {}
+        super(SetLogLevelMessage, self).__init__(minfo)
+
+        self.IsSystemMessage = False
+        self.IsForward = True
+        self.IsReliable = True
+
+        self.Level = minfo.get('Level', 'INFO')
+        self.Logger = minfo.get('Logger', '')
+        self.Duration = minfo.get('Duration', 0)
+
+    def dump(self):
+        result = super(SetLogLevelMessage, self).dump()
+        result['Level'] = self.Level
+        result['Logger'] = self.Logger
+        result['Duration'] = self.Duration
+        return result
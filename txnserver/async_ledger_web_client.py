@@ -0,0 +1,283 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a non-blocking version of the LedgerWebClient for use
+from inside the twisted reactor; every request method returns a Deferred.
+"""
+
+import logging
+import time
+from StringIO import StringIO
+
+from twisted.internet import defer, reactor
+from twisted.web.client import Agent, FileBodyProducer, HTTPConnectionPool
+from twisted.web.client import readBody
+from twisted.web.http_headers import Headers
+
+from journal import transaction
+from txnserver.client_metrics import CallTiming
+from txnserver.ledger_web_client import LedgerWebClientBase
+from txnserver.ledger_web_client import MessageException
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLedgerWebClient(LedgerWebClientBase):
+    """
+    A client of the validator web api built on twisted.web.client.Agent.
+    The url construction and encoding are shared with LedgerWebClient, but
+    every request method returns a Deferred so that the reactor never blocks
+    waiting for the LedgerURL. Streamed responses, snapshots, failover
+    between validators and the store cache are only provided by the
+    blocking client.
+    """
+
+    def __init__(self, url, maxsize=4, idletimeout=30.0, connecttimeout=10.0,
+                 observers=None):
+        """
+        Args:
+            url (str): base url of the validator web api
+            maxsize (int): maximum number of persistent connections per host
+            idletimeout (float): seconds an idle connection is kept open
+            connecttimeout (float): seconds to wait for a connection
+            observers (list): client_metrics.ClientObserver objects that are
+                told the timing of every request; connection setup is not
+                separated from server time
+        """
+        super(AsyncLedgerWebClient, self).__init__(url, observers=observers)
+
+        self.AgentPool = HTTPConnectionPool(reactor, persistent=True)
+        self.AgentPool.maxPersistentPerHost = maxsize
+        self.AgentPool.cachedConnectionTimeout = idletimeout
+
+        self.Agent = Agent(reactor,
+                           connectTimeout=connecttimeout,
+                           pool=self.AgentPool)
+
+    def close(self):
+        """
+        Close all the persistent connections, returns a Deferred that fires
+        when the connections are closed.
+        """
+        return self.AgentPool.closeCachedConnections()
+
+    def get_store(self, txntype, key='', blockid='', delta=False,
+                  domain=''):
+        """
+        Retrieve a value, the list of keys or the contents of a transaction
+        store, see LedgerWebClient.get_store.
+
+        :return: Deferred that fires with the parsed response
+        """
+        return self._geturl(
+            self.store_url(txntype, key, blockid, delta, domain))
+
+    def get_block(self, blockid, field=None):
+        """
+        :return: Deferred that fires with the block data
+        """
+        return self._geturl(self.block_url(blockid, field))
+
+    def get_block_list(self, count=0):
+        """
+        :return: Deferred that fires with the list of committed block ids
+        """
+        return self._geturl(self.block_list_url(count))
+
+    def get_transaction(self, txnid, field=None):
+        """
+        :return: Deferred that fires with the transaction data
+        """
+        return self._geturl(self.transaction_url(txnid, field))
+
+    def get_transaction_list(self, count=0):
+        """
+        :return: Deferred that fires with the list of committed transaction
+            ids
+        """
+        return self._geturl(self.transaction_list_url(count))
+
+    def get_transaction_status(self, txnid):
+        """
+        Send a HEAD request to the ledger web server to retrieve the status
+        of a specific transaction id.
+
+        :param id txnid: identifier for the transaction to retrieve
+        :return: Deferred that fires with one of the values of
+            :class:`journal.Transaction.status`
+        """
+        url = self.transaction_url(txnid)
+
+        logger.debug('HEAD content from url <%s>', url)
+
+        def _status(result):
+            (response, content) = result
+            if response.code == 200:
+                return transaction.Status.committed
+            elif response.code == 302:
+                return transaction.Status.pending
+            return transaction.Status.unknown
+
+        def _failed(failure):
+            failure.trap(MessageException)
+            return transaction.Status.unknown
+
+        d = self._request('HEAD', url, timeout=30)
+        d.addCallbacks(_status, _failed)
+        return d
+
+    def initiate_message(self, msg):
+        """
+        Post a gossip message for the validator to sign and forward.
+
+        :return: Deferred that fires with the parsed response
+        """
+        return self._posturl(self.message_initiate_url(), msg.dump())
+
+    def post_message(self, msg):
+        """
+        Post a gossip message to be forwarded to the gossip network.
+
+        :return: Deferred that fires with the parsed response
+        """
+        return self._posturl(self.message_forward_url(), msg.dump())
+
+    def _geturl(self, url):
+        """
+        Send an HTTP get request to the validator. The returned Deferred fires
+        with the parsed content if it is in JSON or CBOR form.
+        """
+
+        logger.debug('get content from url <%s>', url)
+
+        def _parse(result):
+            (response, content) = result
+            return self._decode(self._content_type(response), content)
+
+        d = self._request('GET', url, headers=self.GET_HEADER, timeout=30)
+        d.addCallback(_parse)
+        return d
+
+    def _posturl(self, url, info, encoding='application/cbor'):
+        """
+        Post a transaction message to the validator. The returned Deferred
+        fires with the dictionary parsed from the response.
+        """
+
+        data = self._encode(info, encoding)
+        if data is None:
+            return defer.succeed(None)
+
+        logger.debug('post transaction to %s with DATALEN=%d', url, len(data))
+
+        def _parse(result):
+            (response, content) = result
+            encoding = self._content_type(response)
+            if encoding in ['application/json', 'application/cbor']:
+                return self._decode(encoding, content)
+
+            logger.info('server responds with message %s of unknown type %s',
+                        content, encoding)
+            return dict()
+
+        d = self._request('POST', url, data,
+                          {'Content-Type': 'application/cbor'},
+                          timeout=10)
+        d.addCallback(_parse)
+        return d
+
+    def _request(self, method, url, data=None, headers=None, timeout=30):
+        """
+        Send an HTTP request through the agent. The returned Deferred fires
+        with a (response, content) tuple, or fails with MessageException if
+        the request fails, times out or returns an error status.
+        """
+
+        rawheaders = Headers()
+        for (name, value) in (headers or {}).iteritems():
+            rawheaders.addRawHeader(name, value)
+
+        producer = FileBodyProducer(StringIO(data)) if data else None
+
+        timing = CallTiming(method, url)
+        timing.BytesSent = len(data or '')
+        start = time.time()
+
+        d = self.Agent.request(method, url, rawheaders, producer)
+        timer = reactor.callLater(timeout, d.cancel)
+
+        def _cancel_timer(result):
+            if timer.active():
+                timer.cancel()
+            return result
+
+        def _transferred(content):
+            timing.add_phase('transfer', time.time() - start - timing.Total)
+            timing.BytesReceived = len(content)
+            return content
+
+        def _read(response):
+            timing.add_phase('server', time.time() - start)
+            timing.Status = response.code
+
+            # the body is always consumed so that the connection can go back
+            # into the pool, even when the status is an error
+            code = response.code
+            if code >= 400 or (code >= 300 and method != 'HEAD'):
+                def _error(result):
+                    logger.error(
+                        'peer operation on url {0} failed with response: '
+                        '{1}'.format(url, code))
+                    timing.Error = 'response status {0}'.format(code)
+                    raise MessageException(
+                        'operation failed with resonse: {0}'.format(code))
+
+                return readBody(response).addBoth(_error)
+
+            d = readBody(response)
+            d.addCallback(_transferred)
+            d.addCallback(lambda content: (response, content))
+            return d
+
+        def _completed(result):
+            if timing.Error is None and not isinstance(result, tuple):
+                timing.Error = result.getErrorMessage()
+                timing.add_phase('failed',
+                                 time.time() - start - timing.Total)
+            self._call_completed(timing)
+            return result
+
+        def _failed(failure):
+            if failure.check(MessageException):
+                return failure
+
+            if failure.check(defer.CancelledError):
+                logger.error('peer operation on url %s timed out', url)
+                raise MessageException('operation timed out')
+
+            logger.error('peer operation on url {0} failed: {1}'.format(
+                url, failure.getErrorMessage()))
+            raise MessageException('operation failed: {0}'.format(
+                failure.getErrorMessage()))
+
+        d.addCallback(_read)
+        d.addBoth(_cancel_timer)
+        d.addBoth(_completed)
+        d.addErrback(_failed)
+        return d
+
+    @staticmethod
+    def _content_type(response):
+        return response.headers.getRawHeaders('content-type', [None])[0]
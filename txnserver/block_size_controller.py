@@ -0,0 +1,169 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the adaptive control of the number of transactions
+per block
+"""
+
+import logging
+import math
+import time
+
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+
+class ReactorLag(object):
+    """
+    Measure how long the reactor is kept from running scheduled calls. Block
+    validation runs in the reactor thread, so the longest lag around a block
+    commit is a measure of the time it took to validate the block.
+
+    Attributes:
+        Resolution (float): seconds between samples
+    """
+
+    def __init__(self, resolution=0.1):
+        self.Resolution = resolution
+
+        self._looper = None
+        self._last = None
+        self._maxlag = 0.0
+
+    def start(self):
+        self._last = time.time()
+        self._looper = task.LoopingCall(self._tick)
+        self._looper.start(self.Resolution, now=False)
+
+    def stop(self):
+        if self._looper and self._looper.running:
+            self._looper.stop()
+        self._looper = None
+
+    def collect(self):
+        """
+        Return the longest lag since the previous call.
+        """
+        maxlag = self._maxlag
+        self._maxlag = 0.0
+        return maxlag
+
+    def _tick(self):
+        now = time.time()
+        self._maxlag = max(self._maxlag, now - self._last - self.Resolution)
+        self._last = now
+
+
+class BlockSizeController(object):
+    """
+    Adjust the minimum and maximum number of transactions per block to the
+    load. The maximum grows while the pending backlog does not fit in a
+    block, but never past the size that can be validated and propagated
+    within Budget of the block interval. The minimum drops to the backlog
+    when there are few pending transactions so that blocks are not held
+    back, and rises to a quarter of the maximum under a backlog so that
+    few small blocks are claimed.
+
+    Attributes:
+        MinimumTransactions (int): current minimum transactions per block
+        MaximumTransactions (int): current maximum transactions per block
+        ConfiguredMinimum (int): the configured minimum
+        LowerBound (int): limits never go below this
+        UpperBound (int): limits never go above this
+        BlockInterval (float): expected seconds between blocks
+        Budget (float): fraction of the block interval a block may take to
+            validate and propagate
+        Step (float): fraction by which the maximum grows at each update
+        CostPerTransaction (float): smoothed validation seconds per
+            transaction, None until a block has been observed
+    """
+
+    def __init__(self, minimum=1, maximum=1000, lower=1, upper=5000,
+                 blockinterval=30.0, budget=0.1, step=0.25):
+        self.ConfiguredMinimum = minimum
+        self.MinimumTransactions = minimum
+        self.MaximumTransactions = maximum
+        self.LowerBound = lower
+        self.UpperBound = upper
+        self.BlockInterval = blockinterval
+        self.Budget = budget
+        self.Step = step
+        self.CostPerTransaction = None
+
+    def observe_block(self, size, validationtime, weight=0.25):
+        """
+        Record the validation time of a committed block.
+
+        Args:
+            size (int): number of transactions in the block
+            validationtime (float): seconds spent validating the block
+            weight (float): weight of this sample in the smoothed cost
+        """
+        if size <= 0:
+            return
+
+        cost = validationtime / size
+        if self.CostPerTransaction is None:
+            self.CostPerTransaction = cost
+        else:
+            self.CostPerTransaction += weight * (cost -
+                                                 self.CostPerTransaction)
+
+    def ceiling(self, propagationdelay):
+        """
+        The largest block that can be validated and propagated within the
+        budget.
+        """
+        if not self.CostPerTransaction:
+            return self.UpperBound
+
+        available = self.Budget * self.BlockInterval - propagationdelay
+        size = int(available / self.CostPerTransaction)
+        return max(self.LowerBound, min(self.UpperBound, size))
+
+    def update(self, pending, propagationdelay):
+        """
+        Compute new limits.
+
+        Args:
+            pending (int): number of transactions waiting for a block
+            propagationdelay (float): estimated seconds for a block to reach
+                the peers
+
+        Returns:
+            tuple: the minimum and maximum transactions per block
+        """
+        maximum = self.MaximumTransactions
+        if pending > maximum:
+            maximum = int(math.ceil(maximum * (1.0 + self.Step)))
+        maximum = max(self.LowerBound,
+                      min(maximum, self.ceiling(propagationdelay)))
+
+        if pending >= maximum:
+            minimum = max(self.ConfiguredMinimum, maximum // 4)
+        else:
+            minimum = min(self.ConfiguredMinimum,
+                          max(self.LowerBound, pending))
+        minimum = max(self.LowerBound, min(minimum, maximum))
+
+        if (minimum, maximum) != (self.MinimumTransactions,
+                                  self.MaximumTransactions):
+            logger.info('transactions per block now %d to %d, %d pending',
+                        minimum, maximum, pending)
+
+        self.MinimumTransactions = minimum
+        self.MaximumTransactions = maximum
+        return (minimum, maximum)
@@ -0,0 +1,227 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the timing records reported by the ledger web clients
+and an in-memory histogram observer that aggregates them
+"""
+
+import json
+import threading
+import urlparse
+from collections import OrderedDict
+
+# the phases of a call in the order in which they happen
+PHASES = ['resolve', 'connect', 'server', 'transfer', 'decode']
+
+
+class CallTiming(object):
+    """
+    Timing information for one HTTP request.
+
+    Attributes:
+        Method (str): HTTP verb
+        URL (str): url the request was sent to
+        Status (int): HTTP status code, None if no response was received
+        Error (str): description of the failure, if any
+        BytesSent (int): size of the request body
+        BytesReceived (int): size of the response body
+        Phases (OrderedDict): seconds spent in each phase; resolve and
+            connect are only present when a new connection was opened
+    """
+
+    def __init__(self, method, url):
+        self.Method = method
+        self.URL = url
+        self.Status = None
+        self.Error = None
+        self.BytesSent = 0
+        self.BytesReceived = 0
+        self.Phases = OrderedDict()
+
+    @property
+    def Operation(self):
+        """
+        A short name for the kind of request, e.g. 'GET /store'.
+        """
+        path = urlparse.urlsplit(self.URL).path.strip('/')
+        return '{0} /{1}'.format(self.Method, path.split('/', 1)[0])
+
+    @property
+    def Total(self):
+        return sum(self.Phases.itervalues())
+
+    def add_phase(self, phase, elapsed):
+        self.Phases[phase] = self.Phases.get(phase, 0.0) + elapsed
+
+    def dump(self):
+        return {
+            'Method': self.Method,
+            'URL': self.URL,
+            'Status': self.Status,
+            'Error': self.Error,
+            'BytesSent': self.BytesSent,
+            'BytesReceived': self.BytesReceived,
+            'Phases': dict(self.Phases),
+            'Total': self.Total
+        }
+
+
+class ClientObserver(object):
+    """
+    Interface for objects that want to be told about every request made by
+    a ledger web client.
+    """
+
+    def call_completed(self, timing):
+        """
+        Called once for every request, successful or not.
+
+        Args:
+            timing (CallTiming): timing information for the request
+        """
+        pass
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of durations with logarithmic buckets.
+
+    Attributes:
+        Bounds (list): upper bound, in seconds, of each bucket but the last
+    """
+
+    Bounds = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0,
+              5.0, 10.0, 30.0]
+
+    def __init__(self):
+        self.Counts = [0] * (len(self.Bounds) + 1)
+        self.Count = 0
+        self.Sum = 0.0
+        self.Minimum = None
+        self.Maximum = None
+
+    def add(self, value):
+        index = 0
+        while index < len(self.Bounds) and value > self.Bounds[index]:
+            index += 1
+
+        self.Counts[index] += 1
+        self.Count += 1
+        self.Sum += value
+        self.Minimum = value if self.Minimum is None else min(self.Minimum,
+                                                              value)
+        self.Maximum = value if self.Maximum is None else max(self.Maximum,
+                                                              value)
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile as the upper bound of the bucket that contains
+        it; values in the overflow bucket are reported as the maximum.
+        """
+        if self.Count == 0:
+            return None
+
+        threshold = fraction * self.Count
+        running = 0
+        for (index, count) in enumerate(self.Counts):
+            running += count
+            if running >= threshold and count > 0:
+                if index < len(self.Bounds):
+                    return min(self.Bounds[index], self.Maximum)
+                break
+
+        return self.Maximum
+
+    def dump(self):
+        return {
+            'Count': self.Count,
+            'Mean': self.Sum / self.Count if self.Count else None,
+            'Minimum': self.Minimum,
+            'Maximum': self.Maximum,
+            'P50': self.percentile(0.5),
+            'P90': self.percentile(0.9),
+            'P99': self.percentile(0.99),
+            'Buckets': dict(
+                ('le{0}'.format(bound), count)
+                for (bound, count) in zip(self.Bounds + ['inf'], self.Counts)
+                if count > 0)
+        }
+
+
+class HistogramObserver(ClientObserver):
+    """
+    Aggregate request timings in memory: a latency histogram for each phase
+    and for the total of each kind of operation, counts of status codes and
+    totals of bytes transferred.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.Operations = {}
+
+    def call_completed(self, timing):
+        with self._lock:
+            stats = self.Operations.get(timing.Operation)
+            if stats is None:
+                stats = {
+                    'Phases': OrderedDict(),
+                    'Total': LatencyHistogram(),
+                    'Status': {},
+                    'Errors': 0,
+                    'BytesSent': 0,
+                    'BytesReceived': 0
+                }
+                self.Operations[timing.Operation] = stats
+
+            for (phase, elapsed) in timing.Phases.iteritems():
+                if phase not in stats['Phases']:
+                    stats['Phases'][phase] = LatencyHistogram()
+                stats['Phases'][phase].add(elapsed)
+
+            stats['Total'].add(timing.Total)
+            status = str(timing.Status)
+            stats['Status'][status] = stats['Status'].get(status, 0) + 1
+            if timing.Error:
+                stats['Errors'] += 1
+            stats['BytesSent'] += timing.BytesSent
+            stats['BytesReceived'] += timing.BytesReceived
+
+    def reset(self):
+        with self._lock:
+            self.Operations = {}
+
+    def dump(self):
+        with self._lock:
+            result = {}
+            for (operation, stats) in self.Operations.iteritems():
+                result[operation] = {
+                    'Phases': dict((phase, histogram.dump()) for
+                                   (phase, histogram) in
+                                   stats['Phases'].iteritems()),
+                    'Total': stats['Total'].dump(),
+                    'Status': dict(stats['Status']),
+                    'Errors': stats['Errors'],
+                    'BytesSent': stats['BytesSent'],
+                    'BytesReceived': stats['BytesReceived']
+                }
+            return result
+
+    def dump_json(self, indent=2):
+        return json.dumps(self.dump(), indent=indent, sort_keys=True)
+
+    def write_json(self, filename):
+        with open(filename, 'w') as fp:
+            fp.write(self.dump_json())
+            fp.write('\n')
@@ -123,6 +123,26 @@ def get_validator_configuration(config_files,
     return resolved
 
 
+def reloadable_changes(current, updated, keys):
+    """
+    Compare a freshly loaded configuration with the running one.
+
+    Args:
+        current (dict): the running configuration
+        updated (dict): the configuration read again from the files
+        keys (list): the variables that may change while running
+
+    Returns:
+        dict: the variables in keys whose value changed, with the new value
+    """
+    changed = {}
+    for key in keys:
+        if key in updated and updated[key] != current.get(key):
+            changed[key] = updated[key]
+
+    return changed
+
+
 class ValidatorDefaultConfig(gossip.config.Config):
     def __init__(self, os_name=os.name):
         super(ValidatorDefaultConfig, self).__init__(name="default")
@@ -0,0 +1,330 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a pool of persistent HTTP/1.1 connections that is
+shared by the clients used to talk to the validator web api
+"""
+
+import httplib
+import logging
+import select
+import socket
+import threading
+import time
+import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionFailed(socket.error):
+    """
+    The connection to the server could not be established, the request was
+    never sent and can safely be sent to another server.
+    """
+    pass
+
+
+class PooledResponse(object):
+    """
+    A thin wrapper around an httplib response that hands the underlying
+    connection back to the pool once the response has been consumed.
+    """
+
+    def __init__(self, pool, key, connection, response, timing=None):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+
+        self.status = response.status
+        self.reason = response.reason
+
+        self.Timing = timing
+        self.BytesRead = 0
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self._response.msg
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        self.BytesRead += len(data)
+        return data
+
+    def close(self):
+        """
+        Release the connection; it is returned to the pool only if the
+        response body was completely read and the server did not ask for
+        the connection to be closed.
+        """
+        if self._connection is None:
+            return
+
+        reusable = self._response.isclosed() and \
+            not self._response.will_close
+        if not reusable:
+            self._response.close()
+
+        self._pool.release(self._key, self._connection, reusable)
+        self._connection = None
+
+
+class HTTPConnectionPool(object):
+    """
+    Keep a per-host set of idle HTTP/1.1 connections so that successive
+    requests to the same validator do not pay for TCP connection setup.
+
+    Attributes:
+        MaximumSize (int): maximum number of idle connections kept per host
+        IdleTimeout (float): idle connections older than this are discarded
+        Timeout (float): default socket timeout for new connections
+    """
+
+    ConnectionClasses = {
+        'http': httplib.HTTPConnection,
+        'https': httplib.HTTPSConnection
+    }
+
+    # methods that may be sent again when the response on a reused
+    # connection fails
+    IdempotentMethods = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+    def __init__(self, maxsize=4, idletimeout=30.0, timeout=30.0):
+        self.MaximumSize = maxsize
+        self.IdleTimeout = idletimeout
+        self.Timeout = timeout
+
+        self._lock = threading.Lock()
+        self._idle = {}
+
+        self.Created = 0
+        self.Reused = 0
+        self.Discarded = 0
+
+    def request(self, method, url, body=None, headers=None, timeout=None,
+                timing=None):
+        """
+        Send an HTTP request over a pooled connection and return a
+        PooledResponse. The caller must close() the response to release the
+        connection.
+
+        Args:
+            method (str): HTTP verb
+            url (str): absolute URL for the request
+            body (str): optional request body
+            headers (dict): optional request headers
+            timeout (float): socket timeout, defaults to the pool timeout
+            timing (client_metrics.CallTiming): optional, receives the
+                resolve, connect and server phases of the request
+        """
+        parts = urlparse.urlsplit(url)
+        scheme = parts.scheme or 'http'
+        if scheme not in self.ConnectionClasses:
+            raise ValueError('unsupported url scheme {0}'.format(scheme))
+
+        key = (scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        headers = dict(headers or {})
+        if timeout is None:
+            timeout = self.Timeout
+
+        connection = self._acquire(key)
+        if connection is not None:
+            # a reused connection may have been closed by the server between
+            # the health check and the request, in that case try once more on
+            # a fresh connection; a request whose response failed is only
+            # sent again if it is idempotent since the server may already
+            # have processed it, and a timeout is never a stale connection
+            start = time.time()
+            try:
+                self._write(connection, method, path, body, headers, timeout)
+                return self._read(key, connection, body, start, timing)
+            except socket.timeout:
+                raise
+            except (httplib.BadStatusLine, httplib.CannotSendRequest,
+                    socket.error) as e:
+                if getattr(connection, 'RequestSent', False) and \
+                        method not in self.IdempotentMethods:
+                    raise
+                logger.debug('stale connection to %s:%s, reconnecting; %s',
+                             key[1], key[2], str(e))
+                self._count('Discarded')
+
+        try:
+            connection = self._create(key, timeout, timing)
+        except (httplib.HTTPException, socket.error) as e:
+            raise ConnectionFailed(str(e))
+
+        start = time.time()
+        self._write(connection, method, path, body, headers, timeout)
+        return self._read(key, connection, body, start, timing)
+
+    def release(self, key, connection, reusable=True):
+        """
+        Return a connection to the idle set for its host.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if reusable and len(idle) < self.MaximumSize:
+                idle.append((connection, time.time()))
+                return
+            self.Discarded += 1
+
+        connection.close()
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+
+        for connections in idle.itervalues():
+            for (connection, _) in connections:
+                connection.close()
+
+    @staticmethod
+    def _write(connection, method, path, body, headers, timeout):
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+        connection.RequestSent = False
+        try:
+            connection.request(method, path, body, headers)
+        except:
+            connection.close()
+            raise
+        connection.RequestSent = True
+
+    def _read(self, key, connection, body, start, timing=None):
+        try:
+            response = connection.getresponse()
+        except:
+            connection.close()
+            raise
+
+        if timing is not None:
+            timing.add_phase('server', time.time() - start)
+            timing.BytesSent = len(body or '')
+
+        return PooledResponse(self, key, connection, response, timing)
+
+    def _acquire(self, key):
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                (connection, released) = idle.pop()
+                if now - released < self.IdleTimeout and \
+                        self._is_healthy(connection):
+                    self.Reused += 1
+                    return connection
+
+                self.Discarded += 1
+                connection.close()
+
+        return None
+
+    def _create(self, key, timeout, timing=None):
+        (scheme, host, port) = key
+        self._count('Created')
+
+        connection = self.ConnectionClasses[scheme](host, port,
+                                                    timeout=timeout)
+        connection.ResolveTime = 0.0
+        connection._create_connection = _resolving_create_connection(
+            connection)
+
+        # connect explicitly so that name resolution and connection setup
+        # (including any TLS handshake) are not counted as server time
+        start = time.time()
+        connection.connect()
+        if timing is not None:
+            timing.add_phase('resolve', connection.ResolveTime)
+            timing.add_phase('connect', time.time() - start -
+                             connection.ResolveTime)
+
+        return connection
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _is_healthy(connection):
+        """
+        An idle connection is healthy if its socket is open and nothing is
+        readable on it; a readable idle socket means the server closed it or
+        sent unsolicited data.
+        """
+        sock = connection.sock
+        if sock is None:
+            return False
+
+        try:
+            (readable, _, _) = select.select([sock], [], [], 0)
+        except (select.error, socket.error, ValueError):
+            return False
+
+        return not readable
+
+
+def _resolving_create_connection(connection):
+    """
+    Build a replacement for socket.create_connection that records the time
+    spent resolving the host name on the connection.
+    """
+
+    def create_connection(address, timeout, source_address=None):
+        (host, port) = address
+
+        start = time.time()
+        addrinfo = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        connection.ResolveTime = time.time() - start
+
+        # connect to the complete sockaddr, socket.create_connection would
+        # resolve the address again and IPv6 link-local addresses need the
+        # flowinfo and scope id that a (host, port) pair does not carry
+        error = socket.error('getaddrinfo returns an empty list')
+        for (family, socktype, proto, _, sockaddr) in addrinfo:
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except socket.error as err:
+                error = err
+                if sock is not None:
+                    sock.close()
+
+        raise error
+
+    return create_connection
+
+
+SharedPool = HTTPConnectionPool()
@@ -0,0 +1,77 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements an index of the endpoint registry by domain for the
+web api
+"""
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointDomainIndex(object):
+    """
+    Group the entries of the endpoint registry store by domain. An index is
+    built the first time a block is queried and kept for the most recently
+    queried blocks; the stores of committed blocks do not change so an index
+    never has to be updated.
+
+    Attributes:
+        MaximumBlocks (int): number of blocks for which the index is kept
+    """
+
+    def __init__(self, maxblocks=4):
+        self.MaximumBlocks = maxblocks
+        self._indexes = OrderedDict()
+
+    def lookup(self, blockid, store, domain):
+        """
+        Return the endpoints in a domain or any of its subdomains.
+
+        Args:
+            blockid (str): the block the store belongs to
+            store (dict): the endpoint registry store at the block
+            domain (str): domain prefix, e.g. /LotteryValidator
+
+        Returns:
+            dict: endpoint information by store key
+        """
+        index = self._indexes.pop(blockid, None)
+        if index is None:
+            index = self._build(store)
+        self._indexes[blockid] = index
+
+        while len(self._indexes) > self.MaximumBlocks:
+            self._indexes.popitem(last=False)
+
+        result = {}
+        for (epdomain, entries) in index.iteritems():
+            if epdomain.startswith(domain):
+                result.update(entries)
+        return result
+
+    @staticmethod
+    def _build(store):
+        index = {}
+        keys = store.keys()
+        for key in keys:
+            epinfo = store[key]
+            index.setdefault(epinfo.get('Domain', '/'), {})[key] = epinfo
+
+        logger.debug('indexed %d endpoints in %d domains', len(keys),
+                     len(index))
+        return index
@@ -0,0 +1,228 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements tracking of the endpoint registry in the local ledger,
+registrations and removals are reported as they are committed
+"""
+
+import logging
+import time
+
+from twisted.internet import task
+
+from ledger.transaction import endpoint_registry
+
+logger = logging.getLogger(__name__)
+
+
+def diff_endpoints(known, current, domain='/'):
+    """
+    Compare two views of the endpoint registry.
+
+    Args:
+        known (dict): endpoint information by node identifier, a value of
+            None matches any registration of the node
+        current (dict): the endpoint registry store contents
+        domain (str): only endpoints in this domain are reported
+
+    Returns:
+        tuple: a dict of the new or changed endpoint information by node
+            identifier and a list of the identifiers that are gone
+    """
+    added = {}
+    present = set()
+    for epinfo in current.itervalues():
+        if not epinfo.get('Domain', '/').startswith(domain):
+            continue
+
+        identifier = epinfo['NodeIdentifier']
+        present.add(identifier)
+
+        previous = known.get(identifier)
+        if identifier not in known or (previous is not None and
+                                       previous != epinfo):
+            added[identifier] = epinfo
+
+    removed = [i for i in known if i not in present]
+    return (added, removed)
+
+
+class EndpointTracker(object):
+    """
+    Follow the endpoint registry store of the committed head of the local
+    ledger. When the new head descends from the block read last, only the
+    keys changed by the blocks in between are examined, taken from the
+    deltas of their stores; the whole store is compared at the first
+    update, after a fork and at least every RescanInterval seconds. Only
+    registrations that changed are reported.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        Domain (str): endpoint domain that is tracked
+        Known (dict): endpoint information by node identifier
+        BlockID (str): the block the Known endpoints were read from
+        RescanInterval (float): maximum seconds between full comparisons
+        MaximumDepth (int): maximum number of block deltas applied at once
+    """
+
+    def __init__(self, ledger, domain, onadd, onremove, rescaninterval=60.0,
+                 maxdepth=10):
+        """
+        Args:
+            onadd (callable): called with the endpoint information of a new
+                or changed endpoint
+            onremove (callable): called with the identifier of an endpoint
+                that is no longer registered
+        """
+        self.Ledger = ledger
+        self.Domain = domain
+        self.Known = {}
+        self.BlockID = None
+        self.RescanInterval = rescaninterval
+        self.MaximumDepth = maxdepth
+
+        self._onadd = onadd
+        self._onremove = onremove
+        self._looper = None
+        self._lastscan = 0.0
+
+        # node identifier by store key, used to report deleted keys
+        self._identifiers = {}
+
+    def seed(self, identifiers):
+        """
+        Mark endpoints as known without their information, for example the
+        ones retrieved from the LedgerURL at startup.
+        """
+        for identifier in identifiers:
+            self.Known.setdefault(identifier, None)
+
+    def start(self, interval=1.0):
+        self._looper = task.LoopingCall(self.update)
+        self._looper.start(interval)
+
+    def stop(self):
+        if self._looper and self._looper.running:
+            self._looper.stop()
+        self._looper = None
+
+    def update(self):
+        """
+        Report the endpoint changes committed since the previous update.
+
+        Returns:
+            tuple: the added endpoint information and removed identifiers
+        """
+        blockid = self.Ledger.MostRecentCommitedBlockID
+        if not blockid or blockid == self.BlockID:
+            return ({}, [])
+
+        now = time.time()
+        changes = None
+        if self.BlockID and now - self._lastscan < self.RescanInterval:
+            changes = self._delta_changes(blockid)
+
+        if changes is None:
+            store = self._store(blockid)
+            if store is None:
+                return ({}, [])
+
+            current = dict((k, store[k]) for k in store.keys())
+            self._identifiers = dict(
+                (k, v['NodeIdentifier']) for (k, v) in current.iteritems())
+            changes = diff_endpoints(self.Known, current, self.Domain)
+            self._lastscan = now
+
+        (added, removed) = changes
+        self.BlockID = blockid
+        for (identifier, epinfo) in added.iteritems():
+            self.Known[identifier] = epinfo
+            self._onadd(epinfo)
+        for identifier in removed:
+            del self.Known[identifier]
+            self._onremove(identifier)
+
+        if added or removed:
+            logger.info('endpoint registry at block %s: %d added, %d removed',
+                        blockid[:8], len(added), len(removed))
+
+        return (added, removed)
+
+    def _store(self, blockid):
+        storemap = self.Ledger.GlobalStoreMap.get_block_store(blockid)
+        txntype = endpoint_registry.EndpointRegistryTransaction
+        if not storemap or \
+                txntype.TransactionTypeName not in storemap.TransactionStores:
+            return None
+
+        return storemap.get_transaction_store(txntype.TransactionTypeName)
+
+    def _delta_changes(self, blockid):
+        """
+        Compute the changes between BlockID and a descendant from the store
+        deltas of the blocks in between.
+
+        Returns:
+            tuple: (added, removed) as returned by diff_endpoints, None if
+                blockid does not descend from BlockID within MaximumDepth
+                blocks or a store delta is not available
+        """
+        chain = []
+        for _ in range(self.MaximumDepth):
+            if blockid == self.BlockID:
+                break
+            if blockid not in self.Ledger.BlockStore:
+                return None
+            chain.append(blockid)
+            blockid = self.Ledger.BlockStore[blockid].PreviousBlockID
+        else:
+            return None
+
+        updated = {}
+        deleted = set()
+        for blockid in reversed(chain):
+            store = self._store(blockid)
+            delta = store.dump(True) if store is not None else None
+            if not isinstance(delta, dict) or 'Store' not in delta:
+                return None
+
+            for (key, epinfo) in delta['Store'].iteritems():
+                updated[key] = epinfo
+                deleted.discard(key)
+            for key in delta.get('DeletedKeys', []):
+                updated.pop(key, None)
+                deleted.add(key)
+
+        added = {}
+        removed = set()
+        for (key, epinfo) in updated.iteritems():
+            identifier = epinfo['NodeIdentifier']
+            self._identifiers[key] = identifier
+            if not epinfo.get('Domain', '/').startswith(self.Domain):
+                if identifier in self.Known:
+                    removed.add(identifier)
+                continue
+
+            previous = self.Known.get(identifier)
+            if identifier not in self.Known or (previous is not None and
+                                                previous != epinfo):
+                added[identifier] = epinfo
+
+        for key in deleted:
+            identifier = self._identifiers.pop(key, key)
+            if identifier in self.Known:
+                removed.add(identifier)
+
+        return (added, list(removed))
@@ -0,0 +1,173 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements endpoint selection and retry policies for clients
+that can talk to more than one validator
+"""
+
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(object):
+    """
+    Exponential backoff with jitter.
+
+    Attributes:
+        Retries (int): number of retries after the first attempt
+        InitialDelay (float): delay before the first retry
+        MaximumDelay (float): upper bound on the delay between attempts
+        Multiplier (float): growth factor of the delay for each attempt
+        Jitter (float): fraction of the delay that is randomized, 0 disables
+            jitter and 1 picks uniformly between 0 and the full delay
+    """
+
+    def __init__(self, retries=3, initialdelay=0.1, maximumdelay=5.0,
+                 multiplier=2.0, jitter=0.5):
+        self.Retries = retries
+        self.InitialDelay = initialdelay
+        self.MaximumDelay = maximumdelay
+        self.Multiplier = multiplier
+        self.Jitter = jitter
+
+    def delay(self, attempt):
+        """
+        Return the delay before retry number attempt (starting at 0).
+        """
+        delay = min(self.MaximumDelay,
+                    self.InitialDelay * (self.Multiplier ** attempt))
+        return delay * (1.0 - self.Jitter * random.random())
+
+
+class EndpointState(object):
+    """
+    Health information for one endpoint.
+
+    Attributes:
+        URL (str): base url of the endpoint
+        Latency (float): smoothed response time, None until measured
+        Failures (int): number of consecutive failures
+        OpenUntil (float): time until which the circuit breaker is open
+        Requests (int): total number of requests sent to the endpoint
+    """
+
+    def __init__(self, url):
+        self.URL = url
+        self.Latency = None
+        self.Failures = 0
+        self.OpenUntil = 0.0
+        self.Requests = 0
+
+    def is_available(self, now):
+        return self.OpenUntil <= now
+
+    def dump(self):
+        return {
+            'URL': self.URL,
+            'Latency': self.Latency,
+            'Failures': self.Failures,
+            'OpenUntil': self.OpenUntil,
+            'Requests': self.Requests
+        }
+
+
+class EndpointSelector(object):
+    """
+    Choose between a set of equivalent endpoints, preferring the available
+    endpoint with the lowest observed latency. After FailureThreshold
+    consecutive failures the circuit for an endpoint opens and it is skipped
+    for ResetTime seconds, after which one trial request is allowed through.
+
+    Attributes:
+        Endpoints (list): EndpointState for each url, in configured order
+        FailureThreshold (int): consecutive failures that open the circuit
+        ResetTime (float): seconds the circuit stays open
+        Smoothing (float): weight of a new sample in the latency average
+    """
+
+    def __init__(self, urls, failurethreshold=3, resettime=30.0,
+                 smoothing=0.3):
+        self.Endpoints = [EndpointState(url) for url in urls]
+        self.FailureThreshold = failurethreshold
+        self.ResetTime = resettime
+        self.Smoothing = smoothing
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.Endpoints)
+
+    def select(self, exclude=None):
+        """
+        Pick the endpoint for the next request.
+
+        Args:
+            exclude (set): urls that should not be used, ignored if no other
+                endpoint is left
+
+        Returns:
+            EndpointState: the endpoint to use
+        """
+        exclude = exclude or set()
+        now = time.time()
+
+        with self._lock:
+            candidates = [ep for ep in self.Endpoints
+                          if ep.URL not in exclude] or self.Endpoints
+
+            available = [ep for ep in candidates if ep.is_available(now)]
+            if not available:
+                # every circuit is open, try the one that closes first
+                # rather than failing without sending anything
+                endpoint = min(candidates, key=lambda ep: ep.OpenUntil)
+            else:
+                # endpoints that have not been measured yet are tried first,
+                # ties are broken randomly to spread the load
+                random.shuffle(available)
+                endpoint = min(available, key=lambda ep: ep.Latency or 0.0)
+
+            endpoint.Requests += 1
+
+            # a half open circuit admits a single trial request
+            if endpoint.Failures >= self.FailureThreshold:
+                endpoint.OpenUntil = now + self.ResetTime
+
+            return endpoint
+
+    def record_success(self, endpoint, elapsed):
+        with self._lock:
+            endpoint.Failures = 0
+            endpoint.OpenUntil = 0.0
+            if endpoint.Latency is None:
+                endpoint.Latency = elapsed
+            else:
+                endpoint.Latency += self.Smoothing * (elapsed -
+                                                      endpoint.Latency)
+
+    def record_failure(self, endpoint):
+        with self._lock:
+            endpoint.Failures += 1
+            if endpoint.Failures >= self.FailureThreshold:
+                logger.warn('mark down %s after %d failures', endpoint.URL,
+                            endpoint.Failures)
+                endpoint.OpenUntil = time.time() + self.ResetTime
+
+    def dump(self):
+        with self._lock:
+            return [ep.dump() for ep in self.Endpoints]
@@ -0,0 +1,185 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a topology protocol that combines a few low latency
+local links with a few random long range links
+"""
+
+import logging
+import random
+
+from twisted.internet import task
+
+from txnserver.peer_selection import LatencyProbe, measured_rtt
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTopology(object):
+    """
+    Maintain LocalLinks connections to the peers with the lowest round trip
+    time and LongLinks connections to peers picked at random. Every
+    Interval seconds a few new candidates are probed; a candidate replaces
+    the slowest local link when its round trip time is less than Margin
+    times that of the link.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        Probe (peer_selection.LatencyProbe): measures candidate peers
+        LocalLinks (int): number of low latency links
+        LongLinks (int): number of random links
+        ProbeCount (int): candidates probed at each evaluation
+        Interval (float): seconds between evaluations
+        Margin (float): fraction of the slowest local link round trip time
+            a candidate must beat to replace it
+        Local (set): identifiers of the peers used as local links
+        Long (set): identifiers of the peers used as long range links
+    """
+
+    def __init__(self, ledger, connector, candidates, release, locallinks=2,
+                 longlinks=2, probecount=4, probewindow=2.0, interval=60.0,
+                 margin=0.8):
+        """
+        Args:
+            candidates (callable): returns the gossip nodes that could
+                become peers
+            release (callable): disconnects from a gossip node
+        """
+        self.Ledger = ledger
+        self.Connector = connector
+        self.Probe = LatencyProbe(connector, probewindow)
+        self.LocalLinks = locallinks
+        self.LongLinks = longlinks
+        self.ProbeCount = probecount
+        self.Interval = interval
+        self.Margin = margin
+
+        self.Local = set()
+        self.Long = set()
+
+        self._candidates = candidates
+        self._release = release
+        self._looper = None
+        self._evaluating = False
+
+    def start_topology_update(self, callback):
+        """
+        Build the initial set of links and start the periodic evaluation,
+        callback is called once the initial links are in place.
+        """
+        probecount = max(self.ProbeCount,
+                         2 * (self.LocalLinks + self.LongLinks))
+
+        def _started(_):
+            callback()
+            if self._looper is None:
+                self._looper = task.LoopingCall(self.evaluate)
+                self._looper.start(self.Interval, now=False)
+
+        d = self._evaluate(probecount)
+        d.addCallback(_started)
+        return d
+
+    def stop(self):
+        if self._looper and self._looper.running:
+            self._looper.stop()
+        self._looper = None
+
+    def evaluate(self):
+        if self._evaluating:
+            return None
+        return self._evaluate(self.ProbeCount)
+
+    def _evaluate(self, probecount):
+        self._evaluating = True
+
+        connected = dict((p.Identifier, p) for p in self.Ledger.peer_list())
+        candidates = [p for p in self._candidates()
+                      if p.Identifier not in connected and
+                      p.Identifier != self.Ledger.LocalNode.Identifier]
+        candidates = random.sample(candidates,
+                                   min(probecount, len(candidates)))
+
+        for peer in candidates:
+            self.Ledger.add_node(peer)
+
+        d = self.Probe.probe(candidates)
+        d.addCallback(self._select, connected, candidates)
+        d.addBoth(self._done)
+        return d
+
+    def _done(self, result):
+        self._evaluating = False
+        return result
+
+    def _select(self, probed, connected, candidates):
+        rtts = {}
+        for (peerid, peer) in connected.iteritems():
+            rtts[peerid] = measured_rtt(peer, self.Connector)
+        for (peerid, rtt) in probed.iteritems():
+            rtts[peerid] = rtt
+
+        # drop links to peers that are gone
+        self.Local.intersection_update(connected)
+        self.Long.intersection_update(connected)
+
+        # a probed peer replaces the slowest local link only if it is
+        # clearly faster, so that noise in the measurements does not cause
+        # the links to flap
+        demoted = set()
+        ranked = sorted([p for p in rtts if rtts[p] is not None],
+                        key=lambda p: rtts[p])
+        for peerid in ranked:
+            if peerid in self.Local or peerid in self.Long:
+                continue
+            if len(self.Local) < self.LocalLinks:
+                self.Local.add(peerid)
+                continue
+
+            slowest = max(self.Local,
+                          key=lambda p: rtts.get(p) or float('inf'))
+            slowrtt = rtts.get(slowest)
+            if slowrtt is None or rtts[peerid] < self.Margin * slowrtt:
+                logger.info('replace local link %s (rtt %s) with %s '
+                            '(rtt %.3f)', slowest[:8], slowrtt, peerid[:8],
+                            rtts[peerid])
+                self.Local.discard(slowest)
+                self.Local.add(peerid)
+                demoted.add(slowest)
+
+        others = [p for p in rtts
+                  if p not in self.Local and p not in self.Long]
+        while len(self.Long) < self.LongLinks and others:
+            peerid = random.choice(others)
+            others.remove(peerid)
+            self.Long.add(peerid)
+
+        # release the probed peers that did not become links and the local
+        # links that were replaced; connections made by other validators
+        # are left alone since they are links in their topology
+        keep = self.Local.union(self.Long)
+        for peer in candidates:
+            if peer.Identifier in keep:
+                continue
+            if peer.Identifier in probed:
+                self._release(peer)
+            else:
+                self.Ledger.drop_node(peer.Identifier)
+
+        for peerid in demoted.difference(keep):
+            self._release(connected[peerid])
+
+        logger.info('latency topology: %d local links, %d long range links',
+                    len(self.Local), len(self.Long))
@@ -13,14 +13,23 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 
+import httplib
 import logging
+import Queue
+import socket
 import sys
+import threading
+import time
 import urllib
-import urllib2
 import urlparse
 
 from gossip.common import json2dict, dict2json, cbor2dict, dict2cbor
 from journal import transaction
+from txnserver import client_metrics
+from txnserver import connection_pool
+from txnserver import failover
+from txnserver import state_snapshot
+from txnserver import stream_decoder
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +41,42 @@ class MessageException(Exception):
     pass
 
 
-class LedgerWebClient(object):
+class EndpointException(MessageException):
+    """
+    A communication failure that is specific to one validator, for example a
+    connection failure or a server error; the request may succeed on another
+    validator.
+    """
+    pass
+
+
+class LedgerWebClientBase(object):
+    """
+    The url construction and content encoding shared by the blocking and the
+    asynchronous clients of the validator web api.
+    """
     GET_HEADER = {"Accept": "application/cbor"}
 
-    def __init__(self, url):
-        self.LedgerURL = url
-        self.ProxyHandler = urllib2.ProxyHandler({})
+    def __init__(self, url, observers=None):
+        """
+        Args:
+            url (str or list): base url of the validator web api, or a list
+                of urls for equivalent validators; None if there is none
+            observers (list): client_metrics.ClientObserver objects that are
+                told the timing of every request
+        """
+        # a client without a url is created when no LedgerURL is configured
+        if url is None:
+            self.LedgerURLs = []
+        elif isinstance(url, basestring):
+            self.LedgerURLs = [url]
+        else:
+            self.LedgerURLs = list(url)
 
-    def store_url(self, txntype, key='', blockid='', delta=False):
+        self.LedgerURL = self.LedgerURLs[0] if self.LedgerURLs else None
+        self.Observers = list(observers or [])
+
+    def store_url(self, txntype, key='', blockid='', delta=False, domain=''):
         """
         store_url -- create a url to access a value store from the ledger
 
@@ -49,6 +86,8 @@ class LedgerWebClient(object):
             key -- index into the transaction store
             blockid - get the state of the store following the validation of
                 blockid
+            delta -- get only the changes made by the block
+            domain -- get the endpoints in a domain, endpoint registry only
         """
         url = self.LedgerURL + '/store' + txntype.TransactionTypeName
         if key:
@@ -56,15 +95,15 @@ class LedgerWebClient(object):
         url = urlparse.urljoin(url,
                                urlparse.urlparse(url).path.replace('//', '/'))
         url = url.rstrip('/')
-        if blockid:
-            url += '?blockid={0}'.format(blockid)
 
-        if blockid or delta:
-            params = dict()
+        params = []
         if blockid:
-            params['blockid'] = blockid
+            params.append(('blockid', blockid))
         if delta:
-            params['delta'] = '1'
+            params.append(('delta', '1'))
+        if domain:
+            params.append(('domain', domain))
+        if params:
             url += '?' + urllib.urlencode(params)
 
         return url
@@ -146,6 +185,22 @@ class LedgerWebClient(object):
 
         return url
 
+    def snapshot_url(self, blockid=''):
+        """
+        snapshot_url -- create a url to access a snapshot of the global store
+
+        :param id blockid: optional, block of the snapshot, the manifest of
+            the newest snapshot if not specified
+        :return: URL for accessing the snapshot
+        """
+        url = self.LedgerURL + '/snapshot/' + blockid
+
+        url = urlparse.urljoin(url,
+                               urlparse.urlparse(url).path.replace('//', '/'))
+        url = url.rstrip('/')
+
+        return url
+
     def message_forward_url(self):
         """
         message_forward_url -- create the url for sending a message to a
@@ -168,7 +223,74 @@ class LedgerWebClient(object):
 
         return url
 
-    def get_store(self, txntype, key='', blockid='', delta=False):
+    @staticmethod
+    def _encode(info, encoding):
+        """
+        Encode a dictionary as JSON or CBOR, returns None for any other
+        encoding.
+        """
+        if encoding == 'application/json':
+            return dict2json(info)
+        elif encoding == 'application/cbor':
+            return dict2cbor(info)
+
+        logger.error('unknown request encoding %s', encoding)
+        return None
+
+    @staticmethod
+    def _decode(encoding, content):
+        """
+        Parse JSON or CBOR content, content of any other type is returned
+        as is.
+        """
+        if encoding == 'application/json':
+            return json2dict(content)
+        elif encoding == 'application/cbor':
+            return cbor2dict(content)
+        return content
+
+    def _call_completed(self, timing):
+        for observer in self.Observers:
+            try:
+                observer.call_completed(timing)
+            except:
+                logger.exception('client observer %s failed', observer)
+
+
+class LedgerWebClient(LedgerWebClientBase):
+    def __init__(self, url, pool=None, cache=None, headinterval=1.0,
+                 retry=None, hedgedelay=None, observers=None):
+        """
+        Args:
+            url (str or list): base url of the validator web api, or a list
+                of urls for equivalent validators; None if there is none
+            pool (connection_pool.HTTPConnectionPool): pool of persistent
+                connections, defaults to the pool shared by all clients
+            cache (store_cache.StoreCache): optional cache for get_store
+            headinterval (float): seconds for which the head of the chain is
+                assumed unchanged before it is checked again
+            retry (failover.RetryPolicy): backoff policy for requests that
+                fail on a validator
+            hedgedelay (float): if set, a GET that has not completed after
+                this many seconds is also sent to a second validator and the
+                first response wins
+            observers (list): client_metrics.ClientObserver objects that are
+                told the timing of every request
+        """
+        super(LedgerWebClient, self).__init__(url, observers=observers)
+        self.ConnectionPool = pool or connection_pool.SharedPool
+
+        self.Endpoints = failover.EndpointSelector(self.LedgerURLs)
+        self.RetryPolicy = retry or failover.RetryPolicy()
+        self.HedgeDelay = hedgedelay
+
+        self.StoreCache = cache
+        self.HeadCheckInterval = headinterval
+        self._headid = None
+        self._headchecked = 0
+
+    def get_store(self, txntype, key='', blockid='', delta=False,
+                  domain=''):
         """
         Send a request to the ledger web server transaction store and return
         the parsed response, return the value of the specified key within the
@@ -177,8 +299,44 @@ class LedgerWebClient(object):
         Args:
             txntype -- type of the transaction store to contact
             key -- a specific identifier to retrieve
+            domain -- return the endpoints in the domain, only valid for the
+                endpoint registry
+        """
+        if self.StoreCache is None or blockid or delta:
+            return self._geturl(
+                self.store_url(txntype, key, blockid, delta, domain))
+
+        # read through the cache, values are always fetched from the block
+        # the cache is tagged with so the entries are consistent
+        headid = self.get_head()
+        self.StoreCache.set_block(headid)
+
+        cachekey = (txntype.TransactionTypeName, key, domain)
+        (found, value) = self.StoreCache.lookup(cachekey)
+        if found:
+            return value
+
+        value = self._geturl(
+            self.store_url(txntype, key, headid, domain=domain))
+        if headid:
+            self.StoreCache.insert(cachekey, value)
+        return value
+
+    def get_head(self):
+        """
+        Return the identifier of the most recently committed block. The
+        result is reused for HeadCheckInterval seconds.
+
+        :return: block id, or an empty string if there are no blocks
         """
-        return self._geturl(self.store_url(txntype, key, blockid, delta))
+        now = time.time()
+        if self._headid is None or \
+                now - self._headchecked >= self.HeadCheckInterval:
+            blockids = self.get_block_list(1)
+            self._headid = blockids[0] if blockids else ''
+            self._headchecked = now
+
+        return self._headid
 
     def get_block(self, blockid, field=None):
         """
@@ -214,6 +372,43 @@ class LedgerWebClient(object):
         """
         return self._geturl(self.transaction_url(txnid, field))
 
+    def get_snapshot(self, verify=True):
+        """
+        Retrieve the newest snapshot of the global store. The snapshot is
+        checked against its digest and its block must be part of the
+        committed chain of the validator. Both the digest and the chain come
+        from the same validator, the check detects a corrupted transfer but
+        does not make the snapshot trustworthy.
+
+        :param bool verify: check the snapshot before returning it
+        :return: dictionary with the BlockID, Digest and Stores of the
+            snapshot
+        """
+        manifest = self._geturl(self.snapshot_url())
+        snapshot = self._geturl(self.snapshot_url(manifest['BlockID']))
+
+        if verify:
+            try:
+                state_snapshot.verify_snapshot(snapshot, manifest['BlockID'],
+                                               manifest['Digest'])
+            except state_snapshot.SnapshotVerifyError as e:
+                raise MessageException('invalid snapshot; {0}'.format(e))
+
+            # the stream is closed explicitly so that its connection is
+            # released as soon as the block is found
+            blockids = self.iter_block_list()
+            try:
+                committed = manifest['BlockID'] in blockids
+            finally:
+                blockids.close()
+
+            if not committed:
+                raise MessageException(
+                    'snapshot block {0} is not in the committed chain'.format(
+                        manifest['BlockID']))
+
+        return snapshot
+
     def get_transaction_status(self, txnid):
         """
         Send a HEAD request to the ledger web server to retrieve the status
@@ -228,12 +423,11 @@ class LedgerWebClient(object):
         logger.debug('HEAD content from url <%s>', url)
 
         try:
-            request = urllib2.Request(url)
-            request.get_method = lambda: 'HEAD'
-            opener = urllib2.build_opener(self.ProxyHandler)
-            response = opener.open(request, timeout=30)
+            response = self._request('HEAD', url, timeout=30)
+            self._read_response(response)
+            self._call_completed(response.Timing)
+
             code = response.getcode()
-            response.close()
             if code == 200:
                 return transaction.Status.committed
             elif code == 302:
@@ -241,19 +435,8 @@ class LedgerWebClient(object):
             else:
                 return transaction.Status.unknown
 
-        except urllib2.HTTPError as err:
-            logger.error(
-                'peer operation on url {0} failed with response: {1}'.format(
-                    url, err.code))
-
-        except urllib2.URLError as err:
-            logger.error('peer operation on url {0} failed: {1}'.format(
-                url, err.reason))
-
-        except:
-            logger.error(
-                'no response from peer server for url {0}; {1}'.format(
-                    url, sys.exc_info()[0]))
+        except MessageException:
+            pass
 
         return transaction.Status.unknown
 
@@ -268,6 +451,40 @@ class LedgerWebClient(object):
         """
         return self._geturl(self.transaction_list_url(count))
 
+    def iter_store(self, txntype, key='*', blockid=''):
+        """
+        Stream the contents of a transaction store, the response is decoded
+        incrementally as it arrives so large stores can be processed in
+        constant memory.
+
+        Args:
+            txntype -- type of the transaction store to contact
+            key -- '*' to generate (key, value) tuples for every entry in the
+                store, or '' to generate the keys
+            blockid -- optional, read the store as of this block
+        """
+        return self._iterurl(self.store_url(txntype, key, blockid))
+
+    def iter_block_list(self, count=0):
+        """
+        Stream the list of committed block ids, newest to oldest.
+
+        :param int count: optional, maximum number of blocks to return, 0
+            implies all
+        :return: generator of block ids
+        """
+        return self._iterurl(self.block_list_url(count))
+
+    def iter_transaction_list(self, count=0):
+        """
+        Stream the list of committed transaction ids, oldest to newest.
+
+        :param int count: optional, maximum number of blocks of transactions to
+            return, 0 implies all
+        :return: generator of transaction ids
+        """
+        return self._iterurl(self.transaction_list_url(count))
+
     def initiate_message(self, msg):
         """
         Post a gossip message to the ledger and return the parsed response,
@@ -296,41 +513,45 @@ class LedgerWebClient(object):
 
         logger.debug('get content from url <%s>', url)
 
-        try:
-            request = urllib2.Request(url, headers=self.GET_HEADER)
-            opener = urllib2.build_opener(self.ProxyHandler)
-            response = opener.open(request, timeout=30)
+        response = self._request('GET', url, headers=self.GET_HEADER,
+                                 timeout=30)
 
-        except urllib2.HTTPError as err:
-            logger.error(
-                'peer operation on url {0} failed with response: {1}'.format(
-                    url, err.code))
-            raise MessageException('operation failed with resonse: {0}'.format(
-                err.code))
+        (encoding, content) = self._read_response(response)
 
-        except urllib2.URLError as err:
-            logger.error('peer operation on url {0} failed: {1}'.format(
-                url, err.reason))
-            raise MessageException('operation failed: {0}'.format(err.reason))
+        start = time.time()
+        value = self._decode(encoding, content)
 
-        except:
-            logger.error(
-                'no response from peer server for url {0}; {1}'.format(
-                    url, sys.exc_info()[0]))
-            raise MessageException('no response from server')
+        response.Timing.add_phase('decode', time.time() - start)
+        self._call_completed(response.Timing)
 
-        content = response.read()
-        headers = response.info()
-        response.close()
+        return value
+
+    def _iterurl(self, url):
+        """
+        Send an HTTP get request asking the validator to stream the response
+        and generate the items of the top level list or map as they are
+        decoded.
+        """
 
-        encoding = headers.get('Content-Type')
+        url += ('&' if '?' in url else '?') + 'stream=1'
 
-        if encoding == 'application/json':
-            return json2dict(content)
-        elif encoding == 'application/cbor':
-            return cbor2dict(content)
-        else:
-            return content
+        logger.debug('stream content from url <%s>', url)
+
+        response = self._request('GET', url, headers=self.GET_HEADER,
+                                 timeout=30)
+
+        # transfer and decoding are interleaved so they are reported
+        # together as the transfer phase
+        start = time.time()
+        try:
+            encoding = response.info().get('Content-Type')
+            for item in stream_decoder.iter_content(response, encoding):
+                yield item
+        finally:
+            response.close()
+            response.Timing.add_phase('transfer', time.time() - start)
+            response.Timing.BytesReceived = response.BytesRead
+            self._call_completed(response.Timing)
 
     def _posturl(self, url, info, encoding='application/cbor'):
         """
@@ -338,61 +559,240 @@ class LedgerWebClient(object):
         and return the corresponding dictionary.
         """
 
-        if encoding == 'application/json':
-            data = dict2json(info)
-        elif encoding == 'application/cbor':
-            data = dict2cbor(info)
-        else:
-            logger.error('unknown request encoding %s', encoding)
+        data = self._encode(info, encoding)
+        if data is None:
             return None
 
         datalen = len(data)
 
-        logger.debug('post transaction to %s with DATALEN=%d, DATA=<%s>', url,
-                     datalen, data)
+        logger.debug('post transaction to %s with DATALEN=%d', url, datalen)
 
-        try:
-            request = urllib2.Request(url, data,
-                                      {'Content-Type': 'application/cbor',
-                                       'Content-Length': datalen})
-            opener = urllib2.build_opener(self.ProxyHandler)
-            response = opener.open(request, timeout=10)
+        response = self._request('POST', url, data,
+                                 {'Content-Type': 'application/cbor',
+                                  'Content-Length': datalen},
+                                 timeout=10)
 
-        except urllib2.HTTPError as err:
-            logger.error(
-                'peer operation on url {0} failed with response: {1}'.format(
-                    url, err.code))
-            raise MessageException('operation failed with resonse: {0}'.format(
-                err.code))
+        (encoding, content) = self._read_response(response)
 
-        except urllib2.URLError as err:
-            logger.error('peer operation on url {0} failed: {1}'.format(
-                url, err.reason))
-            raise MessageException('operation failed: {0}'.format(err.reason))
+        start = time.time()
+        if encoding in ['application/json', 'application/cbor']:
+            value = self._decode(encoding, content)
+        else:
+            logger.info('server responds with message %s of unknown type %s',
+                        content, encoding)
+            value = dict()
+
+        response.Timing.add_phase('decode', time.time() - start)
+        self._call_completed(response.Timing)
+
+        return value
 
-        except NameError as err:
-            logger.error('name error {0}', err)
-            raise MessageException('operation failed: {0}'.format(url))
+    def _read_response(self, response):
+        """
+        Read the complete body of a response and release the connection.
+
+        Returns:
+            tuple: (content type, content)
+        """
+        start = time.time()
+        content = response.read()
+        encoding = response.info().get('Content-Type')
+        response.close()
+
+        response.Timing.add_phase('transfer', time.time() - start)
+        response.Timing.BytesReceived = len(content)
+
+        return (encoding, content)
+
+    def _request(self, method, url, data=None, headers=None, timeout=30):
+        """
+        Send an HTTP request to one of the validators over a pooled
+        persistent connection. Requests that fail because of the validator
+        are retried on the healthiest remaining validator after a backoff
+        delay, requests that are not idempotent only if they were never
+        sent. Responses with an error status are closed and reported as a
+        MessageException; HEAD requests also accept 302.
+        """
+
+        tried = set()
+        attempt = 0
+        while True:
+            try:
+                if method == 'GET' and self.HedgeDelay is not None and \
+                        len(self.Endpoints) > 1:
+                    return self._hedged_request(method, url, headers, timeout,
+                                                tried)
+
+                endpoint = self.Endpoints.select(tried)
+                tried.add(endpoint.URL)
+                return self._send(endpoint, method, url, data, headers,
+                                  timeout)
+
+            except EndpointException:
+                if attempt >= self.RetryPolicy.Retries:
+                    raise
+
+            if len(tried) >= len(self.Endpoints):
+                tried.clear()
+
+            time.sleep(self.RetryPolicy.delay(attempt))
+            attempt += 1
+
+    def _hedged_request(self, method, url, headers, timeout, tried):
+        """
+        Send a request to the best validator and, if it has not responded
+        within HedgeDelay seconds, to the next best one as well. The first
+        successful response is returned, the other is closed when it
+        arrives.
+        """
+
+        results = Queue.Queue()
+
+        def _worker(endpoint):
+            try:
+                results.put((True, self._send(endpoint, method, url, None,
+                                              headers, timeout)))
+            except MessageException as e:
+                results.put((False, e))
+
+        def _launch():
+            endpoint = self.Endpoints.select(tried)
+            tried.add(endpoint.URL)
+            thread = threading.Thread(target=_worker, args=(endpoint, ))
+            thread.daemon = True
+            thread.start()
+
+        _launch()
+        outstanding = 1
+        hedged = False
+        error = None
+
+        while outstanding > 0:
+            try:
+                (success, result) = results.get(
+                    timeout=None if hedged else self.HedgeDelay)
+            except Queue.Empty:
+                hedged = True
+                if len(tried) < len(self.Endpoints):
+                    logger.debug('hedge request for url %s', url)
+                    _launch()
+                    outstanding += 1
+                continue
+
+            outstanding -= 1
+            if success:
+                if outstanding > 0:
+                    self._discard_responses(results, outstanding)
+                return result
+
+            error = result
+            # a validator failed before the hedge delay, try another one
+            # immediately rather than waiting for the retry
+            if not hedged and isinstance(error, EndpointException) and \
+                    len(tried) < len(self.Endpoints):
+                _launch()
+                outstanding += 1
+
+        raise error
+
+    @staticmethod
+    def _discard_responses(results, count):
+        def _drain():
+            for _ in range(count):
+                (success, result) = results.get()
+                if success:
+                    result.read()
+                    result.close()
+
+        thread = threading.Thread(target=_drain)
+        thread.daemon = True
+        thread.start()
+
+    def _send(self, endpoint, method, url, data, headers, timeout):
+        """
+        Send a single request to one validator and update its health.
+        """
+
+        url = self._rebase_url(url, endpoint.URL)
+        timing = client_metrics.CallTiming(method, url)
+        start = time.time()
+
+        try:
+            response = self.ConnectionPool.request(method, url, data, headers,
+                                                   timeout=timeout,
+                                                   timing=timing)
+
+        except (httplib.HTTPException, socket.error) as err:
+            self.Endpoints.record_failure(endpoint)
+            logger.error('peer operation on url {0} failed: {1}'.format(
+                url, err))
+            self._call_failed(timing, start, str(err))
+            exception = self._failure_exception(method, err)
+            raise exception('operation failed: {0}'.format(err))
 
         except:
+            self.Endpoints.record_failure(endpoint)
             logger.error(
                 'no response from peer server for url {0}; {1}'.format(
                     url, sys.exc_info()[0]))
-            raise MessageException('no response from server')
+            self._call_failed(timing, start, 'no response from server')
+            raise self._failure_exception(method)('no response from server')
 
-        content = response.read()
-        headers = response.info()
-        response.close()
+        code = response.getcode()
+        timing.Status = code
+        if code >= 500:
+            self.Endpoints.record_failure(endpoint)
+        else:
+            self.Endpoints.record_success(endpoint, time.time() - start)
 
-        encoding = headers.get('Content-Type')
+        if code >= 400 or (code >= 300 and method != 'HEAD'):
+            self._read_response(response)
+            timing.Error = 'response status {0}'.format(code)
+            self._call_completed(timing)
+            logger.error(
+                'peer operation on url {0} failed with response: {1}'.format(
+                    url, code))
+            exception = self._failure_exception(method) if code >= 500 \
+                else MessageException
+            raise exception('operation failed with resonse: {0}'.format(code))
 
-        if encoding == 'application/json':
-            value = json2dict(content)
-        elif encoding == 'application/cbor':
-            value = cbor2dict(content)
-        else:
-            logger.info('server responds with message %s of unknown type %s',
-                        content, encoding)
-            value = dict()
+        return response
 
-        return value
+    def _call_failed(self, timing, start, error):
+        """
+        Report a request that did not get a response; the time not
+        accounted to a completed phase is reported as the failed phase.
+        """
+        timing.Error = error
+        timing.add_phase('failed', time.time() - start - timing.Total)
+        self._call_completed(timing)
+
+    @staticmethod
+    def _failure_exception(method, error=None):
+        """
+        Pick the exception for a failed request. A request that may have
+        reached the validator is only retried on another validator if it is
+        idempotent, a transaction that was posted must not be submitted
+        twice.
+        """
+        if method in connection_pool.HTTPConnectionPool.IdempotentMethods or \
+                isinstance(error, connection_pool.ConnectionFailed):
+            return EndpointException
+        return MessageException
+
+    def _rebase_url(self, url, baseurl):
+        """
+        Direct a url built from LedgerURL to another validator, the path
+        of LedgerURL is replaced by the path of the other validator's url.
+        """
+        parts = urlparse.urlsplit(url)
+        base = urlparse.urlsplit(baseurl)
+
+        path = parts.path
+        prefix = urlparse.urlsplit(self.LedgerURL).path.rstrip('/')
+        if prefix and (path == prefix or path.startswith(prefix + '/')):
+            path = path[len(prefix):]
+        path = base.path.rstrip('/') + path
+
+        return urlparse.urlunsplit((base.scheme, base.netloc, path,
+                                    parts.query, parts.fragment))
@@ -0,0 +1,318 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the log handlers used by the validator
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import Queue
+import shutil
+import threading
+import time
+
+
+class QueueHandler(logging.Handler):
+    """
+    Hand log records to a background thread that writes them to a target
+    handler, so that logging never waits on I/O in the reactor thread.
+
+    Records are formatted into their message in the calling thread since
+    their arguments may change once the call returns. When the queue is
+    full a record is either dropped and counted, or the caller waits for
+    room, depending on Overflow; the writer reports dropped records
+    through the target.
+
+    Attributes:
+        Target (logging.Handler): handler that writes the records
+        Overflow (str): 'drop' or 'block'
+        Dropped (int): number of records dropped because the queue was full
+    """
+
+    def __init__(self, target, maxsize=10000, overflow='drop'):
+        logging.Handler.__init__(self)
+        if overflow not in ['drop', 'block']:
+            raise ValueError('unknown overflow policy {0}'.format(overflow))
+
+        self.Target = target
+        self.Overflow = overflow
+        self.Dropped = 0
+
+        self._queue = Queue.Queue(maxsize)
+        self._reported = 0
+        self._thread = threading.Thread(target=self._run, name='LogWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            record = self.prepare(record)
+            if self.Overflow == 'block':
+                self._queue.put(record)
+                return
+
+            try:
+                self._queue.put_nowait(record)
+            except Queue.Full:
+                self.Dropped += 1
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+
+    def flush(self):
+        """
+        Wait for the queued records to be written.
+        """
+        if self._thread.is_alive():
+            self._queue.join()
+        self.Target.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(5.0)
+        self.Target.close()
+        logging.Handler.close(self)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+
+                self._report_dropped(record)
+                self.Target.handle(record)
+            finally:
+                self._queue.task_done()
+
+    def _report_dropped(self, record):
+        dropped = self.Dropped
+        if dropped == self._reported:
+            return
+
+        notice = logging.LogRecord(
+            record.name, logging.WARNING, __file__, 0,
+            'log queue full, dropped %d records', (dropped - self._reported,),
+            None)
+        self._reported = dropped
+        self.Target.handle(notice)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most Rate records per second of each level up to
+    MaximumLevel, with bursts of up to Burst records; records of a higher
+    level always pass. Suppressed records are counted and the count is
+    added to the next record of the same level that passes. Suppressed
+    records are never formatted.
+
+    Attributes:
+        Rate (float): records per second let through for each level
+        Burst (int): records that may pass at once after a quiet period
+        MaximumLevel (int): records above this level are not limited
+        Suppressed (int): total number of suppressed records
+    """
+
+    def __init__(self, rate, burst=None, maxlevel=logging.INFO):
+        logging.Filter.__init__(self)
+        self.Rate = float(rate)
+        self.Burst = burst if burst is not None else max(1, int(rate))
+        self.MaximumLevel = maxlevel
+        self.Suppressed = 0
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def filter(self, record):
+        if record.levelno > self.MaximumLevel:
+            return True
+
+        with self._lock:
+            (tokens, last, suppressed) = self._buckets.get(
+                record.levelno, (self.Burst, record.created, 0))
+
+            tokens = min(self.Burst,
+                         tokens + (record.created - last) * self.Rate)
+            if tokens < 1.0:
+                self._buckets[record.levelno] = (tokens, record.created,
+                                                 suppressed + 1)
+                self.Suppressed += 1
+                return False
+
+            self._buckets[record.levelno] = (tokens - 1.0, record.created, 0)
+
+        if suppressed:
+            record.msg = '{0} [{1} similar records suppressed]'.format(
+                record.getMessage(), suppressed)
+            record.args = None
+
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format a record as a single line JSON object with the time, level,
+    module, node name and message. Additional fields are passed in the
+    'fields' dict of the extra argument of the log call, e.g.
+    logger.info('block committed', extra={'fields': {'BlockID': blkid}}).
+    """
+
+    def __init__(self, nodename=None):
+        logging.Formatter.__init__(self)
+        self.NodeName = nodename
+
+    def format(self, record):
+        entry = {
+            'Timestamp': record.created,
+            'Level': record.levelname,
+            'LevelNo': record.levelno,
+            'Module': record.module,
+            'Message': record.getMessage()
+        }
+
+        if self.NodeName:
+            entry['Node'] = self.NodeName
+
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry['Fields'] = fields
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['Exception'] = record.exc_text
+
+        return json.dumps(entry, sort_keys=True, default=str)
+
+
+class CompressingRotatingFileHandler(logging.FileHandler):
+    """
+    A file handler that starts a new file once the current one reaches
+    MaximumBytes or is older than Interval seconds. The rotated file is
+    renamed with the time of the rotation and compressed by a background
+    thread; only the newest BackupCount rotated files are kept.
+
+    Attributes:
+        MaximumBytes (int): rotate at this size, 0 disables
+        Interval (float): rotate after this many seconds, 0 disables
+        BackupCount (int): number of rotated files kept
+        Compress (bool): gzip the rotated files
+    """
+
+    def __init__(self, filename, maxbytes=0, interval=0, backupcount=5,
+                 compress=True):
+        logging.FileHandler.__init__(self, filename)
+        self.MaximumBytes = maxbytes
+        self.Interval = interval
+        self.BackupCount = backupcount
+        self.Compress = compress
+
+        self._opened = time.time()
+        self._compressor = None
+
+    def emit(self, record):
+        try:
+            if self.should_rollover(record):
+                self.rollover()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            self.handleError(record)
+            return
+
+        logging.FileHandler.emit(self, record)
+
+    def should_rollover(self, record):
+        if self.Interval and record.created - self._opened >= self.Interval:
+            return True
+
+        if self.MaximumBytes and self.stream:
+            self.stream.seek(0, 2)
+            return self.stream.tell() >= self.MaximumBytes
+
+        return False
+
+    def rollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        rotated = '{0}.{1}'.format(self.baseFilename,
+                                   time.strftime('%Y%m%d-%H%M%S'))
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = '{0}.{1}-{2}'.format(
+                self.baseFilename, time.strftime('%Y%m%d-%H%M%S'), suffix)
+            suffix += 1
+
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, rotated)
+
+        self.stream = self._open()
+        self._opened = time.time()
+
+        # only one compression runs at a time, a slow one is waited for
+        # rather than piling up threads
+        if self._compressor and self._compressor.is_alive():
+            self._compressor.join()
+        self._compressor = threading.Thread(target=self._finish_rotation,
+                                            args=(rotated,),
+                                            name='LogCompressor')
+        self._compressor.daemon = True
+        self._compressor.start()
+
+    def close(self):
+        if self._compressor and self._compressor.is_alive():
+            self._compressor.join()
+        logging.FileHandler.close(self)
+
+    def rotated_files(self):
+        """
+        Return the rotated files, newest first.
+        """
+        files = glob.glob(self.baseFilename + '.*')
+        return sorted(files, key=os.path.getmtime, reverse=True)
+
+    def _finish_rotation(self, rotated):
+        if self.Compress:
+            try:
+                with open(rotated, 'rb') as fin:
+                    with gzip.open(rotated + '.gz', 'wb') as fout:
+                        shutil.copyfileobj(fin, fout)
+                os.remove(rotated)
+            except (IOError, OSError):
+                # the log is not usable for reporting this, leave the file
+                # uncompressed
+                pass
+
+        for filename in self.rotated_files()[self.BackupCount:]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
@@ -0,0 +1,100 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements changes of the log levels of a running validator
+"""
+
+import logging
+import time
+
+from twisted.internet import reactor
+
+logger = logging.getLogger(__name__)
+
+LevelNames = ['CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG', 'NOTSET']
+
+
+class LogLevelController(object):
+    """
+    Change the level of the root logger or of a module logger, optionally
+    reverting to the level it had before the first change after a number
+    of seconds. Records are filtered by the loggers only, the handlers
+    created by log_setup accept every level.
+    """
+
+    def __init__(self):
+        self._original = {}
+        self._reverts = {}
+
+    def set_level(self, level, name=None, duration=0):
+        """
+        Set the level of a logger.
+
+        Args:
+            level (str): the level name, e.g. DEBUG
+            name (str): the logger name, None or '' for the root logger
+            duration (float): seconds after which the level is reverted,
+                0 keeps it
+
+        Raises:
+            ValueError: the level is not a known level name
+        """
+        level = str(level).upper()
+        if level not in LevelNames:
+            raise ValueError('unknown log level {0}'.format(level))
+
+        name = name or ''
+        target = logging.getLogger(name or None)
+        self._original.setdefault(name, target.level)
+        self._cancel(name)
+
+        target.setLevel(getattr(logging, level))
+        if duration > 0:
+            self._reverts[name] = reactor.callLater(duration, self.revert,
+                                                    name)
+
+        logger.warn('log level of %s set to %s%s', name or 'root', level,
+                    ' for {0}s'.format(duration) if duration > 0 else '')
+
+    def revert(self, name=None):
+        """
+        Restore the level a logger had before it was first changed.
+        """
+        name = name or ''
+        self._cancel(name)
+        if name not in self._original:
+            return
+
+        target = logging.getLogger(name or None)
+        target.setLevel(self._original.pop(name))
+        logger.warn('log level of %s reverted to %s', name or 'root',
+                    logging.getLevelName(target.level))
+
+    def dump(self):
+        levels = {}
+        for name in self._original:
+            target = logging.getLogger(name or None)
+            levels[name or 'root'] = logging.getLevelName(target.level)
+
+        reverts = {}
+        for (name, timer) in self._reverts.iteritems():
+            reverts[name or 'root'] = max(0.0, timer.getTime() - time.time())
+
+        return {'Levels': levels, 'Reverts': reverts}
+
+    def _cancel(self, name):
+        timer = self._reverts.pop(name, None)
+        if timer and timer.active():
+            timer.cancel()
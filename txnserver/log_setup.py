@@ -20,6 +20,10 @@ import warnings
 
 from colorlog import ColoredFormatter
 
+from txnserver.log_handlers import CompressingRotatingFileHandler
+from txnserver.log_handlers import JsonFormatter, QueueHandler
+from txnserver.log_handlers import RateLimitFilter
+
 
 def setup_loggers(config):
     loglevel = getattr(
@@ -34,10 +38,25 @@ def setup_loggers(config):
                 os.path.abspath(os.path.dirname(logfile))))
             sys.exit(-1)
 
-        flog = logging.FileHandler(logfile)
-        flog.setFormatter(logging.Formatter(
-            '[%(asctime)s, %(levelno)d, %(module)s] %(message)s', "%H:%M:%S"))
-        logger.addHandler(flog)
+        maxbytes = config.get('LogMaxBytes', 0)
+        interval = config.get('LogRotateInterval', 0)
+        if maxbytes or interval:
+            flog = CompressingRotatingFileHandler(
+                logfile,
+                maxbytes=maxbytes,
+                interval=interval,
+                backupcount=config.get('LogBackupCount', 5),
+                compress=config.get('LogCompress', True))
+        else:
+            flog = logging.FileHandler(logfile)
+
+        if config.get('LogFormat', 'text') == 'json':
+            flog.setFormatter(JsonFormatter(config.get('NodeName')))
+        else:
+            flog.setFormatter(logging.Formatter(
+                '[%(asctime)s, %(levelno)d, %(module)s] %(message)s',
+                "%H:%M:%S"))
+        logger.addHandler(_limited(config, _queued(config, flog)))
     else:
         clog = logging.StreamHandler()
         formatter = ColoredFormatter(
@@ -53,6 +72,43 @@ def setup_loggers(config):
                 'CRITICAL': 'red',
             })
 
+        # levels are only set on the loggers so that they can be changed
+        # while the validator runs
         clog.setFormatter(formatter)
-        clog.setLevel(loglevel)
-        logger.addHandler(clog)
+        logger.addHandler(_limited(config, _queued(config, clog)))
+
+
+def _queued(config, handler):
+    """
+    Wrap a handler so that its records are written by a background thread,
+    unless LogQueueSize is 0.
+    """
+    size = config.get('LogQueueSize', 10000)
+    if size <= 0:
+        return handler
+
+    qhandler = QueueHandler(handler, maxsize=size,
+                            overflow=config.get('LogOverflow', 'drop'))
+    qhandler.setLevel(handler.level)
+    return qhandler
+
+
+def _limited(config, handler):
+    """
+    Attach the rate limits in LogRateLimits, keyed by logger name with '*'
+    applying to every record written by the handler, e.g.
+    {"txnserver.web_api": {"Rate": 10, "Burst": 20, "Level": "INFO"}}.
+    A limit on a named logger applies to the records logged through that
+    logger, not to the ones of its children.
+    """
+    for (name, limit) in config.get('LogRateLimits', {}).iteritems():
+        ratefilter = RateLimitFilter(
+            limit.get('Rate', 10),
+            burst=limit.get('Burst'),
+            maxlevel=getattr(logging, limit.get('Level', 'INFO')))
+        if name == '*':
+            handler.addFilter(ratefilter)
+        else:
+            logging.getLogger(name).addFilter(ratefilter)
+
+    return handler
@@ -14,8 +14,13 @@
 # ------------------------------------------------------------------------------
 
 import logging
+import time
 
-from txnserver import validator
+from twisted.internet import task
+
+from txnserver import peer_selection, validator
+from txnserver.block_size_controller import BlockSizeController, ReactorLag
+from txnserver.wait_time_tuner import WaitTimeTuner
 from journal.consensus.poet import poet_journal, wait_certificate
 from ledger.transaction import endpoint_registry
 
@@ -25,8 +30,28 @@ logger = logging.getLogger(__name__)
 class LotteryValidator(validator.Validator):
     EndpointDomain = '/LotteryValidator'
 
-    def __init__(self, config, windows_service=False):
-        super(LotteryValidator, self).__init__(config, windows_service)
+    ReloadableConfiguration = validator.Validator.ReloadableConfiguration + [
+        'TargetWaitTime', 'MinimumWaitTime', 'MinTransactionsPerBlock',
+        'MaxTransactionsPerBlock'
+    ]
+
+    def __init__(self, config, windows_service=False, timer=None):
+        # set when the AdaptiveBlockSize configuration variable is true
+        self.BlockSizeController = None
+        self._blocksizetask = None
+        self._reactorlag = None
+
+        # set when the WaitTimeTuning configuration variable is set
+        self.WaitTimeTuner = None
+        self._waittimetask = None
+
+        # follows the committed head for the block size controller and the
+        # wait time tuner
+        self._headtask = None
+        self._lastblockid = None
+        self._lastheadtime = None
+
+        super(LotteryValidator, self).__init__(config, windows_service, timer)
 
     def initialize_ledger_specific_configuration(self):
         """
@@ -65,6 +90,190 @@ class LotteryValidator(validator.Validator):
             poet_journal.PoetJournal.MaximumTransactionsPerBlock = int(
                 self.Config['MaxTransactionsPerBlock'])
 
+        # a configured block size becomes the starting point of the
+        # controller; without one the journal holds the adapted limits,
+        # which must not be mistaken for configured ones
+        if self.BlockSizeController:
+            if 'MinTransactionsPerBlock' in self.Config:
+                self.BlockSizeController.ConfiguredMinimum = int(
+                    self.Config['MinTransactionsPerBlock'])
+            if 'MaxTransactionsPerBlock' in self.Config:
+                self.BlockSizeController.MaximumTransactions = int(
+                    self.Config['MaxTransactionsPerBlock'])
+        if self.WaitTimeTuner:
+            self.WaitTimeTuner.TargetWaitTime = \
+                wait_certificate.WaitTimer.TargetWaitTime
+
+        self.set_block_size(
+            poet_journal.PoetJournal.MinimumTransactionsPerBlock,
+            poet_journal.PoetJournal.MaximumTransactionsPerBlock)
+
+    def set_block_size(self, minimum, maximum):
+        poet_journal.PoetJournal.MinimumTransactionsPerBlock = minimum
+        poet_journal.PoetJournal.MaximumTransactionsPerBlock = maximum
+
+        # once created the ledger may hold its own copy of the limits
+        ledger = getattr(self, 'Ledger', None)
+        if ledger is not None:
+            ledger.MinimumTransactionsPerBlock = minimum
+            ledger.MaximumTransactionsPerBlock = maximum
+
+    def start_ledger_specific_services(self):
+        if self.Config.get('AdaptiveBlockSize', False):
+            (lower, upper) = self.Config.get('BlockSizeBounds', [1, 5000])
+            self.BlockSizeController = BlockSizeController(
+                minimum=poet_journal.PoetJournal.MinimumTransactionsPerBlock,
+                maximum=poet_journal.PoetJournal.MaximumTransactionsPerBlock,
+                lower=lower,
+                upper=upper,
+                blockinterval=wait_certificate.WaitTimer.TargetWaitTime)
+
+            self._reactorlag = ReactorLag()
+            self._reactorlag.start()
+
+            self._blocksizetask = task.LoopingCall(self.update_block_size)
+            self._blocksizetask.start(
+                self.Config.get('BlockSizeInterval', 10.0), now=False)
+
+        tuning = self.Config.get('WaitTimeTuning')
+        if tuning == 'apply':
+            # the wait certificates of every validator are checked against
+            # the local target wait time, a value changed by one validator
+            # alone makes the others reject its blocks
+            logger.warn('WaitTimeTuning "apply" is not supported, the target '
+                        'wait time is only recommended; set TargetWaitTime '
+                        'on every validator and use txnadmin reload')
+
+        if tuning in ['recommend', 'apply']:
+            (lower, upper) = self.Config.get('WaitTimeBounds', [5.0, 120.0])
+            self.WaitTimeTuner = WaitTimeTuner(
+                wait_certificate.WaitTimer.TargetWaitTime,
+                lower=lower,
+                upper=upper,
+                forktarget=self.Config.get('ForkRateTarget', 0.05))
+
+            self._waittimetask = task.LoopingCall(self.update_wait_time)
+            self._waittimetask.start(
+                self.Config.get('WaitTimeInterval', 300.0), now=False)
+
+        if self.BlockSizeController or self.WaitTimeTuner:
+            self._lastblockid = self.Ledger.MostRecentCommitedBlockID
+            self._lastheadtime = time.time()
+            self._headtask = task.LoopingCall(self.check_head)
+            self._headtask.start(1.0, now=False)
+
+    def stop_ledger_specific_services(self):
+        for looper in [self._headtask, self._blocksizetask,
+                       self._waittimetask]:
+            if looper and looper.running:
+                looper.stop()
+        if self._reactorlag:
+            self._reactorlag.stop()
+
+    def check_head(self):
+        """
+        Report a change of the committed head to the block size controller
+        and the wait time tuner.
+        """
+        blockid = self.Ledger.MostRecentCommitedBlockID
+        if blockid == self._lastblockid:
+            return
+        if blockid not in self.Ledger.BlockStore:
+            return
+
+        now = time.time()
+        size = len(self.Ledger.BlockStore[blockid].TransactionIDs)
+
+        if self.BlockSizeController:
+            # block validation runs in the reactor thread, the longest stall
+            # since the previous head covers the validation of this block
+            self.BlockSizeController.observe_block(size,
+                                                   self._reactorlag.collect())
+
+        if self.WaitTimeTuner:
+            fork = not self._extends(blockid, self._lastblockid)
+            self.WaitTimeTuner.observe_block(now - self._lastheadtime, size,
+                                             fork)
+
+        self._lastblockid = blockid
+        self._lastheadtime = now
+
+    def update_block_size(self):
+        (minimum, maximum) = self.BlockSizeController.update(
+            len(self.Ledger.PendingTransactions), self._mean_peer_rtt())
+        self.set_block_size(minimum, maximum)
+
+    def update_wait_time(self):
+        """
+        Log a new recommended target wait time. The recommendation is not
+        applied here, it has to be the same on every validator.
+        """
+        recommended = self.WaitTimeTuner.recommend(
+            self._population(), self._mean_peer_rtt(),
+            poet_journal.PoetJournal.MaximumTransactionsPerBlock)
+
+        current = wait_certificate.WaitTimer.TargetWaitTime
+        if abs(recommended - current) < 0.01 * current:
+            return
+
+        logger.info('recommended target wait time %.1f, currently %.1f',
+                    recommended, current)
+
+    def dump_status(self):
+        status = super(LotteryValidator, self).dump_status()
+        if self.WaitTimeTuner:
+            status['WaitTime'] = self.WaitTimeTuner.dump()
+        if self.BlockSizeController:
+            status['BlockSize'] = {
+                'MinimumTransactions':
+                self.BlockSizeController.MinimumTransactions,
+                'MaximumTransactions':
+                self.BlockSizeController.MaximumTransactions,
+                'CostPerTransaction':
+                self.BlockSizeController.CostPerTransaction
+            }
+        return status
+
+    def _mean_peer_rtt(self):
+        # a block reaches the peers in one hop, the mean round trip time to
+        # the peers approximates the delay of that hop
+        rtts = [peer_selection.measured_rtt(p, self.PeerConnector)
+                for p in self.Ledger.peer_list()]
+        rtts = [r for r in rtts if r is not None]
+        return sum(rtts) / len(rtts) if rtts else 0.0
+
+    def _population(self):
+        """
+        Number of lottery validators in the endpoint registry.
+        """
+        storemap = self.Ledger.GlobalStoreMap.get_block_store(
+            self.Ledger.MostRecentCommitedBlockID)
+        txntype = endpoint_registry.EndpointRegistryTransaction
+        if not storemap or \
+                txntype.TransactionTypeName not in storemap.TransactionStores:
+            return 0
+
+        store = storemap.get_transaction_store(txntype.TransactionTypeName)
+        return len([k for k in store.keys()
+                    if store[k].get('Domain', '/').startswith(
+                        self.EndpointDomain)])
+
+    def _extends(self, blockid, previousid, depth=10):
+        """
+        Return True if previousid is among the last few ancestors of blockid.
+        """
+        if previousid is None:
+            return True
+
+        for _ in range(depth):
+            if blockid == previousid:
+                return True
+            if blockid not in self.Ledger.BlockStore:
+                return False
+            blockid = self.Ledger.BlockStore[blockid].PreviousBlockID
+
+        return False
+
     def initialize_ledger_from_node(self, node):
         """
         Initialize the ledger object for the local node, expected to be
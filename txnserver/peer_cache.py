@@ -0,0 +1,127 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the on-disk cache of the peers a validator was last
+connected to, it lets a restarted validator rejoin the network without
+waiting for the LedgerURL
+"""
+
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PeerCache(object):
+    """
+    A file containing the last known good peers of the validator.
+
+    Attributes:
+        FileName (str): name of the cache file
+        MaximumAge (float): entries saved longer ago than this are ignored
+        MaximumPeers (int): maximum number of peers written to the file
+    """
+
+    def __init__(self, filename, maxage=7 * 24 * 3600.0, maxpeers=32):
+        self.FileName = filename
+        self.MaximumAge = maxage
+        self.MaximumPeers = maxpeers
+
+    def load(self):
+        """
+        Read the cached peers, fastest first.
+
+        Returns:
+            list: dicts with the Identifier, Name, Host, Port and RTT of each
+                peer; an empty list if there is no usable cache
+        """
+        if not os.path.exists(self.FileName):
+            return []
+
+        try:
+            with open(self.FileName) as fp:
+                info = json.load(fp)
+        except (IOError, ValueError) as e:
+            logger.warn('unable to read peer cache %s; %s', self.FileName,
+                        str(e))
+            return []
+
+        age = time.time() - info.get('Saved', 0)
+        if age > self.MaximumAge:
+            logger.info('ignore peer cache %s saved %d seconds ago',
+                        self.FileName, age)
+            return []
+
+        peers = [p for p in info.get('Peers', [])
+                 if p.get('Identifier') and p.get('Host') and p.get('Port')]
+        return sorted(peers, key=self._rtt_key)
+
+    def save(self, peers):
+        """
+        Write the peers to the cache, replacing the previous contents. An
+        empty list does not replace a previously saved set.
+
+        Args:
+            peers (list): dicts with the Identifier, Name, Host, Port and
+                RTT of each peer
+        """
+        if not peers:
+            return
+
+        peers = sorted(peers, key=self._rtt_key)[:self.MaximumPeers]
+        info = {'Saved': time.time(), 'Peers': peers}
+
+        # write to a temporary file and rename it so that a crash while
+        # saving never leaves a truncated cache behind
+        tmpname = self.FileName + '.tmp'
+        try:
+            with open(tmpname, 'w') as fp:
+                json.dump(info, fp, indent=2, sort_keys=True)
+            if os.name == 'nt' and os.path.exists(self.FileName):
+                os.remove(self.FileName)
+            os.rename(tmpname, self.FileName)
+        except (IOError, OSError) as e:
+            logger.warn('unable to write peer cache %s; %s', self.FileName,
+                        str(e))
+            return
+
+        logger.debug('saved %d peers to %s', len(peers), self.FileName)
+
+    @staticmethod
+    def _rtt_key(peer):
+        # peers without a measured round trip time go last
+        rtt = peer.get('RTT')
+        return (rtt is None, rtt)
+
+
+def peer_info(peer, rtt=None):
+    """
+    Build the cache entry for a gossip node.
+
+    Args:
+        peer (gossip.node.Node): the peer
+        rtt (float): measured round trip time to the peer, if known
+    """
+    (host, port) = peer.NetAddress
+
+    return {
+        'Identifier': peer.Identifier,
+        'Name': peer.Name,
+        'Host': host,
+        'Port': port,
+        'RTT': rtt
+    }
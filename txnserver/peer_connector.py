@@ -0,0 +1,209 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements connection establishment with peers driven by the
+connect reply messages rather than by fixed polling intervals
+"""
+
+import logging
+import time
+
+from twisted.internet import defer, reactor
+
+from gossip.messages import connect_message
+from txnserver.failover import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class PeerConnectionFailed(Exception):
+    pass
+
+
+class _PeerAttempt(object):
+    def __init__(self, peer):
+        self.Peer = peer
+        self.Attempts = 0
+        self.SentTime = None
+        self.Timer = None
+
+    def cancel(self):
+        if self.Timer is not None and self.Timer.active():
+            self.Timer.cancel()
+        self.Timer = None
+
+
+class PeerConnector(object):
+    """
+    Send connect requests to peers and follow the connect replies. A peer
+    that does not reply within Timeout seconds is retried with exponential
+    backoff until RetryPolicy.Retries retries have been made.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        Timeout (float): seconds to wait for the reply to a connect request
+        RetryPolicy (failover.RetryPolicy): delay between attempts
+        RoundTripTimes (dict): seconds between a connect request and its
+            reply by peer identifier; only replies to a first attempt are
+            measured since a reply to a resent request is ambiguous
+    """
+
+    def __init__(self, ledger, timeout=2.0, retry=None):
+        self.Ledger = ledger
+        self.Timeout = timeout
+        self.RetryPolicy = retry or RetryPolicy(retries=5, initialdelay=0.5,
+                                                maximumdelay=8.0)
+
+        self.RoundTripTimes = {}
+
+        self._pending = {}
+        self._waiting = []
+        self._installed = False
+
+    def connect(self, peers):
+        """
+        Send connect requests to the peers that are not yet connected.
+
+        Args:
+            peers (list): gossip nodes already added to the ledger
+
+        Returns:
+            Deferred: fires with the first of the peers to confirm the
+                connection, or immediately if one of them is already
+                connected; fails with PeerConnectionFailed once every
+                attempt for these peers is exhausted
+        """
+        self._install()
+
+        d = defer.Deferred()
+
+        connected = set(p.Identifier for p in self.Ledger.peer_list())
+        for peer in peers:
+            if peer.Identifier in connected:
+                d.callback(peer)
+                return d
+
+        if not peers:
+            d.errback(PeerConnectionFailed('no peers to connect to'))
+            return d
+
+        self._waiting.append((d, set(p.Identifier for p in peers)))
+        for peer in peers:
+            if peer.Identifier not in self._pending:
+                self._pending[peer.Identifier] = _PeerAttempt(peer)
+                self._send(peer.Identifier)
+
+        return d
+
+    def cancel(self, peers=None):
+        """
+        Stop outstanding connection attempts.
+
+        Args:
+            peers (list): gossip nodes to stop connecting to, all of the
+                outstanding attempts if not specified
+        """
+        if peers is None:
+            peerids = self._pending.keys()
+        else:
+            peerids = [p.Identifier for p in peers]
+
+        for peerid in peerids:
+            attempt = self._pending.pop(peerid, None)
+            if attempt is not None:
+                attempt.cancel()
+
+        self._fail_exhausted('connection attempts cancelled')
+
+    def _install(self):
+        """
+        Wrap the ledger's connect reply handler so that every reply is also
+        reported here.
+        """
+        if self._installed:
+            return
+
+        msgtype = connect_message.ConnectReplyMessage.MessageType
+        (msgclass, handler) = self.Ledger.MessageHandlerMap[msgtype]
+
+        def _reply_handler(msg, ledger):
+            handler(msg, ledger)
+            self._reply_received(msg.OriginatorID)
+
+        self.Ledger.register_message_handler(msgclass, _reply_handler)
+        self._installed = True
+
+    def _send(self, peerid):
+        attempt = self._pending.get(peerid)
+        if attempt is None:
+            return
+
+        attempt.Attempts += 1
+        attempt.SentTime = time.time()
+        logger.debug('send connect request %d to %s', attempt.Attempts,
+                     attempt.Peer)
+        connect_message.send_connection_request(self.Ledger, attempt.Peer)
+
+        attempt.Timer = reactor.callLater(self.Timeout, self._timed_out,
+                                          peerid)
+
+    def _timed_out(self, peerid):
+        attempt = self._pending.get(peerid)
+        if attempt is None:
+            return
+
+        if attempt.Attempts > self.RetryPolicy.Retries:
+            logger.info('no connect reply from %s after %d attempts',
+                        attempt.Peer, attempt.Attempts)
+            del self._pending[peerid]
+            self._fail_exhausted('no peer replied to connect requests')
+            return
+
+        delay = self.RetryPolicy.delay(attempt.Attempts - 1)
+        attempt.Timer = reactor.callLater(delay, self._send, peerid)
+
+    def _reply_received(self, peerid):
+        attempt = self._pending.pop(peerid, None)
+        if attempt is None:
+            return
+
+        attempt.cancel()
+        if peerid not in [p.Identifier for p in self.Ledger.peer_list()]:
+            logger.info('connect reply from %s did not enable the peer',
+                        attempt.Peer)
+            self._fail_exhausted('no peer accepted the connect requests')
+            return
+
+        elapsed = time.time() - attempt.SentTime
+        if attempt.Attempts == 1:
+            self.RoundTripTimes[peerid] = elapsed
+
+        logger.info('connection to %s confirmed after %d attempts in %.3fs',
+                    attempt.Peer, attempt.Attempts, elapsed)
+
+        waiting = [w for w in self._waiting if peerid in w[1]]
+        self._waiting = [w for w in self._waiting if peerid not in w[1]]
+        for (d, _) in waiting:
+            d.callback(attempt.Peer)
+
+    def _fail_exhausted(self, reason):
+        """
+        Fail the callers that have no connection attempt left.
+        """
+        exhausted = [w for w in self._waiting
+                     if not w[1].intersection(self._pending)]
+        self._waiting = [w for w in self._waiting if w not in exhausted]
+        for (d, _) in exhausted:
+            d.errback(PeerConnectionFailed(reason))
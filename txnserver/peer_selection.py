@@ -0,0 +1,128 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the latency aware selection of the initial peers of
+a validator
+"""
+
+import logging
+import random
+
+from twisted.internet import defer, reactor
+
+from txnserver.peer_connector import PeerConnectionFailed
+
+logger = logging.getLogger(__name__)
+
+
+def select_by_latency(rtts, count, randomfraction=0.25):
+    """
+    Pick peers, mostly the ones with the lowest round trip time; a fraction
+    is picked at random among the rest so that the network graph stays well
+    mixed.
+
+    Args:
+        rtts (dict): round trip time by peer, None if it was not measured
+        count (int): number of peers to pick
+        randomfraction (float): fraction of the peers picked at random
+
+    Returns:
+        list: the picked peers, fastest first
+    """
+    ranked = sorted(rtts.keys(), key=lambda p: (rtts[p] is None, rtts[p]))
+
+    randomcount = int(round(count * randomfraction))
+    fastcount = max(0, min(count, len(ranked)) - randomcount)
+
+    selected = ranked[:fastcount]
+    remaining = ranked[fastcount:]
+    selected.extend(random.sample(remaining,
+                                  min(count - fastcount, len(remaining))))
+    return selected
+
+
+def measured_rtt(peer, connector=None):
+    """
+    Return the round trip time measured by the connector the last time a
+    connect request to the peer was answered, None if it was never
+    measured. The smoothed estimate kept by gossip is not exposed by the
+    estimator and is not used.
+    """
+    if connector is None:
+        return None
+    return connector.RoundTripTimes.get(peer.Identifier)
+
+
+class LatencyProbe(object):
+    """
+    Measure the round trip time to a set of candidate peers by sending them
+    all connect requests at the same time and timing the replies.
+
+    Attributes:
+        Connector (peer_connector.PeerConnector): sends the connect requests
+        Window (float): seconds to wait for replies
+    """
+
+    def __init__(self, connector, window=2.0):
+        self.Connector = connector
+        self.Window = window
+
+    def probe(self, peers):
+        """
+        Probe the peers; the peers must have been added to the ledger.
+
+        Returns:
+            Deferred: fires with a dict of round trip time by identifier for
+                the peers that replied within the window, peers that were
+                already connected have a time of None
+        """
+        if not peers:
+            return defer.succeed({})
+
+        d = defer.Deferred()
+        rtts = {}
+        outstanding = set(p.Identifier for p in peers)
+
+        def _finish():
+            if timer.active():
+                timer.cancel()
+
+            # stop retrying the peers that were too slow to answer
+            self.Connector.cancel([p for p in peers
+                                   if p.Identifier in outstanding])
+            if not d.called:
+                d.callback(rtts)
+
+        def _replied(peer):
+            outstanding.discard(peer.Identifier)
+            rtts[peer.Identifier] = self.Connector.RoundTripTimes.get(
+                peer.Identifier)
+            if not outstanding and not d.called:
+                _finish()
+
+        def _failed(failure, peer):
+            failure.trap(PeerConnectionFailed)
+            outstanding.discard(peer.Identifier)
+            if not outstanding and not d.called:
+                _finish()
+
+        timer = reactor.callLater(self.Window, _finish)
+        for peer in peers:
+            pd = self.Connector.connect([peer])
+            pd.addCallback(_replied)
+            pd.addErrback(_failed, peer)
+
+        logger.info('probe round trip time to %d peers', len(peers))
+        return d
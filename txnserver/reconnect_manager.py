@@ -0,0 +1,259 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the policy used to restore the connectivity of a
+validator when its peers drop
+"""
+
+import logging
+import random
+import time
+
+from twisted.internet import reactor
+
+from txnserver.failover import RetryPolicy
+from txnserver.peer_connector import PeerConnectionFailed
+
+logger = logging.getLogger(__name__)
+
+
+class PeerHistory(object):
+    """
+    Connection history of one peer.
+
+    Attributes:
+        Peer (gossip.node.Node): the peer
+        Failures (int): consecutive disconnects or failed reconnects
+        NextAttempt (float): earliest time of the next reconnect attempt
+        LastConnected (float): last time the peer was seen connected, None
+            if it never was
+        Connected (bool): whether the peer was connected at the last check
+    """
+
+    def __init__(self, peer):
+        self.Peer = peer
+        self.Failures = 0
+        self.NextAttempt = 0.0
+        self.LastConnected = None
+        self.Connected = False
+
+    def dump(self):
+        return {
+            'Name': self.Peer.Name,
+            'Failures': self.Failures,
+            'NextAttempt': self.NextAttempt,
+            'LastConnected': self.LastConnected,
+            'Connected': self.Connected
+        }
+
+
+class ReconnectManager(object):
+    """
+    Keep the number of connected peers near the target connectivity. Every
+    CheckInterval seconds (with jitter) the manager reconnects to a few of
+    the known peers, preferring peers that were healthy before; each peer
+    is retried with exponential backoff and jitter so that validators that
+    lose their peers at the same time do not reconnect in lock step. When
+    connectivity drops to the minimum, or is below it, the full topology
+    update supplied by the validator is started instead; while connectivity
+    does not recover, further topology updates back off in the same way.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        Connector (peer_connector.PeerConnector): sends connect requests
+        TargetConnectivity (int): number of peers to maintain
+        MinimumConnectivity (int): a drop to this, or any connectivity
+            below it, starts the topology update
+        CheckInterval (float): mean seconds between checks
+        MaximumAttempts (int): maximum number of reconnects started at each
+            check
+        RetryPolicy (failover.RetryPolicy): backoff applied to each peer
+        History (dict): PeerHistory by peer identifier
+        TopologyUpdates (int): topology updates started since connectivity
+            was last above the minimum
+        NextUpdate (float): earliest time of the next topology update
+    """
+
+    def __init__(self, ledger, connector, topologyupdate, target=3,
+                 minimum=1, interval=10.0, maxattempts=2, retry=None):
+        self.Ledger = ledger
+        self.Connector = connector
+        self.TargetConnectivity = target
+        self.MinimumConnectivity = minimum
+        self.CheckInterval = interval
+        self.MaximumAttempts = maxattempts
+        self.RetryPolicy = retry or RetryPolicy(initialdelay=2.0,
+                                                maximumdelay=300.0)
+        self.History = {}
+        self.TopologyUpdates = 0
+        self.NextUpdate = 0.0
+
+        self._topologyupdate = topologyupdate
+        self._lastcount = None
+        self._dropped = False
+        self._timer = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._schedule(self.CheckInterval)
+
+    def stop(self):
+        self._running = False
+        if self._timer is not None and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+
+    def add_peers(self, peers):
+        """
+        Make peers known to the manager as reconnect candidates.
+        """
+        for peer in peers:
+            if peer.Identifier != self.Ledger.LocalNode.Identifier and \
+                    peer.Identifier not in self.History:
+                self.History[peer.Identifier] = PeerHistory(peer)
+
+    def check_soon(self):
+        """
+        Check the connectivity after a short random delay rather than at
+        the next interval, for example when new candidates became known.
+        """
+        if self._running:
+            self._schedule(2.0)
+
+    def peer_disconnected(self, peerid):
+        """
+        Record that a peer dropped and check the connectivity soon, after a
+        random delay so that the peers of a failed node do not all react at
+        the same instant.
+        """
+        history = self.History.get(peerid)
+        if history is None:
+            peer = self.Ledger.NodeMap.get(peerid)
+            if peer is None:
+                return
+            history = PeerHistory(peer)
+            self.History[peerid] = history
+
+        history.Connected = False
+        self._record_failure(history)
+        self._dropped = True
+
+        # until the manager is started the validator is still connecting
+        # to its initial peers
+        self.check_soon()
+
+    def check(self):
+        """
+        Compare the current connectivity with the target and start
+        reconnects or a topology update as needed.
+        """
+        self._timer = None
+        now = time.time()
+
+        connected = self.Ledger.peer_list()
+        self.add_peers(connected)
+
+        connectedids = set(p.Identifier for p in connected)
+        for (peerid, history) in self.History.iteritems():
+            if peerid in connectedids:
+                # a peer that stayed up since the last check is healthy
+                if history.Connected:
+                    history.Failures = 0
+                history.Connected = True
+                history.LastConnected = now
+            else:
+                history.Connected = False
+
+        count = len(connected)
+        dropped = self._dropped or (self._lastcount is not None and
+                                    count < self._lastcount)
+        self._dropped = False
+        self._lastcount = count
+
+        if count > self.MinimumConnectivity:
+            self.TopologyUpdates = 0
+            self.NextUpdate = 0.0
+
+        needed = count < self.MinimumConnectivity or \
+            (dropped and count <= self.MinimumConnectivity)
+        if needed and now >= self.NextUpdate:
+            logger.info('connectivity dropped to %d peers, start topology '
+                        'update', count)
+            self.TopologyUpdates += 1
+            self.NextUpdate = now + \
+                self.RetryPolicy.delay(self.TopologyUpdates - 1)
+            self._topologyupdate()
+
+        elif count < self.TargetConnectivity:
+            candidates = [h for h in self.History.itervalues()
+                          if not h.Connected and h.NextAttempt <= now]
+
+            # prefer peers with fewer recent failures, then those that were
+            # connected most recently, then peers never connected
+            candidates.sort(key=lambda h: (h.Failures,
+                                           h.LastConnected is None,
+                                           -(h.LastConnected or 0.0)))
+
+            attempts = min(self.TargetConnectivity - count,
+                           self.MaximumAttempts)
+            for history in candidates[:attempts]:
+                self._reconnect(history)
+
+        if self._running:
+            self._schedule(self.CheckInterval)
+
+    def dump(self):
+        return dict((peerid[:8], history.dump())
+                    for (peerid, history) in self.History.iteritems())
+
+    def _reconnect(self, history):
+        logger.info('reconnect to %s, %d previous failures', history.Peer,
+                    history.Failures)
+
+        # hold off further attempts until this one has completed
+        history.NextAttempt = float('inf')
+
+        def _connected(peer):
+            history.Connected = True
+            history.LastConnected = time.time()
+            history.NextAttempt = 0.0
+
+        def _failed(failure):
+            failure.trap(PeerConnectionFailed)
+            logger.info('reconnect to %s failed', history.Peer)
+            self._record_failure(history)
+
+        self.Ledger.add_node(history.Peer)
+        d = self.Connector.connect([history.Peer])
+        d.addCallbacks(_connected, _failed)
+
+    def _record_failure(self, history):
+        history.Failures += 1
+        history.NextAttempt = time.time() + \
+            self.RetryPolicy.delay(history.Failures - 1)
+
+    def _schedule(self, delay):
+        """
+        Schedule the next check, keeping an earlier one if it is already
+        scheduled; the interval is randomized by up to half its length.
+        """
+        delay *= random.uniform(0.5, 1.5)
+        if self._timer is not None and self._timer.active():
+            if self._timer.getTime() <= reactor.seconds() + delay:
+                return
+            self._timer.cancel()
+
+        self._timer = reactor.callLater(delay, self.check)
@@ -0,0 +1,176 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a caching host name resolver for the addresses of
+peers and endpoints
+"""
+
+import logging
+import socket
+import time
+from multiprocessing.pool import ThreadPool
+
+from twisted.internet import defer, reactor
+
+logger = logging.getLogger(__name__)
+
+
+class HostResolver(object):
+    """
+    Resolve host names to addresses, keeping each result for TTL seconds.
+    Names can be resolved in the reactor without blocking it, or in a
+    blocking call before the reactor runs, in which case the distinct names
+    are resolved concurrently.
+
+    Attributes:
+        TTL (float): seconds a resolved address is kept
+        Threads (int): maximum concurrent lookups in prefetch
+        Hits (int): lookups answered from the cache
+        Misses (int): lookups sent to the system resolver
+    """
+
+    def __init__(self, ttl=300.0, threads=8):
+        self.TTL = ttl
+        self.Threads = threads
+        self.Hits = 0
+        self.Misses = 0
+
+        self._cache = {}
+        self._pending = {}
+
+    def lookup(self, host):
+        """
+        Return the cached address of a host, None if it is not cached.
+        """
+        entry = self._cache.get(host)
+        if entry is None:
+            return None
+
+        (address, expires) = entry
+        if time.time() >= expires:
+            del self._cache[host]
+            return None
+
+        return address
+
+    def gethostbyname(self, host):
+        """
+        Blocking resolution through the cache, raises socket.error when the
+        host cannot be resolved.
+        """
+        address = self.lookup(host)
+        if address is not None:
+            self.Hits += 1
+            return address
+
+        self.Misses += 1
+        address = socket.gethostbyname(host)
+        self._store(host, address)
+        return address
+
+    def prefetch(self, hosts):
+        """
+        Blocking resolution of a set of hosts, the distinct hosts that are
+        not cached are resolved concurrently. Hosts that cannot be resolved
+        are logged and left out of the cache.
+        """
+        missing = set(h for h in hosts if self.lookup(h) is None)
+        if not missing:
+            return
+
+        def _resolve(host):
+            try:
+                return (host, socket.gethostbyname(host))
+            except socket.error as e:
+                logger.warn('unable to resolve %s; %s', host, str(e))
+                return (host, None)
+
+        pool = ThreadPool(min(self.Threads, len(missing)))
+        try:
+            results = pool.map(_resolve, missing)
+        finally:
+            pool.close()
+            pool.join()
+
+        self.Misses += len(missing)
+        for (host, address) in results:
+            if address is not None:
+                self._store(host, address)
+
+    def resolve(self, host):
+        """
+        Resolve a host without blocking the reactor.
+
+        Returns:
+            Deferred: fires with the address; concurrent requests for the
+                same host share one lookup
+        """
+        address = self.lookup(host)
+        if address is not None:
+            self.Hits += 1
+            return defer.succeed(address)
+
+        waiter = defer.Deferred()
+        if host in self._pending:
+            self._pending[host].append(waiter)
+            return waiter
+
+        self.Misses += 1
+        self._pending[host] = [waiter]
+
+        def _resolved(address):
+            self._store(host, address)
+            return address
+
+        def _done(address):
+            for pending in self._pending.pop(host):
+                pending.callback(address)
+
+        def _failed(failure):
+            for pending in self._pending.pop(host):
+                pending.errback(failure)
+
+        d = reactor.resolve(host)
+        d.addCallback(_resolved)
+        d.addCallbacks(_done, _failed)
+        return waiter
+
+    def resolve_all(self, hosts):
+        """
+        Resolve several hosts concurrently without blocking the reactor.
+
+        Returns:
+            Deferred: fires with a dict of address by host, hosts that could
+                not be resolved are left out
+        """
+        hosts = list(set(hosts))
+
+        def _collect(results):
+            addresses = {}
+            for (host, (success, result)) in zip(hosts, results):
+                if success:
+                    addresses[host] = result
+                else:
+                    logger.warn('unable to resolve %s; %s', host,
+                                result.getErrorMessage())
+            return addresses
+
+        d = defer.DeferredList([self.resolve(h) for h in hosts],
+                               consumeErrors=True)
+        d.addCallback(_collect)
+        return d
+
+    def _store(self, host, address):
+        self._cache[host] = (address, time.time() + self.TTL)
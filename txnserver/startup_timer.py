@@ -0,0 +1,95 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the timer used to report how long each phase of the
+validator startup takes
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer(object):
+    """
+    Record the start and end time of each phase of the startup. Phases may
+    overlap; once startup is complete further phases are ignored so that
+    code shared with later reconnects does not change the report.
+
+    Attributes:
+        StartTime (float): time the timer was created
+        CompleteTime (float): time startup completed, None until then
+        Phases (OrderedDict): [start, end] of each phase by name, in the
+            order the phases started
+    """
+
+    def __init__(self):
+        self.StartTime = time.time()
+        self.CompleteTime = None
+        self.Phases = OrderedDict()
+
+    @property
+    def Complete(self):
+        return self.CompleteTime is not None
+
+    def start(self, phase):
+        if self.Complete or phase in self.Phases:
+            return
+        self.Phases[phase] = [time.time(), None]
+
+    def stop(self, phase):
+        if self.Complete or phase not in self.Phases:
+            return
+        if self.Phases[phase][1] is None:
+            self.Phases[phase][1] = time.time()
+
+    def complete(self):
+        """
+        Close any open phase and log the summary of the startup.
+        """
+        if self.Complete:
+            return
+
+        for phase in self.Phases.iterkeys():
+            self.stop(phase)
+        self.CompleteTime = time.time()
+
+        summary = self.dump()
+        logger.info('startup complete in %.3f seconds', summary['Total'])
+        for phase in summary['Phases']:
+            logger.info('startup phase %s took %.3f seconds', phase['Name'],
+                        phase['Duration'])
+        logger.info('startup summary: %s', json.dumps(summary,
+                                                      sort_keys=True))
+
+    def dump(self):
+        now = time.time()
+        phases = []
+        for (name, (start, end)) in self.Phases.iteritems():
+            phases.append({
+                'Name': name,
+                'Start': start - self.StartTime,
+                'Duration': (end or now) - start,
+                'Complete': end is not None
+            })
+
+        return {
+            'Complete': self.Complete,
+            'Total': (self.CompleteTime or now) - self.StartTime,
+            'Phases': phases
+        }
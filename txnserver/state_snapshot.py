@@ -0,0 +1,238 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the export of the global store at a committed block
+to a snapshot file; a snapshot carries a digest of its contents so that a
+corrupted or truncated copy is detected. The digest is computed by the
+validator that wrote the snapshot, blocks carry no state root, so it does
+not prove that the state matches the chain.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+
+from twisted.internet import defer, task, threads
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotVerifyError(Exception):
+    pass
+
+
+def snapshot_digest(stores):
+    """
+    Compute the digest of the store contents; the encoding is canonical so
+    every validator computes the same digest for the same block.
+
+    Args:
+        stores (dict): map of store name to a dict of its keys and values
+    """
+    encoded = json.dumps(stores, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def verify_snapshot(snapshot, blockid=None, digest=None):
+    """
+    Check that the contents of a snapshot match its digest and, optionally,
+    the block and digest it was expected to have. This is an integrity
+    check only, the digest comes from the same validator as the snapshot.
+
+    Raises:
+        SnapshotVerifyError: if the snapshot does not verify
+    """
+    for field in ['BlockID', 'Digest', 'Stores']:
+        if field not in snapshot:
+            raise SnapshotVerifyError('snapshot has no {0}'.format(field))
+
+    if blockid is not None and snapshot['BlockID'] != blockid:
+        raise SnapshotVerifyError(
+            'snapshot is for block {0}, expected {1}'.format(
+                snapshot['BlockID'], blockid))
+
+    if digest is not None and snapshot['Digest'] != digest:
+        raise SnapshotVerifyError('snapshot digest does not match manifest')
+
+    if snapshot_digest(snapshot['Stores']) != snapshot['Digest']:
+        raise SnapshotVerifyError('snapshot contents do not match digest')
+
+
+class SnapshotManager(object):
+    """
+    Periodically write a snapshot of the global store at the most recently
+    committed block, keeping the newest few.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        Directory (str): directory where the snapshots are written
+        Interval (float): seconds between snapshots
+        Keep (int): number of snapshots kept on disk
+        Latest (dict): manifest of the newest snapshot, None if there is
+            none
+    """
+
+    def __init__(self, ledger, directory, interval=3600.0, keep=2):
+        self.Ledger = ledger
+        self.Directory = directory
+        self.Interval = interval
+        self.Keep = keep
+        self.Latest = None
+
+        self._looper = None
+
+        if not os.path.isdir(self.Directory):
+            os.makedirs(self.Directory)
+
+        self._load_latest()
+
+    def start(self):
+        self._looper = task.LoopingCall(self._create)
+        self._looper.start(self.Interval, now=False)
+
+    def stop(self):
+        if self._looper and self._looper.running:
+            self._looper.stop()
+        self._looper = None
+
+    def create(self):
+        """
+        Write a snapshot of the global store at the most recently committed
+        block, nothing is written if the head has not moved since the last
+        snapshot. The stores are read in the calling thread, the snapshot is
+        encoded, hashed and written by a thread from the reactor pool.
+
+        Returns:
+            Deferred: fires with the manifest of the newest snapshot
+        """
+        blockid = self.Ledger.MostRecentCommitedBlockID
+        if not blockid or (self.Latest and
+                           self.Latest['BlockID'] == blockid):
+            return defer.succeed(self.Latest)
+
+        storemap = self.Ledger.GlobalStoreMap.get_block_store(blockid)
+        if not storemap:
+            logger.warn('no store map for block %s, skip snapshot', blockid)
+            return defer.succeed(self.Latest)
+
+        start = time.time()
+        stores = {}
+        for storename in storemap.TransactionStores.keys():
+            stores[storename] = storemap.get_transaction_store(
+                storename).compose()
+
+        d = threads.deferToThread(self._write, blockid, stores)
+        d.addCallback(self._written, start)
+        return d
+
+    def load(self, blockid):
+        """
+        Read a snapshot from disk.
+
+        Returns:
+            dict: the snapshot, None if there is no snapshot for the block
+        """
+        filename = self._filename(blockid)
+        if not os.path.exists(filename):
+            return None
+
+        with open(filename) as fp:
+            return json.load(fp)
+
+    def _create(self):
+        """
+        Create a snapshot from the looping call; a failure is logged so
+        that the next snapshot is still attempted.
+        """
+        d = defer.maybeDeferred(self.create)
+        d.addErrback(self._create_failed)
+        return d
+
+    @staticmethod
+    def _create_failed(failure):
+        logger.error('unable to create snapshot; %s',
+                     failure.getErrorMessage())
+
+    def _write(self, blockid, stores):
+        snapshot = {
+            'BlockID': blockid,
+            'Created': time.time(),
+            'Digest': snapshot_digest(stores),
+            'Stores': stores
+        }
+
+        filename = self._filename(blockid)
+        tmpname = filename + '.tmp'
+        try:
+            with open(tmpname, 'w') as fp:
+                json.dump(snapshot, fp, sort_keys=True)
+            os.rename(tmpname, filename)
+        except:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+
+        return self._manifest(snapshot)
+
+    def _written(self, manifest, start):
+        self.Latest = manifest
+        logger.info('wrote snapshot of block %s in %.3f seconds',
+                    manifest['BlockID'], time.time() - start)
+
+        self._prune()
+        return self.Latest
+
+    def _filename(self, blockid):
+        return os.path.join(self.Directory,
+                            'snapshot-{0}.js'.format(blockid))
+
+    def _snapshot_files(self):
+        """
+        Return the snapshot files, newest first.
+        """
+        files = glob.glob(os.path.join(self.Directory, 'snapshot-*.js'))
+        return sorted(files, key=os.path.getmtime, reverse=True)
+
+    def _load_latest(self):
+        for filename in self._snapshot_files():
+            try:
+                with open(filename) as fp:
+                    snapshot = json.load(fp)
+                verify_snapshot(snapshot)
+            except (IOError, ValueError, SnapshotVerifyError) as e:
+                logger.warn('ignore snapshot %s; %s', filename, str(e))
+                continue
+
+            self.Latest = self._manifest(snapshot)
+            return
+
+    def _prune(self):
+        for filename in self._snapshot_files()[self.Keep:]:
+            try:
+                os.remove(filename)
+            except OSError as e:
+                logger.warn('unable to remove snapshot %s; %s', filename,
+                            str(e))
+
+    @staticmethod
+    def _manifest(snapshot):
+        return {
+            'BlockID': snapshot['BlockID'],
+            'Created': snapshot['Created'],
+            'Digest': snapshot['Digest']
+        }
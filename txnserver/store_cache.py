@@ -0,0 +1,109 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a client side cache of transaction store values
+"""
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StoreCache(object):
+    """
+    An LRU cache of values retrieved from the transaction stores. All of the
+    entries are tagged with the block from which they were read; when the
+    head of the chain moves the cache is invalidated.
+
+    Cached values are shared with the caller and must not be modified.
+
+    Attributes:
+        MaximumSize (int): maximum number of entries in the cache
+        BlockID (str): identifier of the block the entries were read from
+        Hits (int): number of successful lookups
+        Misses (int): number of failed lookups
+        Invalidations (int): number of times the cache was flushed because
+            a new block was committed
+    """
+
+    def __init__(self, maxsize=1024):
+        self.MaximumSize = maxsize
+        self.BlockID = None
+
+        self._entries = OrderedDict()
+
+        self.Hits = 0
+        self.Misses = 0
+        self.Invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set_block(self, blockid):
+        """
+        Move the cache to a new block, dropping all entries if the block
+        differs from the one the entries were read from.
+        """
+        if blockid == self.BlockID:
+            return
+
+        if self._entries:
+            logger.debug('head moved to %s, invalidate %d cached entries',
+                         blockid, len(self._entries))
+            self.Invalidations += 1
+            self._entries.clear()
+
+        self.BlockID = blockid
+
+    def lookup(self, key):
+        """
+        Look up a key in the cache.
+
+        Returns:
+            tuple: (found, value)
+        """
+        if key not in self._entries:
+            self.Misses += 1
+            return (False, None)
+
+        value = self._entries.pop(key)
+        self._entries[key] = value
+        self.Hits += 1
+        return (True, value)
+
+    def insert(self, key, value):
+        """
+        Add a value read from the current block, evicting the least recently
+        used entries if the cache is full.
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = value
+
+        while len(self._entries) > self.MaximumSize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.BlockID = None
+
+    def stats(self):
+        return {
+            'BlockID': self.BlockID,
+            'Size': len(self._entries),
+            'Hits': self.Hits,
+            'Misses': self.Misses,
+            'Invalidations': self.Invalidations
+        }
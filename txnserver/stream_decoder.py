@@ -0,0 +1,263 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements incremental decoding of CBOR and JSON responses. The
+top level array or map of a response is decoded one item at a time as the
+data is read so that large responses can be processed in constant memory.
+
+Arrays yield their elements, maps yield (key, value) tuples and any other
+top level value is yielded as a single item.
+"""
+
+import json
+import struct
+
+import cbor
+
+CBOR_ARRAY = 4
+CBOR_MAP = 5
+CBOR_INDEFINITE = 31
+CBOR_BREAK = '\xff'
+
+JSON_WHITESPACE = ' \t\n\r'
+
+
+class StreamDecodeError(ValueError):
+    pass
+
+
+class _PushbackReader(object):
+    """
+    File like wrapper that allows bytes to be pushed back onto the stream.
+    """
+
+    def __init__(self, fp):
+        self._fp = fp
+        self._pending = ''
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._pending + self._fp.read()
+            self._pending = ''
+            return data
+
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+        while len(data) < size:
+            chunk = self._fp.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def unread(self, data):
+        self._pending = data + self._pending
+
+
+def _read_exact(reader, size):
+    data = reader.read(size)
+    if len(data) != size:
+        raise StreamDecodeError('unexpected end of cbor stream')
+    return data
+
+
+def _cbor_length(reader, info):
+    if info < 24:
+        return info
+    elif info == 24:
+        return ord(_read_exact(reader, 1))
+    elif info == 25:
+        return struct.unpack('>H', _read_exact(reader, 2))[0]
+    elif info == 26:
+        return struct.unpack('>I', _read_exact(reader, 4))[0]
+    elif info == 27:
+        return struct.unpack('>Q', _read_exact(reader, 8))[0]
+    elif info == CBOR_INDEFINITE:
+        return None
+
+    raise StreamDecodeError('invalid cbor length encoding {0}'.format(info))
+
+
+def _cbor_items(reader, count):
+    """
+    Generate count items from the reader, or items up to the break marker if
+    count is None.
+    """
+    while count is None or count > 0:
+        if count is None:
+            marker = reader.read(1)
+            if marker == CBOR_BREAK:
+                return
+            if not marker:
+                raise StreamDecodeError('unexpected end of cbor stream')
+            reader.unread(marker)
+        else:
+            count -= 1
+
+        yield cbor.load(reader)
+
+
+def iter_cbor(fp):
+    """
+    Incrementally decode a CBOR encoded stream.
+
+    Args:
+        fp: file like object with a read method
+    """
+    reader = _PushbackReader(fp)
+
+    header = reader.read(1)
+    if not header:
+        return
+
+    major = ord(header) >> 5
+    info = ord(header) & 0x1f
+
+    if major == CBOR_ARRAY:
+        for item in _cbor_items(reader, _cbor_length(reader, info)):
+            yield item
+
+    elif major == CBOR_MAP:
+        count = _cbor_length(reader, info)
+        items = _cbor_items(reader, None if count is None else count * 2)
+        for key in items:
+            try:
+                value = next(items)
+            except StopIteration:
+                raise StreamDecodeError('cbor map key without a value')
+            yield (key, value)
+
+    else:
+        reader.unread(header)
+        yield cbor.load(reader)
+
+
+class _JsonBuffer(object):
+    """
+    A sliding window over a JSON stream; data that has been decoded is
+    discarded as the window moves forward.
+    """
+
+    def __init__(self, fp, chunksize):
+        self._fp = fp
+        self._chunksize = chunksize
+        self._decoder = json.JSONDecoder()
+
+        self.Data = ''
+        self.Index = 0
+        self.EOF = False
+
+    def fill(self):
+        if self.EOF:
+            return False
+
+        chunk = self._fp.read(self._chunksize)
+        if not chunk:
+            self.EOF = True
+            return False
+
+        self.Data = self.Data[self.Index:] + chunk
+        self.Index = 0
+        return True
+
+    def peek(self):
+        """
+        Return the next non-whitespace character without consuming it.
+        """
+        while True:
+            while self.Index < len(self.Data) and \
+                    self.Data[self.Index] in JSON_WHITESPACE:
+                self.Index += 1
+            if self.Index < len(self.Data):
+                return self.Data[self.Index]
+            if not self.fill():
+                raise StreamDecodeError('unexpected end of json stream')
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise StreamDecodeError(
+                'unexpected character {0!r} in json stream'.format(char))
+        self.Index += 1
+        return char
+
+    def decode(self):
+        """
+        Decode the next complete value. A value that ends exactly at the end
+        of the buffered data may be truncated (a number for example) so more
+        data is read before it is accepted.
+        """
+        self.peek()
+        while True:
+            try:
+                (value, end) = self._decoder.raw_decode(self.Data, self.Index)
+                if end < len(self.Data) or self.EOF:
+                    self.Index = end
+                    return value
+            except ValueError:
+                if self.EOF:
+                    raise StreamDecodeError('invalid json value')
+
+            self.fill()
+
+
+def iter_json(fp, chunksize=64 * 1024):
+    """
+    Incrementally decode a JSON encoded stream.
+
+    Args:
+        fp: file like object with a read method
+        chunksize (int): number of bytes to read at a time
+    """
+    stream = _JsonBuffer(fp, chunksize)
+
+    try:
+        opener = stream.peek()
+    except StreamDecodeError:
+        return
+
+    if opener not in '[{':
+        yield stream.decode()
+        return
+
+    stream.expect(opener)
+    closer = ']' if opener == '[' else '}'
+
+    if stream.peek() == closer:
+        return
+
+    while True:
+        if opener == '[':
+            yield stream.decode()
+        else:
+            key = stream.decode()
+            stream.expect(':')
+            yield (key, stream.decode())
+
+        if stream.expect(',' + closer) == closer:
+            return
+
+
+def iter_content(fp, encoding):
+    """
+    Incrementally decode a response according to its content type, content
+    of any other type is returned as a single string.
+    """
+    if encoding == 'application/cbor':
+        return iter_cbor(fp)
+    elif encoding == 'application/json':
+        return iter_json(fp)
+
+    return iter([fp.read()])
@@ -0,0 +1,134 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements a monitor for the journal transfer that restarts the
+transfer from another peer when the current one stalls
+"""
+
+import logging
+import time
+
+from twisted.internet import task
+
+from journal.protocol import journal_transfer
+
+logger = logging.getLogger(__name__)
+
+
+class JournalTransferMonitor(object):
+    """
+    Run the journal transfer and watch its progress; when no blocks or
+    transactions arrive for StallTimeout seconds the transfer is started
+    again, the journal transfer protocol picks a new peer at random. Blocks
+    and transactions already received are kept by the ledger. The transfer
+    still runs from one peer at a time, the monitor does not split it
+    across peers.
+
+    Attributes:
+        Ledger (journal.Journal): the local ledger
+        StallTimeout (float): seconds without progress before a restart
+        MaximumRestarts (int): restarts before the monitor stops
+            intervening and waits for the last transfer
+        CheckInterval (float): seconds between progress checks
+        Restarts (int): number of restarts so far
+    """
+
+    def __init__(self, ledger, callback, stalltimeout=30.0, maxrestarts=5,
+                 checkinterval=5.0):
+        self.Ledger = ledger
+        self.StallTimeout = stalltimeout
+        self.MaximumRestarts = maxrestarts
+        self.CheckInterval = checkinterval
+        self.Restarts = 0
+
+        self._callback = callback
+        self._completed = False
+        self._progress = None
+        self._lastprogress = None
+        self._looper = None
+
+    def start(self):
+        """
+        Start the transfer.
+
+        Returns:
+            bool: False if there is no peer to transfer from
+        """
+        if not journal_transfer.start_journal_transfer(self.Ledger,
+                                                       self._transfer_done):
+            return False
+
+        if self._completed:
+            return True
+
+        self._progress = self.progress()
+        self._lastprogress = time.time()
+
+        self._looper = task.LoopingCall(self._check)
+        self._looper.start(self.CheckInterval, now=False)
+        return True
+
+    def progress(self):
+        """
+        A measure of the transfer progress, the number of blocks and
+        transactions in the ledger.
+        """
+        return len(self.Ledger.BlockStore) + len(self.Ledger.TransactionStore)
+
+    def _check(self):
+        now = time.time()
+
+        progress = self.progress()
+        if progress != self._progress:
+            self._progress = progress
+            self._lastprogress = now
+            return
+
+        if now - self._lastprogress < self.StallTimeout:
+            return
+
+        if self.Restarts >= self.MaximumRestarts:
+            logger.error('journal transfer stalled after %d restarts, keep '
+                         'waiting on the current transfer', self.Restarts)
+            self._stop()
+            return
+
+        self.Restarts += 1
+        logger.warn('journal transfer stalled for %d seconds, restart [%d]',
+                    now - self._lastprogress, self.Restarts)
+
+        self._lastprogress = now
+        if not journal_transfer.start_journal_transfer(self.Ledger,
+                                                       self._transfer_done):
+            logger.error('no peer left for the journal transfer')
+
+    def _transfer_done(self):
+        # an abandoned transfer may still complete, only the first one to do
+        # so starts the ledger
+        if self._completed:
+            return
+
+        self._completed = True
+        self._stop()
+
+        if self.Restarts:
+            logger.info('journal transfer completed after %d restarts',
+                        self.Restarts)
+        self._callback()
+
+    def _stop(self):
+        if self._looper and self._looper.running:
+            self._looper.stop()
+        self._looper = None
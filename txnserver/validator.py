@@ -14,17 +14,24 @@
 # ------------------------------------------------------------------------------
 
 import logging
+import os
 import random
 import signal
-import socket
-
-from twisted.internet import reactor
-
-from txnserver import ledger_web_client
+import time
+
+from twisted.internet import defer, reactor, task
+
+from txnserver import admin_messages, async_ledger_web_client
+from txnserver import latency_topology, log_levels, peer_cache
+from txnserver import peer_connector, peer_selection
+from txnserver import reconnect_manager, resolver, startup_timer
+from txnserver import state_snapshot
+from txnserver import transfer_monitor
+from txnserver.config import reloadable_changes
+from txnserver.failover import RetryPolicy
 from gossip import node, signed_object, token_bucket
 from gossip.messages import connect_message, shutdown_message
 from gossip.topology import random_walk, barabasi_albert
-from journal.protocol import journal_transfer
 from ledger.transaction import endpoint_registry
 
 logger = logging.getLogger(__name__)
@@ -37,80 +44,207 @@ class Validator(object):
         endpoint_registry
     ]
 
-    def __init__(self, config, windows_service):
+    # configuration variables that are applied again when the configuration
+    # is reloaded, the rest only take effect on restart
+    ReloadableConfiguration = ['NetworkFlowRate', 'NetworkBurstRate']
+
+    def __init__(self, config, windows_service, timer=None):
 
         self.Config = config
 
+        # callable that re-reads and resolves the configuration files, set by
+        # the process that created the validator; reload is disabled without
+        # it
+        self.ConfigurationLoader = None
+
         self.windows_service = windows_service
 
+        # the timer may have been started before the configuration was
+        # resolved so that the report covers the whole startup
+        self.StartupTimer = timer or startup_timer.StartupTimer()
+
         # this is going to be used as a flag to indicate that a
         # topology update is in progress
         self._connectionattempts = 0
 
+        # set when shutdown starts, the time by which it must be complete
+        self._shutdowndeadline = None
+
+        # identifiers of probed peers that were disconnected on purpose
+        self._releasedpeers = set()
+
+        # created when the LatencyAware topology is first used
+        self.LatencyTopology = None
+
+        # log levels changed by the administrator or the local web api
+        self.LogLevels = log_levels.LogLevelController()
+
         # set up signal handlers for shutdown
         if not windows_service:
             signal.signal(signal.SIGTERM, self.handle_shutdown_signal)
             signal.signal(signal.SIGINT, self.handle_shutdown_signal)
+            if hasattr(signal, 'SIGHUP'):
+                signal.signal(signal.SIGHUP, self.handle_reload_signal)
 
         # ---------- Initialize the configuration ----------
+        self.StartupTimer.start('configuration')
         self.initialize_common_configuration()
         self.initialize_ledger_specific_configuration()
+        self.initialize_peer_cache()
+        self.StartupTimer.stop('configuration')
 
         # ---------- Initialize the LedgerWebClient ----------
-        self.LedgerWebClient = ledger_web_client.LedgerWebClient(
+        # the validator talks to the LedgerURL from inside the reactor so it
+        # must use the non-blocking client
+        self.LedgerWebClient = async_ledger_web_client.AsyncLedgerWebClient(
             self.Config.get('LedgerURL'))
 
+        # resolved addresses are kept across NodeMap rebuilds
+        self.Resolver = resolver.HostResolver(
+            ttl=self.Config.get('ResolverTTL', 300.0))
+
         # ---------- Initialize the NodeMap ----------
+        self.StartupTimer.start('node_map')
         self.initialize_node_map()
+        self.StartupTimer.stop('node_map')
 
         # ---------- Initialize the Ledger ----------
+        self.StartupTimer.start('ledger')
         self.initialize_ledger_object()
+        self.StartupTimer.stop('ledger')
+
+        # ---------- Initialize the state snapshots ----------
+        self.initialize_snapshots()
 
     def handle_shutdown_signal(self, signum, frame):
         logger.warn('received shutdown signal')
         self.shutdown()
 
+    def handle_reload_signal(self, signum, frame):
+        logger.warn('received reload signal')
+        reactor.callLater(0, self.reload_configuration)
+
+    def reload_configuration(self):
+        """
+        Re-read the configuration files and apply the variables listed in
+        ReloadableConfiguration without restarting the validator.
+
+        Returns:
+            dict: the variables that changed
+        """
+        if self.ConfigurationLoader is None:
+            logger.warn('no configuration loader, unable to reload')
+            return {}
+
+        # the configuration parser exits on a malformed file, that must not
+        # take down a running validator
+        try:
+            config = self.ConfigurationLoader()
+        except (Exception, SystemExit) as e:
+            logger.error('unable to reload configuration; %s', str(e))
+            return {}
+
+        changed = reloadable_changes(self.Config, config,
+                                     self.ReloadableConfiguration)
+        if not changed:
+            logger.info('configuration reloaded, no changes')
+            return changed
+
+        self.Config.update(changed)
+        self.initialize_flow_control()
+        self.initialize_ledger_specific_configuration()
+
+        for (key, value) in sorted(changed.iteritems()):
+            logger.info('configuration reloaded: %s = %s', key, value)
+        return changed
+
     def shutdown(self):
         """
         Shutdown the validator. There are several things that need to happen
         on shutdown: 1) disconnect this node from the network, 2) close all the
-        databases, and 3) shutdown twisted. We need time for each to finish.
+        databases, and 3) shutdown twisted. Each step waits for the outbound
+        gossip queues to drain; the whole shutdown is bounded by the
+        ShutdownTimeout configuration variable.
         """
 
+        if self._shutdowndeadline is not None:
+            logger.info('shutdown already in progress')
+            return
+
+        self._shutdowndeadline = time.time() + self.Config.get(
+            'ShutdownTimeout', 10.0)
+
         # send the transaction to remove this node from the endpoint
         # registry (or send it to the web server)
-        self.unregister_endpoint(self.Ledger.LocalNode, self.EndpointDomain)
+        d = defer.maybeDeferred(self.unregister_endpoint,
+                                self.Ledger.LocalNode, self.EndpointDomain)
+        if not d.called:
+            timer = reactor.callLater(
+                self._shutdowndeadline - time.time(), d.cancel)
+            d.addBoth(self._cancel_timer, timer)
+        d.addErrback(self._log_failure, 'failed to unregister endpoint')
+
+        # wait for the unregister message to be sent out
+        d.addCallback(lambda _: self.wait_for_send_queues())
+        d.addCallback(lambda _: self.handle_ledger_shutdown())
+
+    def wait_for_send_queues(self, interval=0.05):
+        """
+        Return a Deferred that fires once no messages are waiting to be sent
+        to any peer, or when the shutdown deadline passes.
+        """
+        d = defer.Deferred()
+
+        def _check():
+            pending = sum(p.MessageQ.Count
+                          for p in self.Ledger.peer_list(allflag=True))
+            if pending == 0:
+                d.callback(True)
+            elif time.time() >= self._shutdowndeadline:
+                logger.warn('shutdown timeout reached with %d messages '
+                            'queued', pending)
+                d.callback(False)
+            else:
+                reactor.callLater(interval, _check)
 
-        # Need to wait long enough for all the shutdown packets to be sent out
-        reactor.callLater(1.0, self.handle_ledger_shutdown)
+        _check()
+        return d
 
     def handle_ledger_shutdown(self):
+        self.ReconnectManager.stop()
+        if self.LatencyTopology:
+            self.LatencyTopology.stop()
+        if self.SnapshotManager:
+            self.SnapshotManager.stop()
+        self.stop_ledger_specific_services()
+        if self._peercachetask and self._peercachetask.running:
+            self._peercachetask.stop()
+        self.save_peer_cache()
+
         self.Ledger.shutdown()
 
-        # Need to wait long enough for all the shutdown packets to be sent out
-        # if a shutdown packet was the reason for the shutdown
-        reactor.callLater(1.0, self.handle_shutdown)
+        # the shutdown packets must be sent out if a shutdown packet was the
+        # reason for the shutdown
+        d = self.wait_for_send_queues()
+        d.addCallback(lambda _: self.handle_shutdown())
 
     def handle_shutdown(self):
+        self.LedgerWebClient.close()
         reactor.stop()
 
     def initialize_common_configuration(self):
         self.GenesisLedger = self.Config.get('GenesisLedger', False)
 
         # Handle the common configuration variables
-        if 'NetworkFlowRate' in self.Config:
-            token_bucket.TokenBucket.DefaultDripRate = self.Config[
-                'NetworkFlowRate']
-
-        if 'NetworkBurstRate' in self.Config:
-            token_bucket.TokenBucket.DefaultDripRate = self.Config[
-                'NetworkBurstRate']
+        self.initialize_flow_control()
 
         if 'AdministrationNode' in self.Config:
             logger.info('set administration node to %s',
                         self.Config.get('AdministrationNode'))
             shutdown_message.AdministrationNode = self.Config[
                 'AdministrationNode']
+            admin_messages.AdministrationNode = self.Config[
+                'AdministrationNode']
 
         if 'NetworkDelayRange' in self.Config:
             node.Node.DelayRange = self.Config['NetworkDelayRange']
@@ -118,6 +252,33 @@ class Validator(object):
         if 'UseFixedDelay' in self.Config:
             node.Node.UseFixedDelay = self.Config['UseFixedDelay']
 
+    def initialize_flow_control(self):
+        """
+        Set the network flow rate and burst capacity, both for the nodes
+        created from now on and for the ones that already exist.
+        """
+        if 'NetworkFlowRate' in self.Config:
+            token_bucket.TokenBucket.DefaultDripRate = self.Config[
+                'NetworkFlowRate']
+
+        if 'NetworkBurstRate' in self.Config:
+            token_bucket.TokenBucket.DefaultCapacity = self.Config[
+                'NetworkBurstRate']
+
+        # the ledger does not exist yet during construction
+        ledger = getattr(self, 'Ledger', None)
+        if ledger is None:
+            return
+
+        for peer in ledger.NodeMap.values():
+            bucket = getattr(peer, 'TokenBucket', None)
+            if bucket is None:
+                continue
+            if 'NetworkFlowRate' in self.Config:
+                bucket.DripRate = self.Config['NetworkFlowRate']
+            if 'NetworkBurstRate' in self.Config:
+                bucket.Capacity = self.Config['NetworkBurstRate']
+
     def initialize_ledger_specific_configuration(self):
         """
         Initialize any ledger type specific configuration options, expected to
@@ -125,10 +286,72 @@ class Validator(object):
         """
         pass
 
+    def start_ledger_specific_services(self):
+        """
+        Start any ledger type specific periodic tasks once the ledger is
+        running, expected to be overridden
+        """
+        pass
+
+    def stop_ledger_specific_services(self):
+        """
+        Stop the tasks started by start_ledger_specific_services, expected
+        to be overridden
+        """
+        pass
+
+    def dump_status(self):
+        """
+        Return the sections of the validator status reported by the web
+        api, ledger types may add their own sections.
+        """
+        return {
+            'Startup': self.StartupTimer.dump(),
+            'LogLevels': self.LogLevels.dump()
+        }
+
+    def initialize_peer_cache(self):
+        """
+        Set up the file in the DataDirectory where the last known good
+        peers are kept between runs, set PeerCache to false in the
+        configuration to disable it.
+        """
+        self.PeerCache = None
+        self._peercachetask = None
+
+        datadir = self.Config.get('DataDirectory')
+        if datadir and self.Config.get('PeerCache', True):
+            filename = os.path.join(
+                datadir, '{0}-peers.js'.format(self.Config['NodeName']))
+            self.PeerCache = peer_cache.PeerCache(filename)
+
+    def initialize_snapshots(self):
+        """
+        Set up the periodic export of the global store when
+        SnapshotInterval is set in the configuration; the snapshots are not
+        used to start a validator, so they are disabled by default.
+        """
+        self.SnapshotManager = None
+
+        datadir = self.Config.get('DataDirectory')
+        interval = self.Config.get('SnapshotInterval', 0)
+        if datadir and interval > 0:
+            directory = os.path.join(
+                datadir, '{0}-snapshots'.format(self.Config['NodeName']))
+            self.SnapshotManager = state_snapshot.SnapshotManager(
+                self.Ledger, directory, interval,
+                keep=self.Config.get('SnapshotsKept', 2))
+
     def initialize_node_map(self):
         self.NodeMap = {}
-        for nodedata in self.Config.get("Nodes", []):
-            addr = (socket.gethostbyname(nodedata["Host"]), nodedata["Port"])
+        nodes = self.Config.get("Nodes", [])
+
+        # resolve the distinct hosts concurrently rather than one at a time
+        self.Resolver.prefetch([nodedata["Host"] for nodedata in nodes])
+
+        for nodedata in nodes:
+            addr = (self.Resolver.gethostbyname(nodedata["Host"]),
+                    nodedata["Port"])
             nd = node.Node(address=addr,
                            identifier=nodedata["Identifier"],
                            name=nodedata["ShortName"])
@@ -143,7 +366,7 @@ class Validator(object):
         else:
             host = self.Config['Host']
             port = self.Config['Port']
-            addr = (socket.gethostbyname(host), port)
+            addr = (self.Resolver.gethostbyname(host), port)
             signingkey = signed_object.generate_signing_key(
                 wifstr=self.Config.get('SigningKey'))
             identifier = signed_object.generate_identifier(signingkey)
@@ -160,6 +383,22 @@ class Validator(object):
 
         self.Ledger.onNodeDisconnect += self.handle_node_disconnect_event
 
+        admin_messages.register_message_handlers(self.Ledger,
+                                                 self.reload_configuration,
+                                                 self.LogLevels.set_level)
+
+        self.PeerConnector = peer_connector.PeerConnector(
+            self.Ledger,
+            timeout=self.Config.get('ConnectTimeout', 2.0),
+            retry=RetryPolicy(retries=self.Config.get('ConnectRetries', 5),
+                              initialdelay=0.5, maximumdelay=8.0))
+
+        self.ReconnectManager = reconnect_manager.ReconnectManager(
+            self.Ledger, self.PeerConnector, self.restore_connectivity,
+            target=self.Config.get('TargetConnectivity', 3),
+            minimum=self.Config.get('InitialConnectivity', 1),
+            interval=self.Config.get('ReconnectInterval', 10.0))
+
         logger.info("starting ledger %s with id %s at network address %s",
                     self.Ledger.LocalNode,
                     self.Ledger.LocalNode.Identifier[:8],
@@ -189,31 +428,35 @@ class Validator(object):
 
     def handle_node_disconnect_event(self, nodeid):
         """
-        Handle the situation where a peer is marked as disconnected.
+        Handle the situation where a peer is marked as disconnected, the
+        reconnect manager decides whether and when to reconnect.
         """
 
+        if nodeid in self._releasedpeers:
+            return
+
         logger.info('node %s dropped, reassess connectivity', nodeid)
+        self.ReconnectManager.peer_disconnected(nodeid)
+
+    def restore_connectivity(self):
+        """
+        Reconnect to the known peers and run a full topology update, used
+        when connectivity has dropped to the minimum.
+        """
 
         # first see if we are already handling the situation
         if self._connectionattempts > 0:
             logger.info('topology update already in progress')
             return
 
-        # there are many possible policies for when to kick off
-        # new topology probes. for the moment, just use the initial
-        # connectivity as a lower threshhold
-        minpeercount = self.Config.get("InitialConnectivity", 1)
-        peerlist = self.Ledger.peer_list()
-        if len(peerlist) <= minpeercount and self._connectionattempts == 0:
-            def disconnect_callback():
-                logger.info('topology update finished, %s peers connected',
-                            len(self.Ledger.peer_list()))
-
-            logger.info('connectivity has dropped below mimimal levels, '
-                        'kick off topology update')
-            self._connectionattempts = 3
-            reactor.callLater(2.0, self.initialize_ledger_topology,
-                              disconnect_callback)
+        def disconnect_callback():
+            logger.info('topology update finished, %s peers connected',
+                        len(self.Ledger.peer_list()))
+
+        logger.info('connectivity has dropped below mimimal levels, '
+                    'kick off topology update')
+        self._connectionattempts = 1
+        self.wait_for_connection(disconnect_callback)
 
     def initialize_ledger_connection(self):
         """
@@ -227,29 +470,194 @@ class Validator(object):
 
         assert self.Ledger
 
+        cached = self.load_peer_cache()
+
         url = self.Config.get('LedgerURL', '**none**')
-        if url != '**none**':
-            logger.info('load peers using url %s', self.Config['LedgerURL'])
+        if url == '**none**':
+            self.connect_to_peers(cached)
+            return
 
-            try:
-                peers = self.get_endpoints(0, self.EndpointDomain)
-                for peer in peers:
-                    self.NodeMap[peer.Name] = peer
-            except ledger_web_client.MessageException as e:
-                logger.error("Unable to get endpoints from LedgerURL: %s",
-                             str(e))
+        logger.info('load peers using url %s', self.Config['LedgerURL'])
+
+        def _add_endpoints(peers):
+            self.StartupTimer.stop('endpoints')
+            for peer in peers:
+                self.NodeMap[peer.Name] = peer
+
+            # when the validator started from its peer cache the endpoints
+            # arrive after the initial connections, they are candidates to
+            # fill in for stale cached peers
+            self.ReconnectManager.add_peers(peers)
+            if len(self.Ledger.peer_list()) < \
+                    self.ReconnectManager.TargetConnectivity:
+                self.ReconnectManager.check_soon()
+
+        self.StartupTimer.start('endpoints')
+        d = self.get_endpoints(0, self.EndpointDomain)
+        d.addCallback(_add_endpoints)
+        d.addErrback(self._log_failure,
+                     'Unable to get endpoints from LedgerURL')
+
+        # with a usable peer cache there is no need to wait for the
+        # LedgerURL, the endpoints it returns are added to the NodeMap in
+        # the background
+        if cached:
+            logger.info('connect to cached peers, refresh endpoints from %s '
+                        'in the background', url)
+            self.connect_to_peers(cached)
+            return
+
+        d.addCallback(lambda _: self.connect_to_peers())
+
+    def load_peer_cache(self):
+        """
+        Add the peers saved by the previous run to the NodeMap, nodes
+        from the configuration take precedence.
+
+        Returns:
+            list: names of the cached peers, fastest first
+        """
+        if not self.PeerCache:
+            return []
+
+        names = []
+        for info in self.PeerCache.load():
+            if info['Identifier'] == self.Ledger.LocalNode.Identifier:
+                continue
+
+            name = info.get('Name') or info['Identifier'][:8]
+            if name not in self.NodeMap:
+                nd = node.Node(address=(info['Host'], info['Port']),
+                               identifier=info['Identifier'],
+                               name=name)
+                self.NodeMap[name] = nd
+            names.append(name)
+
+        logger.info('loaded %d peers from %s', len(names),
+                    self.PeerCache.FileName)
+        return names
+
+    def save_peer_cache(self):
+        """
+        Record the currently connected peers in the peer cache.
+        """
+        if not self.PeerCache:
+            return
+
+        self.PeerCache.save(
+            [peer_cache.peer_info(
+                p, peer_selection.measured_rtt(p, self.PeerConnector))
+             for p in self.Ledger.peer_list()])
+
+    def connect_to_peers(self, preferred=None):
+        """
+        Pick the initial peers from the NodeMap and send connection requests
+        to them, then move on to the topology update.
+
+        Args:
+            preferred (list): names of peers, such as the ones that were
+                connected before a restart, that are picked before any
+                random choice
+        """
 
         # Build a list of nodes that we can use for the initial connection
         minpeercount = self.Config.get("InitialConnectivity", 1)
         peerset = set(self.Config.get('Peers', []))
+
+        # connect to a few more of the preferred peers than strictly needed
+        # so that one stale entry does not hold up the whole start
+        preferredcount = max(minpeercount,
+                             self.Config.get("TargetConnectivity", 3))
+        for peername in preferred or []:
+            if len(peerset) >= preferredcount:
+                break
+            if peername != self.Ledger.LocalNode.Name:
+                peerset.add(peername)
+
+        # every known node is a candidate for later reconnects
+        self.ReconnectManager.add_peers(self.NodeMap.values())
+
         nodeset = set(self.NodeMap.keys())
         if len(peerset) < minpeercount and len(nodeset) > 0:
             nodeset.discard(self.Ledger.LocalNode.Name)
             nodeset = nodeset.difference(peerset)
+
+            needed = minpeercount - len(peerset)
+            if self.Config.get('PeerSelection', 'random') == 'latency' and \
+                    len(nodeset) > needed:
+                self.probe_peers(peerset, nodeset, needed)
+                return
+
             peerset = peerset.union(
-                random.sample(list(nodeset),
-                              min(minpeercount - len(peerset),
-                              len(nodeset))))
+                random.sample(list(nodeset), min(needed, len(nodeset))))
+
+        self.connect_peer_set(peerset)
+
+    def probe_peers(self, peerset, nodeset, needed):
+        """
+        Complete the initial peer set with the candidates that have the
+        lowest round trip time; the candidates are probed concurrently with
+        connect requests and those that are not picked are disconnected.
+        """
+        probecount = self.Config.get('ProbeCount', max(3 * needed, 8))
+        candidates = [self.NodeMap[n] for n in
+                      random.sample(list(nodeset),
+                                    min(probecount, len(nodeset)))]
+        for peer in candidates:
+            self.Ledger.add_node(peer)
+
+        self._connectionattempts = 1
+        self.StartupTimer.start('probe')
+
+        def _select(rtts):
+            self.StartupTimer.stop('probe')
+
+            selected = peer_selection.select_by_latency(
+                rtts, needed, self.Config.get('RandomPeerFraction', 0.25))
+            for peer in candidates:
+                if peer.Identifier in selected:
+                    logger.info('selected peer %s, rtt %s', peer,
+                                rtts[peer.Identifier])
+                    peerset.add(peer.Name)
+                elif peer.Identifier in rtts:
+                    self.release_peer(peer)
+                else:
+                    self.Ledger.drop_node(peer.Identifier)
+
+            # nothing replied in time, fall back to a random choice
+            if not selected:
+                peerset.update(random.sample(list(nodeset),
+                                             min(needed, len(nodeset))))
+
+            self.connect_peer_set(peerset)
+
+        probe = peer_selection.LatencyProbe(
+            self.PeerConnector, self.Config.get('ProbeWindow', 2.0))
+        d = probe.probe(candidates)
+        d.addCallback(_select)
+        d.addErrback(self._log_failure, 'failed to select peers')
+
+    def release_peer(self, peer):
+        """
+        Disconnect from a peer that was only connected for probing.
+        """
+        self.Ledger.send_message(connect_message.DisconnectRequestMessage(),
+                                 peer.Identifier)
+
+        # drop_node fires the disconnect event, if any, before it returns;
+        # the entry must not outlive the call or it would hide the next
+        # real disconnect of the peer
+        self._releasedpeers.add(peer.Identifier)
+        try:
+            self.Ledger.drop_node(peer.Identifier)
+        finally:
+            self._releasedpeers.discard(peer.Identifier)
+
+    def connect_peer_set(self, peerset):
+        """
+        Send connection requests to the peers in the set, then move on to
+        the topology update.
+        """
 
         # Add the candidate nodes to the gossip object so we can send connect
         # requests to them
@@ -270,47 +678,46 @@ class Validator(object):
             self.shutdown()
             return
 
-        # and send all the connection requests, must use allflag because we
-        # added the nodes disabled, the connect response will mark them
-        # enabled
-        for peer in self.Ledger.peer_list(allflag=True):
-            connect_message.send_connection_request(self.Ledger, peer)
+        self._connectionattempts = 1
+        self.StartupTimer.start('connect')
+        self.wait_for_connection(self.start_journal_transfer)
 
-        logger.debug("initial ledger connection requests sent")
+    def wait_for_connection(self, callback):
+        """
+        Send connection requests to all of the known peers, must use allflag
+        because the nodes are added disabled and the connect reply marks them
+        enabled. The topology update starts as soon as the first peer
+        confirms its connection.
+        """
+
+        def _failed(failure):
+            failure.trap(peer_connector.PeerConnectionFailed)
+            logger.critical('failed to connect to selected peers, '
+                            'shutting down; %s', failure.getErrorMessage())
+            self._connectionattempts = 0
+            self.shutdown()
 
-        # Wait for the connection message to be processed before jumping to the
-        # next state a better technique would be to add an event in sawtooth
-        # when a new node is connected
-        self._connectionattempts = 3
-        reactor.callLater(2.0, self.initialize_ledger_topology,
-                          self.start_journal_transfer)
+        def _connected(peer):
+            self.StartupTimer.stop('connect')
+            self.initialize_ledger_topology(callback)
+
+        d = self.PeerConnector.connect(self.Ledger.peer_list(allflag=True))
+        d.addCallback(_connected)
+        d.addErrback(_failed)
+        d.addErrback(self._log_failure, 'failed to initialize topology')
+
+        logger.debug("ledger connection requests sent")
 
     def initialize_ledger_topology(self, callback):
         """
-        Make certain that there is at least one connected peer and then
-        kick off the configured topology generation protocol.
+        Kick off the configured topology generation protocol, there must be
+        at least one connected peer.
         """
 
         logger.debug('initialize ledger topology')
 
-        # make sure there is at least one connection already confirmed
-        if len(self.Ledger.peer_list()) == 0:
-            self._connectionattempts -= 1
-            if self._connectionattempts > 0:
-                logger.info('initial connection attempts failed, '
-                            'try again [%s]', self._connectionattempts)
-                for peer in self.Ledger.peer_list(allflag=True):
-                    connect_message.send_connection_request(self.Ledger, peer)
-                reactor.callLater(2.0, self.initialize_ledger_topology,
-                                  callback)
-                return
-            else:
-                logger.critical('failed to connect to selected peers, '
-                                'shutting down')
-                self.shutdown()
-                return
-
         self._connectionattempts = 0
+        self.StartupTimer.start('topology')
 
         # and now its time to pick the topology protocol
         topology = self.Config.get("TopologyAlgorithm", "RandomWalk")
@@ -329,6 +736,9 @@ class Validator(object):
                     'MinimumConnectivity']
             self.barabasi_initialization(callback)
 
+        elif topology == "LatencyAware":
+            self.latency_initialization(callback)
+
         else:
             logger.error("unknown topology protocol %s", topology)
             self.shutdown()
@@ -338,20 +748,56 @@ class Validator(object):
         logger.info("ledger connections using BarabasiAlbert topology")
         barabasi_albert.start_topology_update(self.Ledger, callback)
 
+    def latency_initialization(self, callback):
+        logger.info("ledger connections using LatencyAware topology")
+        if self.LatencyTopology is None:
+            self.LatencyTopology = latency_topology.LatencyTopology(
+                self.Ledger, self.PeerConnector,
+                candidates=lambda: self.NodeMap.values(),
+                release=self.release_peer,
+                locallinks=self.Config.get('LocalLinks', 2),
+                longlinks=self.Config.get('LongLinks', 2),
+                probecount=self.Config.get('ProbeCount', 4),
+                probewindow=self.Config.get('ProbeWindow', 2.0),
+                interval=self.Config.get('TopologyInterval', 60.0))
+
+        d = self.LatencyTopology.start_topology_update(callback)
+        d.addErrback(self._log_failure, 'latency topology update failed')
+
     def random_walk_initialization(self, callback):
         logger.info("ledger connections using RandomWalk topology")
         random_walk.start_topology_update(self.Ledger, callback)
 
     def start_journal_transfer(self):
-        if not journal_transfer.start_journal_transfer(self.Ledger,
-                                                       self.start_ledger):
+        self.StartupTimer.stop('topology')
+        self.StartupTimer.start('journal_transfer')
+
+        monitor = transfer_monitor.JournalTransferMonitor(
+            self.Ledger, self.start_ledger,
+            stalltimeout=self.Config.get('TransferStallTimeout', 30.0),
+            maxrestarts=self.Config.get('TransferRestarts', 5))
+        if not monitor.start():
             # this generally happens because there are no valid peers, for now
             # assume that we are the first validator and go with it
             self.start_ledger()
 
     def start_ledger(self):
+        self.StartupTimer.stop('journal_transfer')
+
         logger.info('ledger initialization complete')
+        self.StartupTimer.start('initialization_complete')
         self.Ledger.initialization_complete()
+        self.StartupTimer.complete()
+
+        self.ReconnectManager.start()
+        if self.SnapshotManager:
+            self.SnapshotManager.start()
+        self.start_ledger_specific_services()
+
+        if self.PeerCache:
+            self._peercachetask = task.LoopingCall(self.save_peer_cache)
+            self._peercachetask.start(
+                self.Config.get('PeerCacheInterval', 300.0))
 
         self.register_endpoint(self.Ledger.LocalNode, self.EndpointDomain)
 
@@ -395,11 +841,11 @@ class Validator(object):
         msg.sign_from_node(node)
 
         logger.info('register endpoint %s with name %s through HTTP server',
-                    endpoint.Identifier, endpoint.Name)
-        self.LedgerWebClient.post_message(msg)
+                    node.Identifier, node.Name)
+        return self.LedgerWebClient.post_message(msg)
 
     def unregister_endpoint(self, node, domain='/'):
-        update = endpoint_registry.update.create_from_node(node, domain)
+        update = endpoint_registry.Update.create_from_node(node, domain)
         update.Verb = 'unr'
 
         txn = endpoint_registry.EndpointRegistryTransaction()
@@ -417,29 +863,68 @@ class Validator(object):
 
         logger.info('unregister endpoint %s with name %s through HTTP server',
                     node.Identifier, node.Name)
-        self.LedgerWebClient.post_message(msg)
+        return self.LedgerWebClient.post_message(msg)
 
+    @defer.inlineCallbacks
     def get_endpoints(self, count, domain='/'):
+        """
+        Retrieve the endpoints registered for a domain from the LedgerURL,
+        returns a Deferred that fires with a list of nodes.
+        """
         endpoints = []
 
-        eplist = self.LedgerWebClient.get_store(
-            endpoint_registry.EndpointRegistryTransaction)
-        if not eplist:
-            return endpoints
-
-        for ep in eplist:
-            epinfo = self.LedgerWebClient.get_store(
-                endpoint_registry.EndpointRegistryTransaction, ep)
-            if epinfo.get('Domain', '/').startswith(domain):
-                addr = (socket.gethostbyname(epinfo["Host"]), epinfo["Port"])
-                endpoint = node.Node(address=addr,
-                                     identifier=epinfo["NodeIdentifier"],
-                                     name=epinfo["Name"])
-                endpoints.append(endpoint)
+        # a single request returns the endpoints in the domain, the server
+        # keeps an index of the endpoint registry by domain
+        epmap = yield self.LedgerWebClient.get_store(
+            endpoint_registry.EndpointRegistryTransaction, domain=domain)
+        if not epmap:
+            defer.returnValue(endpoints)
+
+        # a server without the index ignores the domain and returns the
+        # list of keys, fall back to the whole registry
+        if isinstance(epmap, list):
+            epmap = yield self.LedgerWebClient.get_store(
+                endpoint_registry.EndpointRegistryTransaction, '*')
+
+        eplist = [epinfo for epinfo in epmap.itervalues()
+                  if epinfo.get('Domain', '/').startswith(domain)]
+
+        # resolve the endpoint hosts concurrently without blocking the
+        # reactor, endpoints that do not resolve are skipped
+        addresses = yield self.Resolver.resolve_all(
+            [epinfo["Host"] for epinfo in eplist])
+        for epinfo in eplist:
+            if epinfo["Host"] in addresses:
+                endpoints.append(
+                    self.endpoint_node(epinfo, addresses[epinfo["Host"]]))
 
         logger.info('found %d endpoints', len(endpoints))
 
         if count <= 0:
-            return endpoints
+            defer.returnValue(endpoints)
+
+        defer.returnValue(random.sample(endpoints,
+                                        min(count, len(endpoints))))
 
-        return random.sample(endpoints, min(count, len(endpoints)))
+    @staticmethod
+    def endpoint_node(epinfo, address):
+        """
+        Create a gossip node from an endpoint registry entry and the
+        resolved address of its host.
+        """
+        addr = (address, epinfo["Port"])
+        return node.Node(address=addr,
+                         identifier=epinfo["NodeIdentifier"],
+                         name=epinfo["Name"])
+
+    @staticmethod
+    def _cancel_timer(result, timer):
+        if timer.active():
+            timer.cancel()
+        return result
+
+    def _log_failure(self, failure, msg):
+        """
+        Errback that logs a failed Deferred and swallows the failure.
+        """
+        logger.error('%s: %s', msg, failure.getErrorMessage())
@@ -16,6 +16,7 @@
 import logging
 
 from txnserver import validator
+from txnserver.endpoint_tracker import EndpointTracker
 from journal.consensus.quorum import quorum_journal
 
 logger = logging.getLogger(__name__)
@@ -24,8 +25,11 @@ logger = logging.getLogger(__name__)
 class VotingValidator(validator.Validator):
     EndpointDomain = '/VotingValidator'
 
-    def __init__(self, config, windows_service=False):
-        super(VotingValidator, self).__init__(config, windows_service)
+    def __init__(self, config, windows_service=False, timer=None):
+        # follows quorum membership once the ledger is running
+        self.EndpointTracker = None
+
+        super(VotingValidator, self).__init__(config, windows_service, timer)
 
     def initialize_ledger_specific_configuration(self):
         """
@@ -42,6 +46,61 @@ class VotingValidator(validator.Validator):
         """
         self.Ledger = quorum_journal.QuorumJournal(node, self.Config)
 
-        nodelist = self.get_endpoints(0, self.EndpointDomain)
-        for node in nodelist:
-            self.Ledger.add_quorum_node(node)
+        # the endpoints arrive asynchronously once the reactor is running
+        d = self.get_endpoints(0, self.EndpointDomain)
+        d.addCallback(self._add_quorum_nodes)
+        d.addErrback(self._log_failure, 'Unable to get quorum endpoints')
+
+    def _add_quorum_nodes(self, nodelist):
+        for nd in nodelist:
+            self.Ledger.add_quorum_node(nd)
+
+        # the tracker may already have picked up some of these
+        if self.EndpointTracker:
+            self.EndpointTracker.seed([nd.Identifier for nd in nodelist])
+
+    def start_ledger_specific_services(self):
+        self.EndpointTracker = EndpointTracker(
+            self.Ledger, self.EndpointDomain, self._add_quorum_endpoint,
+            self._remove_quorum_node)
+        self.EndpointTracker.seed(self.Ledger.QuorumMap.keys())
+        self.EndpointTracker.start(
+            self.Config.get('QuorumUpdateInterval', 1.0))
+
+    def stop_ledger_specific_services(self):
+        if self.EndpointTracker:
+            self.EndpointTracker.stop()
+
+    def _add_quorum_endpoint(self, epinfo):
+        if epinfo['NodeIdentifier'] == self.Ledger.LocalNode.Identifier:
+            return
+
+        def _resolved(address):
+            # a changed registration replaces the node
+            self._drop_quorum_node(epinfo['NodeIdentifier'])
+            self.Ledger.add_quorum_node(self.endpoint_node(epinfo, address))
+
+        d = self.Resolver.resolve(epinfo['Host'])
+        d.addCallback(_resolved)
+        d.addErrback(self._log_failure,
+                     'Unable to resolve quorum endpoint {0}'.format(
+                         epinfo['Host']))
+
+    def _remove_quorum_node(self, identifier):
+        if self._drop_quorum_node(identifier):
+            logger.info('node %s left the quorum', identifier[:8])
+
+    def _drop_quorum_node(self, identifier):
+        """
+        Remove a node from the quorum state of the journal. The journal only
+        provides add_quorum_node, so this is the one place that removes
+        nodes; the node is taken out of the voting quorum as well as the
+        quorum map.
+
+        Returns:
+            gossip.node.Node: the removed node, None if it was not known
+        """
+        votingquorum = getattr(self.Ledger, 'VotingQuorum', None)
+        if votingquorum is not None:
+            votingquorum.pop(identifier, None)
+        return self.Ledger.QuorumMap.pop(identifier, None)
@@ -0,0 +1,138 @@
+# Copyright 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""
+This module implements the tuning of the target wait time of the lottery
+consensus from the observed block rate, fork rate and network size
+"""
+
+import collections
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class WaitTimeTuner(object):
+    """
+    Recommend a target wait time. A block that is found while another is
+    still propagating causes a fork, so with a propagation delay D and a
+    block interval T about 1 - exp(-D / T) of the blocks are lost to forks.
+    Committed throughput is highest at the shortest wait time whose fork
+    rate stays under ForkTarget; that wait time is only useful while blocks
+    are full, otherwise shortening it adds forks without adding
+    throughput.
+
+    The propagation delay is the larger of the one implied by the observed
+    fork rate and the peer round trip time times the number of gossip hops
+    needed to reach the population.
+
+    Attributes:
+        TargetWaitTime (float): the target wait time in use
+        LowerBound (float): recommendations never go below this
+        UpperBound (float): recommendations never go above this
+        ForkTarget (float): acceptable fraction of blocks lost to forks
+        MaximumStep (float): largest relative change of a recommendation
+        MinimumSamples (int): blocks observed before recommending a change
+        Recommended (float): the latest recommendation
+    """
+
+    def __init__(self, targetwaittime, lower=5.0, upper=120.0,
+                 forktarget=0.05, maxstep=0.25, window=20, minsamples=5):
+        self.TargetWaitTime = targetwaittime
+        self.LowerBound = lower
+        self.UpperBound = upper
+        self.ForkTarget = forktarget
+        self.MaximumStep = maxstep
+        self.MinimumSamples = minsamples
+        self.Recommended = targetwaittime
+
+        self._intervals = collections.deque(maxlen=window)
+        self._sizes = collections.deque(maxlen=window)
+        self._forks = collections.deque(maxlen=window)
+        self._population = 0
+        self._propagation = 0.0
+
+    def observe_block(self, interval, size, fork):
+        """
+        Record a change of the committed head.
+
+        Args:
+            interval (float): seconds since the previous head change
+            size (int): number of transactions in the new head
+            fork (bool): True if the new head does not extend the old one
+        """
+        self._intervals.append(interval)
+        self._sizes.append(size)
+        self._forks.append(1 if fork else 0)
+
+    def block_interval(self):
+        if not self._intervals:
+            return None
+        return sum(self._intervals) / len(self._intervals)
+
+    def fork_rate(self):
+        if not self._forks:
+            return None
+        return float(sum(self._forks)) / len(self._forks)
+
+    def recommend(self, population, delay, maximumsize):
+        """
+        Compute a recommended target wait time.
+
+        Args:
+            population (int): number of validators in the network
+            delay (float): mean round trip time to the peers
+            maximumsize (int): maximum transactions per block
+
+        Returns:
+            float: the recommended target wait time
+        """
+        if len(self._intervals) < self.MinimumSamples:
+            return self.TargetWaitTime
+
+        # gossip reaches a population of N in about log2(N) hops
+        hops = max(1.0, math.log(max(population, 2), 2))
+        propagation = delay * hops
+
+        forkrate = min(self.fork_rate(), 0.99)
+        propagation = max(propagation,
+                          -self.block_interval() * math.log(1.0 - forkrate))
+
+        safe = propagation / -math.log(1.0 - self.ForkTarget)
+
+        meansize = float(sum(self._sizes)) / len(self._sizes)
+        if meansize >= 0.9 * maximumsize:
+            target = safe
+        else:
+            target = max(self.TargetWaitTime, safe)
+
+        target = min(max(target, self.TargetWaitTime * (1 - self.MaximumStep)),
+                     self.TargetWaitTime * (1 + self.MaximumStep))
+        target = min(max(target, self.LowerBound), self.UpperBound)
+
+        self._population = population
+        self._propagation = propagation
+        self.Recommended = target
+        return target
+
+    def dump(self):
+        return {
+            'TargetWaitTime': self.TargetWaitTime,
+            'Recommended': self.Recommended,
+            'BlockInterval': self.block_interval(),
+            'ForkRate': self.fork_rate(),
+            'Population': self._population,
+            'PropagationDelay': self._propagation
+        }
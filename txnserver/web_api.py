@@ -20,11 +20,12 @@ This module implements the Web server supporting the web api
 import logging
 import traceback
 
-from twisted.internet import reactor
+from twisted.internet import defer, reactor, threads
+from twisted.internet.task import cooperate, TaskDone, TaskStopped
 from twisted.web import http
 from twisted.web.error import Error
 from twisted.web.resource import Resource
-from twisted.web.server import Site
+from twisted.web.server import NOT_DONE_YET, Site
 
 from gossip.common import json2dict
 from gossip.common import dict2json
@@ -33,6 +34,9 @@ from gossip.common import dict2cbor
 from gossip.common import pretty_print_dict
 from journal import transaction
 from journal.messages import transaction_message
+from ledger.transaction import endpoint_registry
+from txnserver import admin_messages
+from txnserver.endpoint_index import EndpointDomainIndex
 
 logger = logging.getLogger(__name__)
 
@@ -40,21 +44,32 @@ logger = logging.getLogger(__name__)
 class RootPage(Resource):
     isLeaf = True
 
-    def __init__(self, ledger):
+    def __init__(self, ledger, validator=None):
         Resource.__init__(self)
         self.Ledger = ledger
+        self.Validator = validator
+        self.EndpointIndex = EndpointDomainIndex()
 
         self.GetPageMap = {
             'store': self._handlestorerequest,
             'block': self._handleblkrequest,
-            'transaction': self._handletxnrequest
+            'transaction': self._handletxnrequest,
+            'status': self._handlestatusrequest,
+            'snapshot': self._handlesnapshotrequest
+        }
+
+        self.StreamPageMap = {
+            'store': self._streamstorerequest,
+            'block': self._streamblkrequest,
+            'transaction': self._streamtxnrequest
         }
 
         self.PostPageMap = {
             'default': self._msgforward,
             'forward': self._msgforward,
             'initiate': self._msginitiate,
-            'echo': self._msgecho
+            'echo': self._msgecho,
+            'loglevel': self._msgloglevel
         }
 
     def error_response(self, request, response, *msgargs):
@@ -73,10 +88,15 @@ class RootPage(Resource):
 
     def render_GET(self, request):
         """
-        Handle a GET request on the HTTP interface. Three paths are accepted:
+        Handle a GET request on the HTTP interface. Five paths are accepted:
             /store[/<storename>[/<key>|*]]
             /block[/<blockid>]
             /transaction[/<txnid>]
+            /status[/<section>]
+            /snapshot[/<blockid>]
+
+        Lists and store dumps are streamed to the client as they are encoded
+        if the request includes the stream parameter.
         """
         # pylint: disable=invalid-name
 
@@ -94,27 +114,28 @@ class RootPage(Resource):
         testonly = (request.method == 'HEAD')
 
         try:
+            cbor = (request.getHeader('Accept') == 'application/cbor')
+
+            if 'stream' in request.args and prefix in self.StreamPageMap \
+                    and not testonly:
+                stream = self.StreamPageMap[prefix](list(components),
+                                                    request.args)
+                if stream:
+                    return self._stream_response(request, cbor, *stream)
+
             response = self.GetPageMap[prefix](components, request.args,
                                                testonly)
 
+            pretty = 'p' in request.args
+            if isinstance(response, defer.Deferred):
+                return self._deferred_response(request, response, cbor,
+                                               pretty)
+
             if testonly:
                 return ''
 
-            cbor = (request.getHeader('Accept') == 'application/cbor')
-
-            if cbor:
-                request.responseHeaders.addRawHeader(b"content-type",
-                                                     b"application/cbor")
-                return dict2cbor(response)
-
-            request.responseHeaders.addRawHeader(b"content-type",
-                                                 b"application/json")
-
-            pretty = 'p' in request.args
-            if pretty:
-                return pretty_print_dict(response) + '\n'
-            else:
-                return dict2json(response)
+            self._set_content_type(request, cbor)
+            return self._encode_response(response, cbor, pretty)
 
         except Error as e:
             return self.error_response(
@@ -133,7 +154,9 @@ class RootPage(Resource):
         """
         Handle a POST request on the HTTP interface. All message on the POST
         interface are gossip messages that should be relayed into the gossip
-        network as is.
+        network as is, except for a SetLogLevel message posted to /loglevel
+        from the local host which only changes the log levels of this
+        validator.
         """
         # pylint: disable=invalid-name
 
@@ -199,6 +222,136 @@ class RootPage(Resource):
                                        'error processing http request {0}',
                                        request.path)
 
+    @staticmethod
+    def _set_content_type(request, cbor):
+        if cbor:
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/cbor")
+        else:
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/json")
+
+    @staticmethod
+    def _encode_response(response, cbor, pretty=False):
+        if cbor:
+            return dict2cbor(response)
+        if pretty:
+            return pretty_print_dict(response) + '\n'
+        return dict2json(response)
+
+    def _deferred_response(self, request, d, cbor, pretty):
+        """
+        Complete a GET request whose handler returned a Deferred, such as
+        one that reads a large response from disk. The response is encoded
+        by a thread from the reactor pool as well.
+        """
+        finished = []
+        request.notifyFinish().addBoth(finished.append)
+
+        def _encode(response):
+            return threads.deferToThread(self._encode_response, response,
+                                         cbor, pretty)
+
+        def _write(content):
+            if finished:
+                return
+            if request.method != 'HEAD':
+                self._set_content_type(request, cbor)
+                request.write(content)
+            request.finish()
+
+        def _failed(failure):
+            if finished:
+                return
+            if failure.check(Error):
+                content = self.error_response(
+                    request, int(failure.value.status),
+                    'exception while processing http request {0}; {1}',
+                    request.path, str(failure.value))
+            else:
+                logger.warn('error processing http request %s; %s',
+                            request.path, failure.getTraceback())
+                content = self.error_response(
+                    request, http.BAD_REQUEST,
+                    'error processing http request {0}', request.path)
+            request.write(content)
+            request.finish()
+
+        d.addCallback(_encode)
+        d.addCallbacks(_write, _failed)
+        return NOT_DONE_YET
+
+    def _stream_response(self, request, cbor, kind, items, batchsize=100):
+        """
+        Write a list or map to the client one batch of items at a time from
+        a cooperative task so that neither the encoded response nor the full
+        collection has to be held in memory. CBOR responses use indefinite
+        length containers, JSON responses are written piecewise.
+
+        Args:
+            kind (str): 'list' or 'map'
+            items (iterator): list items, or (key, value) tuples for a map
+        """
+
+        if cbor:
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/cbor")
+            opener = '\x9f' if kind == 'list' else '\xbf'
+            closer = '\xff'
+            separator = ''
+        else:
+            request.responseHeaders.addRawHeader(b"content-type",
+                                                 b"application/json")
+            opener = '[' if kind == 'list' else '{'
+            closer = ']' if kind == 'list' else '}'
+            separator = ','
+
+        def _encode(item):
+            if kind == 'list':
+                return dict2cbor(item) if cbor else dict2json(item)
+            (key, value) = item
+            if cbor:
+                return dict2cbor(key) + dict2cbor(value)
+            return dict2json(key) + ':' + dict2json(value)
+
+        def _produce():
+            request.write(opener)
+            first = True
+            batch = []
+            for item in items:
+                if not first:
+                    batch.append(separator)
+                first = False
+                batch.append(_encode(item))
+                if len(batch) >= batchsize:
+                    request.write(''.join(batch))
+                    batch = []
+                    yield None
+            batch.append(closer)
+            request.write(''.join(batch))
+
+        def _done(result):
+            request.finish()
+
+        def _failed(failure):
+            if failure.check(TaskStopped):
+                return
+            logger.warn('error streaming http request %s; %s', request.path,
+                        failure.getTraceback())
+            request.finish()
+
+        def _disconnected(failure):
+            try:
+                task.stop()
+            except TaskDone:
+                pass
+
+        task = cooperate(_produce())
+        task.whenDone().addCallbacks(_done, _failed)
+        request.notifyFinish().addErrback(_disconnected)
+
+        return NOT_DONE_YET
+
     def _msgforward(self, request, components, msg):
         """
         Forward a signed message through the gossip network.
@@ -224,6 +377,32 @@ class RootPage(Resource):
         self.Ledger.handle_message(msg)
         return msg
 
+    def _msgloglevel(self, request, components, msg):
+        """
+        Apply a log level change to this validator only, the message is not
+        forwarded
+        """
+
+        if request.getClientIP() != '127.0.0.1':
+            raise Error(http.NOT_ALLOWED,
+                        '{0} not authorized to change log levels'.format(
+                            request.getClientIP()))
+
+        if not isinstance(msg, admin_messages.SetLogLevelMessage):
+            raise Error(http.BAD_REQUEST,
+                        'unexpected message type {0}'.format(msg.MessageType))
+
+        if not self.Validator:
+            raise Error(http.BAD_REQUEST, 'no validator')
+
+        try:
+            self.Validator.LogLevels.set_level(msg.Level, msg.Logger,
+                                               msg.Duration)
+        except ValueError as e:
+            raise Error(http.BAD_REQUEST, str(e))
+
+        return msg
+
     def _msgecho(self, request, components, msg):
         """
         Sign and echo a message
@@ -239,6 +418,9 @@ class RootPage(Resource):
             store name, key == '*' -- return a complete dump of all keys in the
                 store
             store name, key != '*' -- return the data associated with the key
+
+        The endpoint registry store also accepts a domain argument, the
+        request then returns the entries of the endpoints in that domain.
         """
         if not self.Ledger.GlobalStore:
             raise Error(http.BAD_REQUEST, 'no global store')
@@ -262,6 +444,15 @@ class RootPage(Resource):
 
         store = storemap.get_transaction_store(storename)
 
+        if 'domain' in args:
+            txntype = endpoint_registry.EndpointRegistryTransaction
+            if storename != txntype.TransactionTypeName:
+                raise Error(http.BAD_REQUEST,
+                            'no domain index for store <{0}>'.format(
+                                storename))
+            return self.EndpointIndex.lookup(blockid, store,
+                                             args.get('domain')[0])
+
         if len(pathcomponents) == 0:
             return store.keys()
 
@@ -276,6 +467,76 @@ class RootPage(Resource):
 
         return store[key]
 
+    def _streamstorerequest(self, pathcomponents, args):
+        """
+        Stream a store request; the list of keys in a store or a complete
+        dump of the store can be streamed, other requests return None.
+        """
+        if not self.Ledger.GlobalStore or len(pathcomponents) == 0:
+            return None
+
+        if 'domain' in args:
+            return None
+
+        if len(pathcomponents) > 1 and (pathcomponents[1] != '*' or
+                                        'delta' in args):
+            return None
+
+        blockid = self.Ledger.MostRecentCommitedBlockID
+        if 'blockid' in args:
+            blockid = args.get('blockid')[0]
+
+        storemap = self.Ledger.GlobalStoreMap.get_block_store(blockid)
+        if not storemap:
+            raise Error(http.BAD_REQUEST,
+                        'no store map for block <{0}>'.format(blockid))
+
+        storename = '/' + pathcomponents[0]
+        if storename not in storemap.TransactionStores:
+            raise Error(http.BAD_REQUEST,
+                        'no such store <{0}>'.format(storename))
+
+        store = storemap.get_transaction_store(storename)
+        if len(pathcomponents) == 1:
+            return ('list', iter(store.keys()))
+
+        return ('map', ((key, store[key]) for key in store.keys()))
+
+    def _streamblkrequest(self, pathcomponents, args):
+        """
+        Stream the list of committed block ids, other requests return None.
+        """
+        if pathcomponents:
+            return None
+
+        count = 0
+        if 'blockcount' in args:
+            count = int(args.get('blockcount')[0])
+
+        return ('list', iter(self.Ledger.commited_block_ids(count)))
+
+    def _streamtxnrequest(self, pathcomponents, args):
+        """
+        Stream the list of committed transaction ids, oldest to newest, other
+        requests return None.
+        """
+        if pathcomponents:
+            return None
+
+        blkcount = 0
+        if 'blockcount' in args:
+            blkcount = int(args.get('blockcount')[0])
+
+        blockids = self.Ledger.commited_block_ids(blkcount)
+
+        def _txnids():
+            while blockids:
+                blockid = blockids.pop()
+                for txnid in self.Ledger.BlockStore[blockid].TransactionIDs:
+                    yield txnid
+
+        return ('list', _txnids())
+
     def _handleblkrequest(self, pathcomponents, args, testonly):
         """
         Handle a block request. There are three types of requests:
@@ -377,6 +638,55 @@ class RootPage(Resource):
 
         return tinfo[field]
 
+    def _handlestatusrequest(self, pathcomponents, args, testonly):
+        """
+        Handle a status request. There are two types of requests:
+            empty path -- return all of the status sections
+            section -- return one section, e.g. Startup or WaitTime
+        """
+        if not self.Validator:
+            raise Error(http.BAD_REQUEST, 'no validator status available')
+
+        status = self.Validator.dump_status()
+
+        if not pathcomponents:
+            return status
+
+        section = pathcomponents.pop(0)
+        if section not in status:
+            raise Error(http.BAD_REQUEST,
+                        'unknown status section {0}'.format(section))
+
+        return status[section]
+
+    def _handlesnapshotrequest(self, pathcomponents, args, testonly):
+        """
+        Handle a snapshot request. There are two types of requests:
+            empty path -- return the manifest of the newest snapshot
+            blockid -- return the snapshot of the global store at the block
+        """
+        if not self.Validator or not self.Validator.SnapshotManager:
+            raise Error(http.NOT_FOUND, 'snapshots are not enabled')
+
+        snapshots = self.Validator.SnapshotManager
+        if not pathcomponents:
+            if not snapshots.Latest:
+                raise Error(http.NOT_FOUND, 'no snapshot available')
+            return snapshots.Latest
+
+        def _loaded(snapshot):
+            if snapshot is None:
+                raise Error(http.NOT_FOUND,
+                            'no snapshot for block {0}'.format(blockid))
+            return snapshot
+
+        # a snapshot holds the whole global store, it is read and parsed
+        # off the reactor thread
+        blockid = pathcomponents.pop(0)
+        d = threads.deferToThread(snapshots.load, blockid)
+        d.addCallback(_loaded)
+        return d
+
 
 class ApiSite(Site):
     """
@@ -392,8 +702,8 @@ class ApiSite(Site):
         return Site.getResourceFor(self, request)
 
 
-def initialize_web_server(config, ledger):
+def initialize_web_server(config, ledger, validator=None):
     if 'HttpPort' in config and config["HttpPort"] > 0:
-        root = RootPage(ledger)
+        root = RootPage(ledger, validator)
         site = ApiSite(root)
         reactor.listenTCP(config["HttpPort"], site)